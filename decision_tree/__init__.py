@@ -0,0 +1,69 @@
+"""
+A decision tree learner (ID3) for categorical and numeric data, with compiled trees, ensembles and a binary
+model format.
+
+The package is split into modules that are only imported when one of their names is first used, so that
+"import decision_tree" does no work of its own:
+
+    data           Datasets and the binary dataset format
+    criteria       Purity measures and information gain
+    preprocessing  Numeric attributes, unknown values and the dataset cache
+    builder        ID3, grow_tree and grow_tree_parallel
+    predictor      Walking and compiling trees
+    ensemble       RandomForest, Bagging and AdaBoost
+    models         save_model and load_model
+    experiments    The sweep and the car and bank experiments ("python -m decision_tree")
+    server         An HTTP scoring service with micro-batching ("python -m decision_tree.server model.dtm")
+    benchmarks     Synthetic data and benchmarks of every stage ("python -m decision_tree.benchmarks")
+    instrument     Opt-in counters and per-stage timers (Profiler)
+    incremental    A tree that is updated with each new batch of examples (IncrementalTree)
+    evaluation     Confusion matrices, chunked scoring and cross-validation ("python -m decision_tree.evaluation")
+    pruning        Cost-complexity and reduced-error pruning
+"""
+
+import importlib
+
+
+#The module that defines each public name
+_EXPORTS = {
+    "data": ("Dataset", "encode_examples", "Schema", "create_schema", "read_file", "read_chunks", "load_dataset",
+             "DATASET_MAGIC", "save_dataset", "map_dataset", "share_dataset", "attach_dataset",
+             "create_attribute_dictionary"),
+    "criteria": ("majority_label", "label_counts", "entropy_counts", "majority_error_counts", "gini_counts",
+                 "purity_functions", "purity_cache_info", "clear_purity_cache", "entropy", "majority_error",
+                 "gini_index", "contingency_table", "split_gains", "best_attribute"),
+    "preprocessing": ("process_bank_data", "median", "Preprocessor", "Binner", "CACHE_VERSION", "prepare_dataset"),
+    "builder": ("Node", "shared_leaf", "ID3", "grow_tree", "grow_tree_parallel", "build_decision_tree"),
+    "predictor": ("walk_tree", "walk_encoded", "CompiledTree", "compile_tree", "test_decision_tree"),
+    "ensemble": ("RandomForest", "Bagging", "AdaBoost"),
+    "models": ("MODEL_MAGIC", "MODEL_VERSION", "save_model", "load_model"),
+    "experiments": ("SweepResult", "make_grid", "sweep", "print_results", "test_car", "test_bank"),
+    "server": ("RecordEncoder", "ScoringServer", "serve"),
+    "benchmarks": ("synthetic_schema", "generate_dataset", "run_benchmarks"),
+    "instrument": ("Profiler",),
+    "incremental": ("IncrementalTree",),
+    "evaluation": ("ConfusionMatrix", "evaluate", "evaluate_file", "fold_indices", "cross_validate"),
+    "pruning": ("PruningPath", "cost_complexity_path", "reduced_error_prune"),
+}
+
+_MODULES = {name: module for module, names in _EXPORTS.items() for name in names}
+
+__all__ = [name for names in _EXPORTS.values() for name in names]
+
+
+def __getattr__(name):
+    """
+    Imports the module that defines name the first time name is looked up on the package.
+    """
+
+    module = _MODULES.get(name)
+    if module is None:
+        raise AttributeError("module " + repr(__name__) + " has no attribute " + repr(name))
+    value = getattr(importlib.import_module("." + module, __name__), name)
+    #Later lookups find the name directly, without calling __getattr__
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
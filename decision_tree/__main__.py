@@ -0,0 +1,6 @@
+import sys
+
+from .experiments import main
+
+
+sys.exit(main())
@@ -0,0 +1,473 @@
+"""
+Benchmarks of training and inference on synthetic data, written to a JSON file so that runs can be compared.
+Run with "python -m decision_tree.benchmarks".
+"""
+
+import csv
+import json
+import os
+import platform
+import random
+import sys
+import time
+
+from .data import Schema, create_attribute_dictionary, create_schema, load_dataset, read_file
+from .criteria import best_attribute
+from .preprocessing import Binner, Preprocessor, process_bank_data
+from .builder import ID3, Node, grow_tree
+from .predictor import compile_tree, test_decision_tree, walk_tree
+
+
+#The version of the results file.  It is increased whenever the meaning of a field changes.
+RESULTS_VERSION = 1
+
+
+#A generator and a typical median for each numeric attribute of the bank data
+_BANK_NUMERIC = {
+    "age": (lambda rng: rng.randint(18, 95), 38),
+    "balance": (lambda rng: int(rng.gauss(1400, 3000)), 450),
+    "day": (lambda rng: rng.randint(1, 31), 16),
+    "duration": (lambda rng: int(rng.expovariate(1 / 260.0)), 180),
+    "campaign": (lambda rng: 1 + int(rng.expovariate(1 / 1.7)), 2),
+    "pdays": (lambda rng: -1 if rng.random() < 0.8 else rng.randint(1, 870), -1),
+    "previous": (lambda rng: 0 if rng.random() < 0.8 else rng.randint(1, 30), 0),
+}
+
+
+def synthetic_schema(example, cardinality=None):
+    """
+    Creates the schema of synthetic data with the columns of the car or bank data.
+
+    Input:
+    -example:  "car" or "bank".
+    -cardinality:  The number of values of each categorical attribute, or None to keep the values of the real
+        data.  The real values come first, followed by made-up values such as "buying4".
+
+    Returns:
+    -schema:  A Schema.  Its codebooks are those of create_attribute_dictionary, with the given cardinality.
+    """
+
+    schema = create_schema(example)
+    if cardinality is None:
+        return schema
+    if cardinality < 1:
+        raise ValueError("cardinality must be at least 1")
+    raw = create_attribute_dictionary(example)
+    codebooks = {}
+    for name in schema.columns:
+        if name in schema.numeric:
+            continue
+        values = raw[name]
+        if name != schema.label:
+            values = (values + tuple(name + str(i) for i in range(len(values), cardinality)))[:cardinality]
+        codebooks[name] = values
+    return Schema(schema.columns, schema.numeric, codebooks, schema.label)
+
+
+def generate_dataset(path, example, n_rows, cardinality=None, noise=0.1, seed=0, chunk_size=100000):
+    """
+    Writes a synthetic csv file with the columns of the car or bank data.
+    Categorical values are drawn uniformly from the codebooks of the schema, and numeric values from rough
+    fits of the bank data.  The label is a hidden additive rule of the attributes, so the data has structure
+    for a tree to find, with a fraction noise of the labels drawn at random.  Rows are written one chunk at a
+    time, so files of any size can be generated.
+
+    Input:
+    -path:  A string, representing the path of the file to be written.
+    -example:  "car" or "bank".
+    -n_rows:  The number of rows.
+    -cardinality:  The number of values of each categorical attribute.  See synthetic_schema.
+    -noise:  The fraction of the labels drawn at random.
+    -seed:  The seed of the random numbers.  The same arguments always write the same file.
+    -chunk_size:  The number of rows generated at a time.
+
+    Returns:
+    -schema:  The Schema to read the file with.
+    """
+
+    schema = synthetic_schema(example, cardinality)
+    rng = random.Random(seed)
+    labels = schema.codebooks[schema.label]
+
+    #The weight of each value of each attribute in the hidden rule
+    weights = {}
+    for name in schema.columns:
+        if name == schema.label:
+            continue
+        if name in schema.numeric:
+            weights[name] = (0.0, rng.random())
+        else:
+            weights[name] = [rng.random() for _ in schema.codebooks[name]]
+    low = sum(min(w) for w in weights.values())
+    high = sum(max(w) for w in weights.values())
+
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        for start in range(0, n_rows, chunk_size):
+            size = min(chunk_size, n_rows - start)
+            scores = [0.0] * size
+            columns = []
+            for name in schema.columns:
+                if name == schema.label:
+                    columns.append(None)
+                    continue
+                if name in schema.numeric:
+                    generate, pivot = _BANK_NUMERIC[name]
+                    values = [generate(rng) for _ in range(size)]
+                    codes = [int(value > pivot) for value in values]
+                else:
+                    codes = [rng.randrange(len(schema.codebooks[name])) for _ in range(size)]
+                    values = [schema.codebooks[name][code] for code in codes]
+                w = weights[name]
+                scores = [score + w[code] for score, code in zip(scores, codes)]
+                columns.append(values)
+
+            column = []
+            for score in scores:
+                if rng.random() < noise:
+                    column.append(labels[rng.randrange(len(labels))])
+                else:
+                    position = (score - low) / (high - low) if high > low else 0.0
+                    column.append(labels[min(int(position * len(labels)), len(labels) - 1)])
+            columns[schema.columns.index(schema.label)] = column
+            writer.writerows(zip(*columns))
+
+    return schema
+
+
+def _count_nodes(tree):
+    """
+    Returns the number of nodes of a tree of Nodes.
+    """
+
+    count = 0
+    stack = [tree]
+    while stack:
+        node = stack.pop()
+        count += 1
+        stack.extend(node.children)
+    return count
+
+
+def _peak_rss():
+    """
+    Returns the peak resident set size of this process in megabytes, or None where it is not available.
+    """
+
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    #Linux reports kilobytes, and macOS bytes
+    return peak / (1024.0 * 1024.0) if sys.platform == "darwin" else peak / 1024.0
+
+
+def _legacy_examples(case):
+    """
+    Reads the examples of a case as a list of dictionaries, with the bank data processed by process_bank_data.
+    """
+
+    S = read_file(case["path"], case["schema"])
+    if case["example"] == "bank":
+        process_bank_data(S, "train")
+    return S
+
+
+def _columnar_dataset(case, numeric="median"):
+    """
+    Reads the examples of a case into a Dataset, with the bank data processed as prepare_dataset does.
+    """
+
+    S = load_dataset(case["path"], case["schema"])
+    if case["example"] == "bank":
+        S = Preprocessor(binarize=numeric == "median").fit_transform(S)
+        if numeric == "hist":
+            S = Binner().fit_transform(S)
+    return S
+
+
+def _grow(S, case):
+    return grow_tree(S, set(S.attributes), S.codebooks, "entropy", case["max_depth"])
+
+
+def _legacy_id3(S, case):
+    attributes = set(case["master_list"]) - {"label"}
+    return ID3(S, attributes, case["master_list"], "entropy", 0, case["max_depth"])
+
+
+def _test_case(case):
+    """
+    Returns the arguments of test_decision_tree.  It reads the file itself when the file has the schema of an
+    example type, and otherwise a Dataset read from it, since prepare_dataset only knows the schemas of the
+    example types.
+    """
+
+    S = load_dataset(case["path"], case["schema"])
+    preprocessor = Preprocessor().fit(S) if case["example"] == "bank" else None
+    if preprocessor is not None:
+        S = preprocessor.transform(S)
+    tree = _grow(S, case)
+    if not isinstance(case["schema"], str):
+        return tree, S, case["example"]
+    if preprocessor is None:
+        return tree, case["path"], case["example"]
+    return tree, case["path"], case["example"], preprocessor.medians, preprocessor.majority
+
+
+def _compiled_case(case):
+    S = _columnar_dataset(case)
+    return compile_tree(_grow(S, case), S.codebooks, S.label), S
+
+
+#Each stage is (setup, run, legacy).  setup is not timed, and returns the arguments of run.  If run returns a
+#tree of Nodes, its nodes and bytes are counted.  Legacy stages work on lists of dictionaries, and are skipped for
+#large datasets.
+STAGES = {
+    "read_file": (lambda case: (case["path"], case["schema"]), read_file, True),
+    "process_bank_data": (lambda case: (read_file(case["path"], case["schema"]), "train"), process_bank_data,
+                          True),
+    "best_attribute": (lambda case: (_legacy_examples(case), set(case["master_list"]) - {"label"},
+                                     case["master_list"], "entropy"), best_attribute, True),
+    "ID3": (lambda case: (_legacy_examples(case), case), _legacy_id3, True),
+    "walk_tree": (lambda case: (_legacy_examples(case), _grow(_columnar_dataset(case), case)),
+                  lambda S, tree: [walk_tree(tree, s) for s in S], True),
+    "load_dataset": (lambda case: (case["path"], case["schema"]), load_dataset, False),
+    "Preprocessor": (lambda case: (load_dataset(case["path"], case["schema"]),),
+                     lambda S: Preprocessor().fit_transform(S), False),
+    "best_attribute[dataset]": (lambda case: (_columnar_dataset(case),),
+                                lambda S: best_attribute(S, set(S.attributes), S.codebooks, "entropy"), False),
+    "grow_tree[median]": (lambda case: (_columnar_dataset(case), case), _grow, False),
+    "grow_tree[exact]": (lambda case: (_columnar_dataset(case, "exact"), case), _grow, False),
+    "grow_tree[hist]": (lambda case: (_columnar_dataset(case, "hist"), case), _grow, False),
+    "test_decision_tree": (_test_case, test_decision_tree, False),
+    "predict_batch": (lambda case: _compiled_case(case), lambda compiled, S: compiled.predict_batch(S), False),
+}
+
+
+#The stages that only apply to the bank data, which has numeric attributes
+_BANK_STAGES = ("process_bank_data", "Preprocessor", "grow_tree[exact]", "grow_tree[hist]")
+
+
+def _run_case(case):
+    """
+    Runs one stage of one dataset, and returns its measurements.  This runs in a process of its own, so that
+    the peak memory of the process is that of the stage.
+    """
+
+    setup, run, _ = STAGES[case["stage"]]
+    times = []
+    nodes = None
+    tree_bytes = None
+    setup_rss = None
+    for _ in range(case["repeat"]):
+        args = setup(case)
+        if setup_rss is None:
+            setup_rss = _peak_rss()
+        start = time.perf_counter()
+        output = run(*args)
+        times.append(time.perf_counter() - start)
+        if isinstance(output, Node):
+            nodes, tree_bytes = _count_nodes(output), output.nbytes()
+        del args, output
+
+    result = {"wall_s": min(times), "wall_all_s": times, "rows_per_s": case["rows"] / min(times),
+              "nodes": nodes, "nodes_per_s": None if nodes is None else nodes / min(times),
+              "tree_bytes": tree_bytes,
+              "setup_rss_mb": setup_rss, "peak_rss_mb": _peak_rss()}
+
+    if case["tracemalloc"]:
+        #Tracing slows allocation down, so the peak of the traced memory is measured in a separate run
+        import tracemalloc
+        args = setup(case)
+        tracemalloc.start()
+        run(*args)
+        result["traced_peak_mb"] = tracemalloc.get_traced_memory()[1] / (1024.0 * 1024.0)
+        tracemalloc.stop()
+    return result
+
+
+def run_benchmarks(sizes=(1000, 10000, 100000), examples=("car", "bank"), cardinalities=(None,), stages=None,
+                   max_depth=6, repeat=3, legacy_limit=1000000, tracemalloc=False, data_dir=None, out=None,
+                   verbose=True):
+    """
+    Times the stages of training and inference on synthetic datasets of several sizes.
+    Each stage of each dataset runs in a fresh process, so that its peak memory is measured on its own.
+
+    Input:
+    -sizes:  The numbers of rows of the datasets.
+    -examples:  The schemas of the datasets, "car" and/or "bank".
+    -cardinalities:  The cardinalities of the categorical attributes.  See synthetic_schema.
+    -stages:  The names of the stages to run (see STAGES), or None for all of them.
+    -max_depth:  The depth of the trees that are built.
+    -repeat:  The number of times each stage is run.  The fastest run is reported.
+    -legacy_limit:  The largest dataset that the stages on lists of dictionaries are run on.
+    -tracemalloc:  If True, also measure the peak memory allocated by each stage with tracemalloc.
+    -data_dir:  The directory of the generated files.  Files that already exist are reused.  The default is a
+        temporary directory.
+    -out:  The path of the JSON results file, or None to not write one.
+    -verbose:  If True, print each result as it is measured.
+
+    Returns:
+    -results:  A dictionary with the platform and the parameters of the run under "meta", and a list of
+        measurements under "results".  Stages that were skipped have a "skipped" reason instead.
+    """
+
+    import multiprocessing
+    import tempfile
+    stages = list(STAGES) if stages is None else list(stages)
+    for stage in stages:
+        if stage not in STAGES:
+            raise ValueError("Unknown stage: " + stage)
+
+    meta = {"version": RESULTS_VERSION, "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(), "platform": platform.platform(), "cpu_count": os.cpu_count(),
+            "max_depth": max_depth, "repeat": repeat}
+    results = []
+    temporary = None
+    if data_dir is None:
+        temporary = tempfile.TemporaryDirectory()
+        data_dir = temporary.name
+    os.makedirs(data_dir, exist_ok=True)
+    context = multiprocessing.get_context("spawn")
+    try:
+        for example in examples:
+            for cardinality in cardinalities:
+                for rows in sizes:
+                    name = example + "-" + str(rows) + ("" if cardinality is None else "-c" + str(cardinality))
+                    path = os.path.join(data_dir, name + ".csv")
+                    if not os.path.exists(path):
+                        start = time.perf_counter()
+                        generate_dataset(path + ".tmp", example, rows, cardinality)
+                        os.replace(path + ".tmp", path)
+                        if verbose:
+                            elapsed = time.perf_counter() - start
+                            print("Generated " + name + " in " + "{:.2f}".format(elapsed) + "s")
+                    schema = synthetic_schema(example, cardinality)
+                    if cardinality is None:
+                        master_list = create_attribute_dictionary(example)
+                    else:
+                        #The codebooks of the processed data, as create_attribute_dictionary gives for real data
+                        data = _columnar_dataset({"path": path, "schema": schema, "example": example})
+                        master_list = data.codebooks
+                    case = {"example": example, "rows": rows, "cardinality": cardinality, "path": path,
+                            "schema": example if cardinality is None else schema, "master_list": master_list,
+                            "max_depth": max_depth, "repeat": repeat, "tracemalloc": tracemalloc}
+
+                    for stage in stages:
+                        result = {"example": example, "rows": rows, "cardinality": cardinality, "stage": stage}
+                        if stage in _BANK_STAGES and example != "bank":
+                            continue
+                        if STAGES[stage][2] and rows > legacy_limit:
+                            result["skipped"] = "legacy stage above " + str(legacy_limit) + " rows"
+                        else:
+                            with context.Pool(1, maxtasksperchild=1) as pool:
+                                result.update(pool.apply(_run_case, (dict(case, stage=stage),)))
+                        results.append(result)
+                        if verbose:
+                            print(format_result(result))
+    finally:
+        if temporary is not None:
+            temporary.cleanup()
+
+    report = {"meta": meta, "results": results}
+    if out is not None:
+        with open(out, "w") as f:
+            json.dump(report, f, indent=1)
+    return report
+
+
+def format_result(result):
+    """
+    Formats one measurement as a line of text.
+    """
+
+    name = result["example"] + " " + str(result["rows"]) + " rows"
+    if result["cardinality"] is not None:
+        name += " cardinality " + str(result["cardinality"])
+    line = "{:<36} {:<24}".format(name, result["stage"])
+    if "skipped" in result:
+        return line + " skipped: " + result["skipped"]
+    line += " {:>10.4f}s {:>12.0f} rows/s".format(result["wall_s"], result["rows_per_s"])
+    if result["nodes_per_s"] is not None:
+        line += " {:>10.0f} nodes/s".format(result["nodes_per_s"])
+    if result.get("tree_bytes") is not None:
+        line += " {:>8.1f} KB tree".format(result["tree_bytes"] / 1024.0)
+    if result["peak_rss_mb"] is not None:
+        line += " {:>8.1f} MB peak".format(result["peak_rss_mb"])
+    return line
+
+
+def compare(old, new, threshold=0.10):
+    """
+    Compares two results files, matching the measurements of the same stage and dataset.
+
+    Input:
+    -old:  The path of the baseline results file.
+    -new:  The path of the new results file.
+    -threshold:  The relative slowdown above which a stage is reported as a regression.
+
+    Returns:
+    -rows:  A list of tuples (example, rows, cardinality, stage, old wall time, new wall time, ratio,
+        regression), for the measurements found in both files.
+    """
+
+    with open(old) as f:
+        before = json.load(f)["results"]
+    with open(new) as f:
+        after = json.load(f)["results"]
+
+    key = lambda result: (result["example"], result["rows"], result["cardinality"], result["stage"])
+    baseline = {key(result): result for result in before if "skipped" not in result}
+    rows = []
+    for result in after:
+        previous = baseline.get(key(result))
+        if previous is None or "skipped" in result:
+            continue
+        ratio = result["wall_s"] / previous["wall_s"]
+        rows.append(key(result) + (previous["wall_s"], result["wall_s"], ratio, ratio > 1 + threshold))
+    return rows
+
+
+def main(argv=None):
+    """
+    Runs the benchmarks from the command line.
+    """
+
+    import argparse
+    parser = argparse.ArgumentParser(prog="python -m decision_tree.benchmarks",
+                                     description="Benchmark training and inference on synthetic data.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000],
+                        help="numbers of rows, from 1000 up to 10000000")
+    parser.add_argument("--examples", nargs="+", default=["car", "bank"])
+    parser.add_argument("--cardinalities", type=int, nargs="+", default=None,
+                        help="numbers of values of each categorical attribute (default: those of the real data)")
+    parser.add_argument("--stages", nargs="+", default=None, help="the stages to run (default: all)")
+    parser.add_argument("--max-depth", type=int, default=6)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--legacy-limit", type=int, default=1000000,
+                        help="the largest dataset the list-of-dictionaries stages are run on")
+    parser.add_argument("--tracemalloc", action="store_true", help="also measure traced peak memory")
+    parser.add_argument("--data-dir", default=None, help="keep the generated files in this directory")
+    parser.add_argument("--out", default="benchmarks.json", help="the JSON results file")
+    parser.add_argument("--compare", default=None, metavar="BASELINE",
+                        help="compare the results with an earlier results file")
+    args = parser.parse_args(argv)
+
+    for example in args.examples:
+        if example not in ("car", "bank"):
+            parser.error("invalid example: " + repr(example) + " (choose from 'car', 'bank')")
+    run_benchmarks(args.sizes, args.examples, args.cardinalities or (None,), args.stages, args.max_depth,
+                   args.repeat, args.legacy_limit, args.tracemalloc, args.data_dir, args.out)
+
+    if args.compare is not None:
+        print("\n")
+        for example, rows, cardinality, stage, before, after, ratio, regression in compare(args.compare, args.out):
+            print("{:<6} {:>9} {:>5} {:<24} {:>9.4f}s {:>9.4f}s {:>6.2f}x{}".format(
+                example, rows, "-" if cardinality is None else cardinality, stage, before, after, ratio,
+                "  REGRESSION" if regression else ""))
+    return 0
+
+
+if __name__ == "__main__":
+    main()
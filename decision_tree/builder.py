@@ -0,0 +1,908 @@
+"""
+Growing decision trees from Datasets, serially or across a process pool.
+"""
+
+import array
+import os
+import sys
+from collections import Counter, deque
+from heapq import heappop, heappush
+from itertools import count, repeat
+from operator import add, mul, sub
+
+from . import instrument
+from .data import Dataset, attach_dataset, share_dataset
+from .criteria import _weighted_counts, best_attribute, contingency_table, majority_label, purity_functions
+from .preprocessing import prepare_dataset
+
+
+#The tuples of branch values, each with a dictionary of the position of every value in it.  All nodes with the
+#same values share them.
+_VALUES = {(): ((), {})}
+
+
+class Node(object):
+    """
+    A class for a tree node
+    This class is specifically for a decision-type tree
+    A node on a numeric attribute has a threshold and two branches: "<=" for values up to the threshold,
+    and ">" for values above it.
+    Nodes grown by grow_tree also keep the label counts of their examples, and internal nodes keep their
+    majority label, so the tree can be cut off at any depth without being grown again.
+    
+    The branches of a node are the tuple values and the list children, in the same order, and index has the
+    position of each value.  Nodes with the same values share the tuple and index, and the children of a node
+    grown from a Dataset are in the order of the codebook, so children[code] is the branch of the value with
+    that code.  Leaves that hold no examples of their own are shared, see shared_leaf, so a node can be a child
+    of several parents.  Shared leaves have no parent.
+    """
+    
+    __slots__ = ("is_leaf", "attribute", "action", "parent", "values", "index", "children", "threshold",
+                 "majority", "counts")
+    
+    def __init__(self, name='root', attribute=None, action=None, parent=None, branches=None, threshold=None,
+                 majority=None, counts=None):
+        self.is_leaf = name != "root"
+        self.attribute = attribute
+        self.action = action
+        self.parent = parent
+        self.values, self.index = _VALUES[()]
+        self.children = () if self.is_leaf else []
+        self.threshold = threshold
+        self.majority = majority
+        self.counts = counts
+    
+    def __repr__(self):
+        return self.name
+    
+    @property
+    def name(self):
+        return "leaf" if self.is_leaf else "root"
+    
+    @property
+    def branches(self):
+        """
+        A dictionary of the child for each branch value.  It is a copy, so branches are changed with add_branch.
+        """
+        return dict(zip(self.values, self.children))
+    
+    def add_branch(self, value, node=None):
+        """
+        Sets the child of a branch value.  A new value is added after the values the node already has.
+        """
+        
+        position = self.index.get(value)
+        if position is not None:
+            self.children[position] = node
+            return
+        values = self.values + (value,)
+        shared = _VALUES.get(values)
+        if shared is None:
+            shared = _VALUES[values] = (values, {v: i for i, v in enumerate(values)})
+        self.values, self.index = shared
+        self.children.append(node)
+        
+    def get_branch(self, value):
+        return self.children[self.index[value]]
+    
+    def branch_value(self, value):
+        """
+        Returns the branch that an example with the given value of the node's attribute follows.
+        """
+        if self.threshold is None:
+            return value
+        return "<=" if float(value) <= self.threshold else ">"
+    
+    def truncate(self, depth):
+        """
+        Returns a copy of the tree cut off at the given depth.  Internal nodes at that depth become leaves with
+        their majority label, so the copy is the tree grow_tree builds with max_depth=depth.  Leaves are shared
+        with the original tree.
+        """
+        
+        if self.is_leaf:
+            return self
+        if depth <= 0:
+            if self.majority is None:
+                raise ValueError("The tree has no majority labels at its internal nodes")
+            return Node(name="leaf", parent=self.parent, action=self.majority, counts=self.counts)
+        
+        node = Node(attribute=self.attribute, parent=self.parent, threshold=self.threshold, majority=self.majority,
+                    counts=self.counts)
+        for value, child in zip(self.values, self.children):
+            node.add_branch(value, child.truncate(depth - 1))
+        return node
+    
+    def nbytes(self):
+        """
+        Returns the number of bytes used by the tree: its nodes, their lists of children and their label
+        counts.  Shared leaves, the branch values and their index and the strings of attributes and labels are
+        counted once.
+        """
+        
+        seen = set()
+        total = 0
+        stack = [self]
+        while stack:
+            node = stack.pop()
+            for part in (node, node.values, node.index, node.children, node.counts, node.attribute, node.action,
+                         node.majority):
+                if part is not None and id(part) not in seen:
+                    seen.add(id(part))
+                    total += sys.getsizeof(part)
+            stack.extend(node.children)
+        return total
+    
+    def print_tree(self):
+        print("Type = " + self.name)
+        if self.attribute is not None:
+            print("Attribute = " + self.attribute)
+        if self.threshold is not None:
+            print("Threshold = " + str(self.threshold))
+        if self.parent is not None:
+            print("Parent = " + self.parent)
+        if self.action is not None:
+            print("Action = " + self.action)
+        for value, child in zip(self.values, self.children):
+            print("\n")
+            print("Value = " + value)
+            child.print_tree()
+
+
+#The shared leaves, by label and label counts
+_SHARED_LEAVES = {}
+
+
+def shared_leaf(action, counts=None):
+    """
+    Returns the leaf for a label that is shared by every tree.  It is used for the leaves that hold no examples
+    of their own, such as the leaves ID3 makes for the values that none of the examples of a node have, so
+    a tree has one such leaf per label instead of one per branch.
+    
+    Inputs:
+    -action:  The label of the leaf.
+    -counts:  None, or a tuple with the label counts of the leaf.
+    
+    Returns:
+    -leaf:  A Node, which must not be changed.
+    """
+    
+    key = (action, counts)
+    leaf = _SHARED_LEAVES.get(key)
+    if leaf is None:
+        leaf = _SHARED_LEAVES[key] = Node(name='leaf', action=action, counts=counts)
+    return leaf
+
+
+def ID3(S, Attributes, master_list, error_type, current_depth, max_depth, samples=None, weighted=False):
+    """
+    Creates a decision tree using the ID3 algorithm.
+    
+    Inputs: 
+    -S: list of dictionaries; each dictionary contains a set of key-value pairs that are strings.
+        The key is a string representing the attribute, and the value is a string representing the value of that
+        attribute.  Labels are included as an attribute in the dictionary.  
+        Each dictionary represents one example.  S can also be a Dataset from encode_examples.
+    -Attributes: set of attributes.  These are the attributes that will be searched when building the tree.
+    -master_list: A dictionary, which contains all the possible values each attribute can have
+    -error_type:  One of three types:  "entropy", "me" (majority error) or "gini" (gini index)
+    -current_depth:  The current depth of the decision tree being constructed.
+    -max_depth:  The maximum depth of the tree to be constructed.
+    -samples:  Only used when S is a Dataset.  A memoryview over an array of example indices, which are the
+        examples of the current node.  The indices are reordered in place so that each value of the chosen
+        attribute is a contiguous slice, and each child is given its slice as a view.  If None, all examples
+        of S are used.
+    -weighted:  Boolean value that represents whether the data is weighted.  If True, each example counts as
+        its weight: the "weight" key of a dictionary, or the weights of a Dataset.
+
+    returns:
+    -root_node:  A tree node
+    """
+    
+    profiler = instrument.active
+    if profiler is not None and not profiler.running("ID3"):
+        return profiler.call("ID3", ID3, S, Attributes, master_list, error_type, current_depth, max_depth, samples,
+                             weighted)
+    
+    #A Dataset is built by the non-recursive builder, in the same depth-first order as below
+    if isinstance(S, Dataset):
+        return grow_tree(S, Attributes, master_list, error_type, max_depth - current_depth, samples=samples,
+                         weighted=weighted)
+    
+    if current_depth == max_depth:
+        label = majority_label(S, weighted=weighted)
+        if profiler is not None:
+            profiler.node(current_depth, len(S), True)
+        return shared_leaf(label)
+    sample_size = len(S)
+    
+    #Test all labels to see if they are the same
+    label = S[0]["label"]
+    count = 0
+    for s in S:
+        if s["label"] != label:
+            break
+        else:
+            count = count + 1
+    
+    if count == sample_size:
+        
+        #If attributes is empty, return a leaf node with the most common label
+        if len(Attributes) == 0:
+            label = majority_label(S, weighted=weighted)
+        if profiler is not None:
+            profiler.node(current_depth, sample_size, True)
+        return shared_leaf(label)
+    
+    else:
+        root_node = Node()
+        A = best_attribute(S, Attributes, master_list, error_type, weighted=weighted)
+        root_node.attribute = A
+        if profiler is not None:
+            profiler.node(current_depth, sample_size, False, A)
+        if A in Attributes:
+            Attributes.remove(A)
+        
+        for value in master_list[A]:
+            
+            #Create new subset of examples
+            S_v = []
+            for sample in S:
+                if sample[A] == value:
+                    S_v.append(sample)
+            
+            if len(S_v) == 0:
+                maj_label = majority_label(S, weighted=weighted)
+                new_node = shared_leaf(maj_label)
+                if profiler is not None:
+                    profiler.node(current_depth + 1, 0, True)
+                
+            else:                
+                new_node = ID3(S_v, Attributes, master_list, error_type, current_depth+1, max_depth,
+                               weighted=weighted)
+                if not new_node.is_leaf:
+                    new_node.parent = root_node.attribute
+            root_node.add_branch(value, new_node)
+            
+        #Add attribute removed from list so that next iteration of recursive call has the correct attribute set
+        Attributes.add(A)
+            
+                
+    return root_node
+
+
+class _Splitter(object):
+    """
+    The state shared by all nodes of a tree grown by grow_tree.
+    The examples of a node are the slice [start, end) of the index array samples.  Each numeric attribute has
+    its own index array, sorted once by the value of the attribute, and the same slice of that array holds the
+    same examples in sorted order.  Splitting a node partitions the slice of every array stably, so the sorted
+    order is kept all the way down the tree.
+    
+    If S has binned attributes (see Binner), the splitter works from histograms instead: each node keeps the
+    label counts of every bin and every categorical value, a binned attribute is split by sweeping its bins,
+    and the histograms of the largest child are found by subtracting those of its siblings from the parent's.
+    
+    If weighted is True, each example counts as its weight in S.weights.  A splitter made with reusable=True
+    keeps a copy of its index arrays, so that reset can restore them and the same splitter can grow many trees
+    from the same examples with different weights, without sorting them again.  It also groups the examples
+    of the root by their (value, label) cell the first time each attribute is counted, so the weighted counts
+    of the root are sums over the groups.
+    """
+
+    def __init__(self, S, master_list, error_type, samples, weighted=False, reusable=False):
+        self.S = S
+        self.master_list = master_list
+        self.purity = purity_functions[error_type]
+        self.samples = samples
+        self.weights = S.weights if weighted else None
+        if weighted and self.weights is None:
+            raise ValueError("The dataset has no weights")
+        self.labels = S.labels
+        self.n_labels = len(S.codebooks[S.label])
+        #Width of a histogram row, with room for labels that are not in the codebook, as in contingency_table
+        self.width = self.n_labels + 1
+        self.hist = bool(S.edges)
+        self.sorted = {}
+        for name in S.attributes:
+            if name not in master_list and name not in S.edges:
+                column = S.columns[name]
+                self.sorted[name] = memoryview(array.array(samples.format, sorted(samples, key=column.__getitem__)))
+        #The child of each example in the node being split
+        self.branch = array.array('l', [0]) * len(S)
+        self.initial = None
+        self.groups = None
+        if reusable:
+            self.initial = [array.array(view.format, view) for view in [samples] + list(self.sorted.values())]
+            self.groups = {}
+
+    def reset(self, weights=None):
+        """
+        Restores the index arrays of a reusable splitter to their order before the last tree was grown, and
+        optionally replaces the weights of the examples.
+        """
+        
+        if self.initial is None:
+            raise ValueError("The splitter is not reusable")
+        for view, initial in zip([self.samples] + list(self.sorted.values()), self.initial):
+            view[:] = initial
+        if weights is not None:
+            self.S = self.S.reweight(weights)
+            self.weights = weights
+
+    def root_counts(self, attribute=None):
+        """
+        Returns a Counter with the total weight of the examples of the root of a reusable splitter in every
+        cell of an attribute, numbered as in histograms, or for every label code if attribute is None.
+        """
+        
+        groups = self.groups.get(attribute)
+        if groups is None:
+            samples = self.initial[0]
+            cells = map(self.labels.__getitem__, samples)
+            if attribute is not None:
+                cells = map(add, map(mul, self.S.column(attribute, samples), repeat(self.width)), cells)
+            groups = {}
+            for row, cell in zip(samples, cells):
+                groups.setdefault(cell, []).append(row)
+            self.groups[attribute] = groups
+        
+        weight = self.weights.__getitem__
+        return Counter({cell: sum(map(weight, rows)) for cell, rows in groups.items()})
+
+    def at_root(self, start, end):
+        """
+        Returns True if the weighted counts of the node [start, end) can be found with root_counts.
+        """
+        return self.groups is not None and self.weights is not None and start == 0 and end == len(self.samples)
+
+    def label_counts(self, start, end):
+        """
+        Returns the number of examples with each label code in a node, or their total weight if weighted, as
+        a tuple.
+        """
+        samples = self.samples[start:end]
+        if self.at_root(start, end):
+            cells = self.root_counts()
+        elif self.weights is None:
+            cells = Counter(map(self.labels.__getitem__, samples))
+        else:
+            cells = _weighted_counts(map(self.labels.__getitem__, samples), map(self.weights.__getitem__, samples))
+        return tuple(cells[code] for code in range(self.n_labels))
+
+    def majority(self, counts, start, end):
+        """
+        Returns the most common label of a node, given its label counts.  Ties go to the label of the first
+        example of the node that has one of the tied labels, as majority_label does.
+        """
+        
+        best = max(counts)
+        tied = [code for code in range(len(counts)) if counts[code] == best]
+        if len(tied) > 1:
+            tied = set(tied)
+            labels = self.labels
+            tied = [next((labels[row] for row in self.samples[start:end] if labels[row] in tied), min(tied))]
+        return self.S.codebooks[self.S.label][tied[0]]
+
+    def histograms(self, start, end, attributes):
+        """
+        Counts the examples of a node for every (value, label) pair of each categorical and binned attribute.
+        
+        Returns:
+        -hists:  A dictionary with a Counter of cells for each attribute.  The count of value code v and label
+            code y is in cell v * width + y.  Empty cells are left out, so a small node has a small histogram
+            however many bins its attributes have.
+        """
+        
+        S = self.S
+        width = self.width
+        samples = self.samples[start:end]
+        if self.at_root(start, end):
+            return {attribute: self.root_counts(attribute) for attribute in attributes if attribute not in self.sorted}
+        
+        labels = list(S.column(S.label, samples))
+        weights = None if self.weights is None else list(map(self.weights.__getitem__, samples))
+        hists = {}
+        for attribute in attributes:
+            if attribute not in self.sorted:
+                cells = map(add, map(mul, S.column(attribute, samples), repeat(width)), labels)
+                hists[attribute] = Counter(cells) if weights is None else _weighted_counts(cells, weights)
+        return hists
+
+    def child_histograms(self, hists, ranges, attributes):
+        """
+        Finds the histograms of the children of a split node.  Every child but the largest is counted, and the
+        histograms of the largest child are the parent's minus those of its siblings.  Weighted histograms are
+        all counted, as subtracting sums of floats leaves small errors in cells that should be empty.
+        
+        Input:
+        -hists:  The histograms of the parent node.
+        -ranges:  A list of (start, end) slices, one for each child.  Together they must hold every example of
+            the parent.
+        -attributes:  The attributes of the children.
+        
+        Returns:
+        -child_hists:  A list of histograms, one for each child.
+        """
+        
+        if self.weights is not None:
+            return [self.histograms(start, end, attributes) for start, end in ranges]
+        
+        largest = max(range(len(ranges)), key=lambda i: ranges[i][1] - ranges[i][0])
+        child_hists = [None if i == largest else self.histograms(start, end, attributes)
+                       for i, (start, end) in enumerate(ranges)]
+        rest = {}
+        for attribute in attributes:
+            if attribute in hists:
+                hist = hists[attribute]
+                for i, sibling in enumerate(child_hists):
+                    if i != largest:
+                        hist = hist - sibling[attribute]
+                rest[attribute] = hist
+        child_hists[largest] = rest
+        return child_hists
+
+    def find_split(self, start, end, attributes, counts, hists=None):
+        """
+        Finds the split of a node with the largest information gain.  Of splits with the same gain, the one on
+        the first attribute in attributes is chosen.
+        If hists is given, categorical and binned attributes are scored from the node's histograms.
+        
+        Returns:
+        -split:  A tuple (gain, attribute, threshold, sizes), where threshold is None for a categorical attribute
+            and sizes is the number (or weight) of examples in each child.  None if no attribute can split the node.
+        """
+        
+        purity = self.purity
+        total_count = sum(counts)
+        current_entropy = purity(counts)
+        samples = self.samples[start:end]
+        best = None
+        
+        for attribute in attributes:
+            if attribute in self.sorted or attribute in self.S.edges:
+                if attribute in self.sorted:
+                    split = self.numeric_split(attribute, start, end, counts, current_entropy)
+                else:
+                    split = self.binned_split(attribute, hists[attribute], counts, current_entropy)
+                if split is not None and (best is None or split[0] > best[0]):
+                    best = split
+                continue
+            
+            expected_entropy = 0.0
+            if hists is not None or self.at_root(start, end):
+                width = self.width
+                hist = hists[attribute] if hists is not None else self.root_counts(attribute)
+                table = [[hist[code * width + y] for y in range(width)]
+                         for code in range(len(self.master_list[attribute]))]
+            else:
+                table = contingency_table(self.S, attribute, self.master_list, samples, self.weights is not None)
+            for value_counts in table:
+                ratio = float(sum(value_counts)) / total_count
+                if ratio > 0:
+                    expected_entropy += ratio * purity(value_counts)
+            gain = current_entropy - expected_entropy
+            if best is None or gain > best[0]:
+                best = (gain, attribute, None, [sum(value_counts) for value_counts in table])
+        
+        return best
+
+    def candidates(self, start, end, attributes, hists=None):
+        """
+        Returns the number of splits that find_split scores in a node: one for each categorical attribute, and
+        one for each threshold of a numeric or binned attribute.  This is only used to profile grow_tree.
+        """
+        
+        count = 0
+        for attribute in attributes:
+            if attribute in self.sorted:
+                column = self.S.columns[attribute]
+                count += max(len(set(map(column.__getitem__, self.sorted[attribute][start:end]))) - 1, 0)
+            elif attribute in self.S.edges:
+                count += max(len(set(cell // self.width for cell in hists[attribute])) - 1, 0)
+            else:
+                count += 1
+        return count
+
+    def numeric_split(self, attribute, start, end, counts, current_entropy):
+        """
+        Finds the best threshold of a numeric attribute in a node with one sweep over its sorted examples.
+        The label counts on each side of the threshold are updated one example at a time, and every point
+        where the value changes is a candidate threshold.
+        """
+        
+        purity = self.purity
+        column = self.S.columns[attribute]
+        labels = self.labels
+        rows = self.sorted[attribute][start:end]
+        #Examples whose label is not in the codebook are counted in the last cell, as in histograms
+        left = [0] * self.width
+        right = list(counts) + [0]
+        if self.weights is None:
+            right[-1] = len(rows) - sum(counts)
+        else:
+            right[-1] = sum(self.weights[row] for row in rows if labels[row] == self.n_labels)
+        total_count = sum(right)
+        left_count = 0
+        best = None
+        
+        weights = repeat(1) if self.weights is None else map(self.weights.__getitem__, rows)
+        previous = column[rows[0]]
+        for row, weight in zip(rows, weights):
+            value = column[row]
+            if value != previous:
+                ratio = float(left_count) / total_count
+                gain = current_entropy - ratio * purity(left) - (1 - ratio) * purity(right)
+                if best is None or gain > best[0]:
+                    best = (gain, attribute, (previous + value) / 2, [left_count, total_count - left_count])
+                previous = value
+            label = labels[row]
+            left[label] += weight
+            right[label] -= weight
+            left_count += weight
+        
+        return best
+
+    def binned_split(self, attribute, hist, counts, current_entropy):
+        """
+        Finds the best threshold of a binned attribute in a node with one sweep over the bins of its histogram
+        that are not empty.  The threshold is a bin number: examples in that bin or below go to the first child.
+        """
+        
+        purity = self.purity
+        width = self.width
+        left = [0] * width
+        #The last cell counts the examples whose label is not in the codebook, so right never goes negative
+        right = list(counts) + [sum(count for cell, count in hist.items() if cell % width == width - 1)]
+        total_count = sum(right)
+        left_count = 0
+        best = None
+        
+        for b in sorted(set(cell // width for cell in hist))[:-1]:
+            row = [hist[b * width + y] for y in range(width)]
+            left = list(map(add, left, row))
+            right = list(map(sub, right, row))
+            left_count += sum(row)
+            ratio = float(left_count) / total_count
+            gain = current_entropy - ratio * purity(left) - (1 - ratio) * purity(right)
+            if best is None or gain > best[0]:
+                best = (gain, attribute, b, [left_count, total_count - left_count])
+        
+        return best
+
+    def partition(self, start, end, attribute, threshold):
+        """
+        Reorders the slice of every index array so that the examples of each child of the split are contiguous,
+        in the order of the branches.
+        
+        Returns:
+        -sizes:  A Counter with the number of examples of each branch code.  Examples whose value is not in the
+            codebook of the attribute have the code len(codebook), and are at the end of the slice.
+        """
+        
+        column = self.S.columns[attribute]
+        branch = self.branch
+        if threshold is None:
+            for row in self.samples[start:end]:
+                branch[row] = column[row]
+        else:
+            for row in self.samples[start:end]:
+                branch[row] = column[row] > threshold
+        
+        for samples in [self.samples] + list(self.sorted.values()):
+            view = samples[start:end]
+            view[:] = array.array(view.format, sorted(view, key=branch.__getitem__))
+        return Counter(map(branch.__getitem__, self.samples[start:end]))
+
+
+def grow_tree(S, Attributes, master_list, error_type, max_depth=float('inf'), order="depth", max_leaves=None,
+              samples=None, defer=None, max_features=None, rng=None, weighted=False, splitter=None):
+    """
+    Creates a decision tree from a Dataset using the ID3 algorithm, without recursion.
+    The nodes still to be built are kept in a work queue.  Each work item carries its own examples (a slice of
+    one shared index array) and its own tuple of remaining attributes, so no state is shared between items.
+    
+    Attributes of S that are not in master_list are numeric.  A numeric attribute is split in two at the
+    threshold with the largest information gain, found with one sweep over the examples sorted by that
+    attribute.  Unlike a categorical attribute, it stays available to the nodes below the split.  A binned
+    attribute of S (see Binner) is split at the bin edge with the largest information gain, and the threshold
+    of the node is that edge, so the tree can be applied to the unbinned data.
+    
+    Inputs: 
+    -S:  A Dataset.
+    -Attributes:  set of attributes.  These are the attributes that will be searched when building the tree.
+        The set is not modified.  Splits with the same gain are broken in favor of the attribute that comes
+        first in the columns of S, whatever the order of the set.
+    -master_list: A dictionary, which contains all the possible values each attribute can have
+    -error_type:  One of three types:  "entropy", "me" (majority error) or "gini" (gini index)
+    -max_depth:  The maximum depth of the tree to be constructed.
+    -order:  The order in which the nodes are built.  One of three types:
+        "depth" -- depth-first, the same order as the recursive ID3
+        "breadth" -- breadth-first, one level of the tree at a time
+        "best" -- best-first, the node whose split reduces the impurity of the whole tree the most is built first
+    -max_leaves:  The maximum number of leaves of the tree.  A node is not split when its split would take the
+        tree over this budget.  If None, the number of leaves is not limited.
+    -samples:  An optional memoryview over an array of example indices to build the tree from.
+        If None, all examples of S are used.  The array is reordered as the tree is built.
+    -defer:  An optional function, called as defer(parent, value, depth, start, end, attributes) for every node
+        that could be split, where [start, end) is the node's slice of samples.  If it returns True, the
+        node's subtree is left to the caller: the node is attached as a leaf, which the caller can replace
+        with the subtree, and the slice of samples is not used again.  Not used in best-first order.
+    -max_features:  If given, each node is split on the best of a random subset of this many of its attributes,
+        as in a random forest.  If None, all attributes are searched.
+    -rng:  A random.Random that draws the subsets of attributes.  Only used with max_features.
+    -weighted:  If True, each example counts as its weight in S.weights.
+    -splitter:  An optional reusable _Splitter for S, which is used instead of a new one, so that its index
+        arrays are not sorted again.  Its samples and weights are used instead of samples and weighted.
+    
+    returns:
+    -root_node:  A tree node
+    """
+    
+    profiler = instrument.active
+    if profiler is not None and not profiler.running("grow_tree"):
+        tree = profiler.call("grow_tree", grow_tree, S, Attributes, master_list, error_type, max_depth, order,
+                             max_leaves, samples, defer, max_features, rng, weighted, splitter)
+        profiler.tree(tree)
+        return tree
+    
+    if splitter is not None:
+        samples = splitter.samples
+    elif samples is None:
+        samples = memoryview(array.array('l', range(len(S))))
+    total_count = len(samples)
+    best_first = order == "best"
+    if order not in ("depth", "breadth", "best"):
+        raise ValueError("Unknown order: " + str(order))
+    if max_features is not None and rng is None:
+        raise ValueError("rng must be given with max_features")
+    if splitter is None:
+        splitter = _Splitter(S, master_list, error_type, samples, weighted)
+    search, partition = splitter.find_split, splitter.partition
+    histograms, child_histograms = splitter.histograms, splitter.child_histograms
+    if profiler is not None:
+        search, partition = profiler.timed("split search", search), profiler.timed("partition", partition)
+        histograms = profiler.timed("histograms", histograms)
+        child_histograms = profiler.timed("histograms", child_histograms)
+    
+    #Work items are (parent node, branch value, depth, start, end, attributes, label counts, split, histograms)
+    work = deque()
+    heap = []
+    tiebreak = count()
+    leaves = 1
+    tree = []
+    
+    def attach(parent, value, node):
+        if parent is None:
+            tree[:] = [node]
+        else:
+            node.parent = parent.attribute
+            parent.add_branch(value, node)
+    
+    def find_split(start, end, attributes, counts, hists):
+        if max_features is not None and len(attributes) > max_features:
+            #Search a random subset of the attributes, in their original order
+            chosen = set(rng.sample(attributes, max_features))
+            attributes = tuple(a for a in attributes if a in chosen)
+        if profiler is not None:
+            profiler.count("candidate splits", splitter.candidates(start, end, attributes, hists))
+        return search(start, end, attributes, counts, hists)
+    
+    def add_node(parent, value, depth, start, end, attributes, hists):
+        #Leaves are attached right away.  Nodes that can be split are put in the work queue.
+        counts = splitter.label_counts(start, end)
+        if depth >= max_depth or len(attributes) == 0 or counts.count(0) >= len(counts) - 1:
+            attach(parent, value, Node(name='leaf', action=splitter.majority(counts, start, end), counts=counts))
+        elif best_first:
+            #The node is a leaf until it is taken from the queue and split
+            attach(parent, value, Node(name='leaf', action=splitter.majority(counts, start, end), counts=counts))
+            split = find_split(start, end, attributes, counts, hists)
+            if split is not None:
+                priority = -split[0] * (end - start) / total_count
+                item = (parent, value, depth, start, end, attributes, counts, split, hists)
+                heappush(heap, (priority, next(tiebreak), item))
+        elif defer is not None and defer(parent, value, depth, start, end, attributes):
+            attach(parent, value, Node(name='leaf', action=splitter.majority(counts, start, end), counts=counts))
+        else:
+            work.append((parent, value, depth, start, end, attributes, counts, None, hists))
+    
+    #Attributes are searched in the column order of S, so ties are broken the same way in every process and
+    #at every max_depth.  ID3 on a list of dictionaries breaks them in the iteration order of its set instead.
+    attributes = tuple(name for name in S.attributes if name in Attributes)
+    hists = histograms(0, total_count, attributes) if splitter.hist else None
+    add_node(None, None, 0, 0, total_count, attributes, hists)
+    
+    while work or heap:
+        if best_first:
+            parent, value, depth, start, end, attributes, counts, split, hists = heappop(heap)[2]
+        elif order == "depth":
+            parent, value, depth, start, end, attributes, counts, split, hists = work.pop()
+        else:
+            parent, value, depth, start, end, attributes, counts, split, hists = work.popleft()
+        
+        if split is None:
+            split = find_split(start, end, attributes, counts, hists)
+        if split is None or (max_leaves is not None and leaves + len(split[3]) - 1 > max_leaves):
+            if not best_first:
+                leaf = Node(name='leaf', action=splitter.majority(counts, start, end), counts=counts)
+                attach(parent, value, leaf)
+            continue
+        gain, A, threshold, sizes = split
+        leaves += len(sizes) - 1
+        
+        maj_label = splitter.majority(counts, start, end)
+        #The threshold of a binned attribute is a bin number, and the node holds the edge of that bin
+        node_threshold = S.edges[A][threshold] if A in S.edges else threshold
+        root_node = Node(attribute=A, threshold=node_threshold, majority=maj_label, counts=counts)
+        attach(parent, value, root_node)
+        if threshold is None:
+            values = master_list[A]
+            remaining = tuple(attribute for attribute in attributes if attribute != A)
+        else:
+            values = ("<=", ">")
+            remaining = attributes
+        
+        sizes = partition(start, end, A, threshold)
+        sizes = [sizes[code] for code in range(len(values))]
+        
+        children = []
+        child_start = start
+        for value, size in zip(values, sizes):
+            if size == 0:
+                root_node.add_branch(value, shared_leaf(maj_label, (0,) * len(counts)))
+            else:
+                #Reserve the branch so the branches keep the order of the values
+                root_node.add_branch(value, None)
+                children.append((value, child_start, child_start + size))
+            child_start += size
+        
+        child_hists = [None] * len(children)
+        if splitter.hist and depth + 1 < max_depth and remaining:
+            ranges = [(child_start, child_end) for value, child_start, child_end in children]
+            if sum(sizes) == end - start:
+                child_hists = child_histograms(hists, ranges, remaining)
+            else:
+                #Examples whose value is not in master_list are in no child, so the parent's counts can't be used
+                child_hists = [histograms(child_start, child_end, remaining)
+                               for child_start, child_end in ranges]
+        children = [child + (child_hist,) for child, child_hist in zip(children, child_hists)]
+        
+        #Children are added in reverse for depth-first order, so they are taken from the stack in order
+        if order == "depth":
+            children.reverse()
+        for value, child_start, child_end, child_hist in children:
+            add_node(root_node, value, depth + 1, child_start, child_end, remaining, child_hist)
+    
+    return tree[0]
+
+
+#The state of a worker of grow_tree_parallel: the shared Dataset and index array, and the build parameters
+_build_state = {}
+
+
+def _init_build_worker(data_name, samples_name, master_list, error_type):
+    """
+    Attaches the shared Dataset and index array of a parallel build in a worker process.
+    """
+    
+    from multiprocessing import shared_memory
+    
+    S, _, shared = attach_dataset(data_name)
+    samples_shared = shared_memory.SharedMemory(name=samples_name)
+    _build_state.update(S=S, samples=samples_shared.buf.cast('l'), master_list=master_list,
+                        error_type=error_type, shared=(shared, samples_shared))
+
+
+def _grow_subtree(start, end, attributes, max_depth):
+    """
+    Grows the subtree of the examples in the slice [start, end) of the shared index array.
+    """
+    
+    state = _build_state
+    return grow_tree(state["S"], attributes, state["master_list"], state["error_type"], max_depth,
+                     samples=state["samples"][start:end])
+
+
+def grow_tree_parallel(S, Attributes, master_list, error_type, max_depth=float('inf'), workers=None,
+                       min_examples=1000):
+    """
+    Creates the same decision tree as grow_tree, with its subtrees built in parallel by a pool of processes.
+    The top of the tree is grown breadth-first in this process.  Once a node has few enough examples that
+    the pool has work for every worker, its subtree is sent to a worker, unless it has fewer than min_examples
+    examples, in which case it is cheaper to build it here.  The Dataset and the index array are in shared
+    memory, so a worker is only sent the node's slice of the index array and its attributes, and it reorders
+    that slice in place.  The subtrees that come back replace the leaves that held their place.
+    
+    Inputs:
+    -S:  A Dataset.
+    -Attributes:  set of attributes.  These are the attributes that will be searched when building the tree.
+    -master_list: A dictionary, which contains all the possible values each attribute can have
+    -error_type:  One of three types:  "entropy", "me" (majority error) or "gini" (gini index)
+    -max_depth:  The maximum depth of the tree to be constructed.
+    -workers:  The number of worker processes.  If None, one for each CPU.  If 1, grow_tree is used.
+    -min_examples:  The smallest number of examples of a subtree that is sent to a worker.
+    
+    returns:
+    -root_node:  A tree node
+    """
+    
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if workers == 1 or len(S) < min_examples:
+        return grow_tree(S, Attributes, master_list, error_type, max_depth)
+    
+    import multiprocessing
+    from multiprocessing import shared_memory
+    
+    #Nodes larger than this are split here, so there are at least as many subtrees as workers
+    max_examples = max(len(S) // workers, min_examples)
+    
+    data_shared = share_dataset(S)
+    samples_shared = shared_memory.SharedMemory(create=True, size=len(S) * array.array('l').itemsize)
+    samples = samples_shared.buf.cast('l')
+    try:
+        samples[:] = array.array('l', range(len(S)))
+        with multiprocessing.Pool(workers, _init_build_worker,
+                                  (data_shared.name, samples_shared.name, master_list, error_type)) as pool:
+            subtrees = []
+            
+            def defer(parent, value, depth, start, end, attributes):
+                if parent is None or not min_examples <= end - start <= max_examples:
+                    return False
+                result = pool.apply_async(_grow_subtree, (start, end, attributes, max_depth - depth))
+                subtrees.append((parent, value, result))
+                return True
+            
+            tree = grow_tree(S, Attributes, master_list, error_type, max_depth, order="breadth", samples=samples,
+                             defer=defer)
+            for parent, value, result in subtrees:
+                subtree = result.get()
+                subtree.parent = parent.attribute
+                parent.add_branch(value, subtree)
+    finally:
+        samples.release()
+        for shared in (data_shared, samples_shared):
+            shared.close()
+            shared.unlink()
+    
+    return tree
+
+
+def build_decision_tree(path, example, purity_type, max_depth, replace=False, cache_dir=None, numeric="median",
+                        workers=1):
+    """
+    Creates a decision tree from the given dataset and parameters
+    
+    Inputs:
+    -path:  A string, representing the path of the dataset to be processed.
+    -example:  One of three types:  "bank", "car", "tennis".  Represents the type of dataset to be used.
+    -purity_type:  One of three types:  "entropy", "me" and "gini".  Represents how information gain will be
+        calculated in the decision tree.
+    -max_depth:  The maximum depth of the decision tree
+    -replace:  If False, "unknown" attribute values are considered a value.  Otherwise if True, "unknown" 
+               attribute values are replaced with the majority value of that attribute.
+    -cache_dir:  An optional directory for caching the processed data.  See prepare_dataset.
+    -numeric:  "median" to turn numeric attributes into "high"/"low", "exact" to split them on thresholds, or
+               "hist" to split them on the edges of at most 255 bins.  See prepare_dataset.
+    -workers:  The number of processes that build the tree.  If more than 1, or None for one for each CPU,
+               the subtrees are built in parallel with grow_tree_parallel.
+               
+    Returns:
+    -tree:  A decision tree
+    -medians:  A dictionary with key-value pairs.  The key is the attribute represented as a string and 
+        the value is the corresponding numerical median.  This is only returned when "bank" is the example type.
+        Otherwise, None is returned.
+    -majority: A dictionary with key-value pairs .  The key is the attribute represented as a string and 
+        the value is the corresponding majority element for that attribute.  This is only returned when "bank" 
+        is the example type.  Otherwise, None is returned.
+
+    """
+    
+    S, medians, majority = prepare_dataset(path, example, "train", replace=replace, cache_dir=cache_dir,
+                                           numeric=numeric)
+    master_list = S.codebooks
+    Attributes = set(S.attributes)
+    
+    if workers != 1:
+        return grow_tree_parallel(S, Attributes, master_list, purity_type, max_depth, workers), medians, majority
+    return ID3(S, Attributes, master_list, purity_type, 0, max_depth), medians, majority
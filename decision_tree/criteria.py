@@ -0,0 +1,395 @@
+"""
+Purity measures and the information gain of splitting a Dataset on its attributes.
+"""
+
+import array
+import math
+from collections import Counter
+from functools import lru_cache
+from itertools import repeat
+from operator import add, mul
+
+from . import instrument
+from .data import Dataset
+
+
+def _weighted_counts(keys, weights):
+    """
+    Sums the weights of each key.  This is Counter(keys) with a weight for each key instead of 1.
+    """
+    counts = {}
+    get = counts.get
+    for key, weight in zip(keys, weights):
+        counts[key] = get(key, 0) + weight
+    return Counter(counts)
+
+
+def majority_label(S, attribute="label", replace=False, samples=None, weighted=False):
+    """
+    Determines the majority label of a given attribute.
+    
+    Input: 
+    S:  A list of dictionaries with key-value pairs represented as strings, or a Dataset.
+    attribute: The attribute that will be searched 
+    replace:  If replace is True, the value "unknown" will not be counted in determing the majority label
+    samples:  If S is a Dataset, an optional sequence of example indices to restrict the count to.
+    weighted:  If True, each example counts as its weight: the "weight" key of a dictionary, or the weights
+        of a Dataset.
+    
+    Returns:  a string representing the most common value in the list for the key attribute 
+    """
+    if isinstance(S, Dataset):
+        values = S.codebooks[attribute]
+        if weighted:
+            cells = _weighted_counts(S.column(attribute, samples), S.sample_weights(samples))
+        else:
+            cells = Counter(S.column(attribute, samples))
+        counts = [cells[code] for code in range(len(values))]
+        if replace and "unknown" in values:
+            counts[values.index("unknown")] = -1
+        best = max(counts)
+        tied = [code for code in range(len(values)) if counts[code] == best]
+        if len(tied) > 1:
+            #Ties go to the value that is seen first, as with a list of dictionaries
+            tied = set(tied)
+            return values[next((code for code in S.column(attribute, samples) if code in tied), min(tied))]
+        return values[tied[0]]
+    
+    counts = {}
+    
+    for s in S:
+        value = s[attribute]
+        weight = s["weight"] if weighted else 1
+        if value in counts:
+            if value != "unknown":
+                counts[value] += weight
+            else:
+                if not replace:
+                    counts[value] += weight
+        else:
+            if value != "unknown":
+                counts[value] = weight
+            else:
+                if not replace:
+                    counts[value] = weight
+    
+    return max(counts, key=counts.get)
+
+
+def label_counts(S, samples=None, weighted=False):
+    """
+    Counts the number of examples with each label in a given dataset S.
+    
+    Input:
+    -S: A list of dictionaries with key-value pairs represented as strings, or a Dataset.
+    -samples:  If S is a Dataset, an optional sequence of example indices to restrict the count to.
+    -weighted:  If True, the weights of the examples are summed instead.  See majority_label.
+    
+    Returns:
+    -counts:  A list of the number of examples with each label.  Labels that do not occur are left out.
+    """
+    
+    if isinstance(S, Dataset):
+        if weighted:
+            cells = _weighted_counts(S.column(S.label, samples), S.sample_weights(samples))
+        else:
+            cells = Counter(S.column(S.label, samples))
+        return [cells[code] for code in sorted(cells)]
+    
+    counts = {}
+    for s in S:
+        value = s['label']
+        weight = s["weight"] if weighted else 1
+        if value in counts:
+            counts[value] += weight
+        else:
+            counts[value] = weight
+    return list(counts.values())
+
+
+#c * log2(c) for every count c below the length of the table.  The table grows as larger counts are seen,
+#up to _NLOGN_LIMIT entries; the entropy of larger or weighted counts is computed with math.log.
+_nlogn = array.array('d', [0.0])
+_NLOGN_LIMIT = 1 << 20
+
+
+def _nlogn_table(total):
+    """
+    Returns the table of c * log2(c), extended if needed so that it holds every count up to total.
+    """
+    
+    if total >= len(_nlogn):
+        size = min(max(total + 1, 2 * len(_nlogn), 1024), _NLOGN_LIMIT)
+        _nlogn.extend(c * math.log2(c) for c in range(len(_nlogn), size))
+    return _nlogn
+
+
+def entropy_counts(counts):
+    """
+    Calculates the entropy of a list of label counts.
+    Integer counts use the n*log(n) table: the entropy of counts c with total n is
+    (n*log(n) - sum of c*log(c)) / n, so no logarithm is taken.
+    
+    Input:
+    -counts: A list of the number of examples with each label.  Zero counts are allowed.
+    
+    Returns:
+    -entropy:  A float, which is the calculated entropy of the counts.
+    """
+    
+    total_count = sum(counts)
+    if total_count <= 0:
+        return 0.0
+    if type(total_count) is int and total_count < _NLOGN_LIMIT:
+        table = _nlogn_table(total_count)
+        return max((table[total_count] - sum(map(table.__getitem__, counts))) / total_count, 0.0)
+    
+    entropy = 0.0
+    for count in counts:
+        if count > 0:
+            ratio = float(count) / total_count
+            entropy += -1 * ratio * math.log(ratio,2)
+    
+    return entropy
+
+
+def majority_error_counts(counts):
+    """
+    Calculates the majority error of a list of label counts.
+    
+    Input:
+    -counts: A list of the number of examples with each label.  Zero counts are allowed.
+    
+    Returns:
+    -majority_error:  A float, which is the calculated majority error of the counts.
+    """
+    
+    total_count = sum(counts)
+    if total_count == 0:
+        return 0.0
+    return 1 - float(max(counts)) / total_count
+
+
+def gini_counts(counts):
+    """
+    Calculates the gini index of a list of label counts.
+    
+    Input:
+    -counts: A list of the number of examples with each label.  Zero counts are allowed.
+    
+    Returns:
+    -gini:  A float, which is the calculated gini index of the counts.
+    """
+    
+    total_count = sum(counts)
+    if total_count == 0:
+        return 0.0
+    gini = 0.0
+    for count in counts:
+        ratio = float(count) / total_count
+        gini += ratio**2
+    
+    return 1 - gini
+
+
+#The number of count vectors remembered by each memoized purity function
+PURITY_CACHE_SIZE = 1 << 16
+
+
+def _memoize(function):
+    """
+    Wraps a purity function in a bounded LRU memo keyed on the tuple of counts, so that a label distribution
+    that recurs is only evaluated once.  The memo of the wrapper is its cached attribute.
+    """
+    
+    cached = lru_cache(maxsize=PURITY_CACHE_SIZE)(function)
+    
+    def purity(counts):
+        return cached(tuple(counts))
+    purity.cached = cached
+    purity.__name__ = function.__name__
+    purity.__doc__ = function.__doc__
+    return purity
+
+
+#Purity functions on label counts, keyed by error_type.  They are memoized: see purity_cache_info.
+purity_functions = {
+    "entropy": _memoize(entropy_counts),
+    "me": _memoize(majority_error_counts),
+    "gini": _memoize(gini_counts)
+}
+
+
+def purity_cache_info():
+    """
+    Returns the hits, misses and size of the memo of each purity function, keyed by error_type.
+    """
+    return {error_type: function.cached.cache_info()._asdict() for error_type, function in purity_functions.items()}
+
+
+def clear_purity_cache():
+    """
+    Empties the memos of the purity functions and resets their counters.
+    """
+    for function in purity_functions.values():
+        function.cached.cache_clear()
+
+
+def entropy(S, weighted=False):
+    """
+    Calculates the entropy of a given dataset S.
+    
+    Input:
+    -S: A list of dictionaries with key-value pairs represented as strings, or a Dataset. 
+    -weighted:  If True, each example counts as its weight.  See majority_label.
+    
+    Returns:
+    -entropy:  A float, which is the calculated entropy for the key 'label'.
+    """
+    
+    if len(S) == 0:
+        return 0.0
+    return purity_functions["entropy"](label_counts(S, weighted=weighted))
+
+
+def majority_error(S, weighted=False):
+    """
+    Calculates the majority error of a given dataset S.
+    
+    Input:
+    -S: A list of dictionaries with key-value pairs represented as strings, or a Dataset. 
+    -weighted:  If True, each example counts as its weight.  See majority_label.
+    
+    Returns:
+    -majority_error:  A float, which is the calculated majority error for the key 'label'.
+    """
+    
+    if len(S) == 0:
+        return 0.0
+    return purity_functions["me"](label_counts(S, weighted=weighted))
+
+
+def gini_index(S, weighted=False):
+    """
+    Calculates the gini index for a given dataset S.
+    
+    Input:
+    -S: A list of dictionaries with key-value pairs represented as strings, or a Dataset. 
+    -weighted:  If True, each example counts as its weight.  See majority_label.
+    
+    Returns:
+    -gini:  A float, which is the calculated gini index for the key 'label'.
+    """
+    
+    if len(S) == 0:
+        return 0.0
+    return purity_functions["gini"](label_counts(S, weighted=weighted))
+
+
+def contingency_table(S, attribute, master_list, samples=None, weighted=False):
+    """
+    Counts the examples of S for every (value, label) pair of an attribute in a single pass over S.
+    
+    Input:
+    -S:  A list of dictionaries with key-value pairs represented as strings, or a Dataset.
+    -attribute:  The attribute whose values make up the rows of the table.
+    -master_list: A dictionary, which contains all the possible values each attribute can have
+    -samples:  If S is a Dataset, an optional sequence of example indices to restrict the count to.
+    -weighted:  If True, the weights of the examples are summed instead.  See majority_label.
+    
+    Returns:
+    -table:  A list with one list of label counts for each value in master_list[attribute], in the same order.
+        Examples whose value is not in master_list[attribute] are not counted.
+    """
+    
+    values = master_list[attribute]
+    
+    if isinstance(S, Dataset):
+        #Combine the value code and label code into one cell number and count all cells at once
+        n_labels = len(S.codebooks[S.label]) + 1
+        codes = S.column(attribute, samples)
+        cells = map(add, map(mul, codes, repeat(n_labels)), S.column(S.label, samples))
+        cells = _weighted_counts(cells, S.sample_weights(samples)) if weighted else Counter(cells)
+        return [[cells[code * n_labels + y] for y in range(n_labels)] for code in range(len(values))]
+    
+    rows = {value: {} for value in values}
+    for s in S:
+        row = rows.get(s[attribute])
+        if row is not None:
+            label = s["label"]
+            row[label] = row.get(label, 0) + (s["weight"] if weighted else 1)
+    return [list(rows[value].values()) for value in values]
+
+
+def split_gains(S, Attributes, master_list, error_type, samples=None, tables=None, weighted=False):
+    """
+    Calculates the information gain of splitting S on each attribute in a set of attributes.
+    Each attribute is scored from its contingency table, so S is scanned once per attribute.
+    
+    Input:
+    -S:  A list of examples, which are dictionaries of key-values represented attributes and values respectively.
+        S can also be a Dataset.
+    -Attributes:  A set of attributes that will be compared
+    -master_list: A dictionary, which contains all the possible values each attribute can have
+    error_type:  One of three types:  "entropy", "me" (majority error) or "gini" (gini index)
+    -samples:  If S is a Dataset, an optional sequence of example indices to restrict the search to.
+    -tables:  An optional dictionary.  If given, the contingency table of every attribute is stored in it
+        so that the caller can partition the examples without counting them again.
+    -weighted:  If True, each example counts as its weight.  See majority_label.
+    
+    returns:
+    -information_gain:  A dictionary with the information gain of each attribute, in the order of Attributes.
+    """
+    
+    information_gain = {}
+    purity = purity_functions[error_type]
+    total_count = len(S) if samples is None else len(samples)
+    current_entropy = 0.0
+    if total_count > 0:
+        counts = label_counts(S, samples, weighted)
+        current_entropy = purity(counts)
+        if weighted:
+            total_count = sum(counts)
+
+    for attribute in Attributes:
+        expected_entropy = 0.0
+        table = contingency_table(S, attribute, master_list, samples, weighted)
+        if tables is not None:
+            tables[attribute] = table
+
+        for counts in table:
+            ratio = float(sum(counts)) / total_count
+            if ratio > 0:
+                expected_entropy += ratio * purity(counts)
+        
+        information_gain[attribute] = current_entropy - expected_entropy
+        
+    return information_gain
+
+
+def best_attribute(S, Attributes, master_list, error_type, samples=None, tables=None, weighted=False):
+    """
+    Determines the attribute A that produces the greatest information gain amongst a set of attributes.
+    The information gain is determined by the error_type.
+    
+    Input:
+    -S:  A list of examples, which are dictionaries of key-values represented attributes and values respectively.
+        S can also be a Dataset.
+    -Attributes:  A set of attributes that will be compared
+    -master_list: A dictionary, which contains all the possible values each attribute can have
+    error_type:  One of three types:  "entropy", "me" (majority error) or "gini" (gini index)
+    -samples:  If S is a Dataset, an optional sequence of example indices to restrict the search to.
+    -tables:  An optional dictionary, which is filled with the contingency table of every attribute.
+    -weighted:  If True, each example counts as its weight.  See majority_label.
+    
+    returns:
+    -A:  a string that is the attribute with the largest information gain in the given dataset S. 
+    """
+    
+    if instrument.active is not None and not instrument.active.running("best_attribute"):
+        instrument.active.count("candidate splits", len(Attributes))
+        return instrument.active.call("best_attribute", best_attribute, S, Attributes, master_list, error_type,
+                                      samples, tables, weighted)
+    
+    information_gain = split_gains(S, Attributes, master_list, error_type, samples, tables, weighted)
+    return max(information_gain, key=information_gain.get)
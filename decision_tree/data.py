@@ -0,0 +1,567 @@
+"""
+Reading examples into columnar Datasets, and saving, mapping and sharing them in a binary format.
+"""
+
+import array
+import csv
+import json
+import mmap
+import os
+import struct
+import sys
+from itertools import islice
+
+from . import instrument
+
+
+class Dataset(object):
+    """
+    A class for a columnar, integer-encoded set of examples.
+    Each attribute is stored as a compact array of category codes, one code per example.  The code of a value
+    is its position in the attribute's codebook, which is the tuple of values from create_attribute_dictionary.
+    A value that is not in the codebook is stored as len(codebook) and never matches a branch of the tree.
+    Attributes without a codebook are numeric, and are stored as an array of floats.  A numeric attribute that
+    has been binned (see Binner) is stored as an array of bin numbers instead, and edges holds the upper
+    edge of each of its bins.
+    The examples can have weights, held in an array of floats next to the columns.  They are used by the
+    functions that take weighted=True.
+    """
+
+    def __init__(self, columns, codebooks, label="label", edges=None, weights=None):
+        self.columns = columns
+        self.codebooks = codebooks
+        self.label = label
+        self.edges = edges or {}
+        self.weights = weights
+        self.attributes = tuple(name for name in columns if name != label)
+        self.lookup = {}
+        for name, values in codebooks.items():
+            self.lookup[name] = {value: code for code, value in enumerate(values)}
+
+    def __len__(self):
+        return len(self.columns[self.label])
+
+    def __repr__(self):
+        return "Dataset(" + str(len(self)) + " examples, " + str(len(self.attributes)) + " attributes)"
+
+    @property
+    def labels(self):
+        return self.columns[self.label]
+
+    def decode(self, attribute, code):
+        """
+        Returns the value of an attribute for a given code, or None if the code is out of the codebook.
+        The values of numeric attributes are returned as they are.
+        """
+        if attribute not in self.codebooks:
+            return code
+        values = self.codebooks[attribute]
+        return values[code] if code < len(values) else None
+
+    def column(self, attribute, samples=None):
+        """
+        Returns the codes of an attribute, either for every example or for the examples at the indices in samples.
+        """
+        column = self.columns[attribute]
+        return column if samples is None else map(column.__getitem__, samples)
+
+    def sample_weights(self, samples=None):
+        """
+        Returns the weights of the examples, either for every example or for the examples at the indices in
+        samples.
+        """
+        if self.weights is None:
+            raise ValueError("The dataset has no weights")
+        return self.weights if samples is None else map(self.weights.__getitem__, samples)
+
+    def reweight(self, weights):
+        """
+        Returns a Dataset with the same columns and the given weights.  No column is copied.
+        """
+        if weights is not None and len(weights) != len(self):
+            raise ValueError("There must be one weight for each example")
+        return Dataset(self.columns, self.codebooks, self.label, self.edges, weights)
+
+    def example(self, i):
+        """
+        Returns example i as a dictionary of attribute-value strings, the same form that read_file returns.
+        """
+        return {name: self.decode(name, column[i]) for name, column in self.columns.items()}
+
+    def take(self, indices):
+        """
+        Returns a new Dataset containing only the examples at the given indices.
+        """
+        columns = {}
+        for name, column in self.columns.items():
+            columns[name] = array.array(_typecode(column), [column[i] for i in indices])
+        weights = None if self.weights is None else array.array('d', [self.weights[i] for i in indices])
+        return Dataset(columns, self.codebooks, self.label, self.edges, weights)
+
+    def nbytes(self):
+        """
+        Returns the number of bytes used by the encoded columns.
+        """
+        return sum(column.itemsize * len(column) for column in self.columns.values())
+
+
+def _typecode(column):
+    """
+    Returns the typecode of a column, which is either an array or a memoryview of a mapped file.
+    """
+    return column.typecode if isinstance(column, array.array) else column.format
+
+
+def _code_type(codebook):
+    """
+    Returns the smallest array typecode that can hold every code of a codebook, including the out-of-codebook code.
+    """
+    return 'B' if len(codebook) < 256 else 'H'
+
+
+def encode_examples(S, master_list, label="label"):
+    """
+    Encodes a list of examples into a columnar Dataset.
+    
+    Input:
+    -S: A list of dictionaries with key-value pairs represented as strings, as returned by read_file.
+    -master_list: A dictionary, which contains all the possible values each attribute can have.  These tuples
+        become the codebooks of the encoded columns.
+    -label: The attribute that holds the label of each example.
+    
+    Returns:
+    -data:  A Dataset with one integer-coded column per attribute in master_list.
+    """
+    
+    columns = {}
+    for name, values in master_list.items():
+        lookup = {value: code for code, value in enumerate(values)}
+        missing = len(values)
+        columns[name] = array.array(_code_type(values), [lookup.get(s[name], missing) for s in S])
+    
+    return Dataset(columns, master_list, label)
+
+
+class Schema(object):
+    """
+    A class that describes the columns of a csv data file.
+    Categorical columns are encoded with a codebook.  A categorical column without a codebook in the schema
+    gets one while the file is read, with the values in the order they are first seen.
+    Numeric columns are read as floats.
+    """
+
+    def __init__(self, columns, numeric=(), codebooks=None, label="label"):
+        self.columns = tuple(columns)
+        self.numeric = frozenset(numeric)
+        self.codebooks = dict(codebooks or {})
+        self.label = label
+
+    def __repr__(self):
+        return "Schema(" + ", ".join(self.columns) + ")"
+
+
+def create_schema(example_type):
+    """
+    Creates the schema of the csv files of a dataset.
+    Currently this function supports three types of datasets:  "car", "bank", and "tennis".
+    New datasets are read by giving read_file or read_chunks a Schema instead of an example type.
+    
+    Inputs:
+    -example_type:  "car", "bank" or "tennis"
+    
+    Returns:
+    -schema:  a Schema with the columns in file order and the codebooks of the categorical columns
+    """
+    
+    if example_type == "car":
+        columns = ("buying", "maint", "doors", "persons", "lug_boot", "safety", "label")
+        numeric = ()
+        
+    elif example_type == "bank":
+        columns = ("age", "job", "marital", "education", "default", "balance", "housing", "loan", "contact",
+                   "day", "month", "duration", "campaign", "pdays", "previous", "poutcome", "label")
+        numeric = ("age", "balance", "day", "duration", "campaign", "pdays", "previous")
+        
+    elif example_type == "tennis":
+        columns = ("outlook", "temp", "humidity", "wind", "label")
+        numeric = ()
+        
+    else:
+        raise ValueError("Unknown example type: " + str(example_type))
+    
+    attributes = create_attribute_dictionary(example_type)
+    codebooks = {name: attributes[name] for name in columns if name not in numeric}
+    return Schema(columns, numeric, codebooks)
+
+
+def read_file(path, label):
+    """
+    Reads and processes a csv file for use in a decision tree algorithm.
+    
+    Input: 
+    -path: a string representing the file path of the csv file to be opened.  
+    -label: represents the type of examples to be processed.  One of three possible values: "car","bank","tennis"
+        label can also be a Schema, for any other dataset.
+    
+
+    Returns:  
+    -S: a list of dictionaries.  Each dictionary represents a single instance (or one line in the data file)
+        with key-value pairs representing attributes and values.      
+    """    
+    
+    if instrument.active is not None and not instrument.active.running("read_file"):
+        return instrument.active.call("read_file", read_file, path, label)
+    
+    schema = label if isinstance(label, Schema) else create_schema(label)
+    width = len(schema.columns)
+    
+    #Lines that do not have one term for each column are skipped
+    with open(path, 'r', newline='') as f:
+        return [dict(zip(schema.columns, terms)) for terms in csv.reader(f) if len(terms) == width]
+
+
+def read_chunks(path, schema, chunk_size=65536):
+    """
+    Reads a csv file in chunks and encodes each chunk into columns.
+    Only one chunk of lines is held in memory at a time, so files of any size can be read.
+    
+    Input:
+    -path: a string representing the file path of the csv file to be opened.
+    -schema:  A Schema, or one of the example types "car", "bank" and "tennis".
+    -chunk_size:  The number of lines in each chunk.
+    
+    Returns:
+    -chunks:  A generator of Datasets, one for each chunk of lines.  Codes refer to the same codebooks in every
+        chunk.  A codebook that is built while reading only grows, so the codebooks of the last chunk are
+        valid for all chunks.
+    """
+    
+    if not isinstance(schema, Schema):
+        schema = create_schema(schema)
+    width = len(schema.columns)
+    
+    #Categorical columns without a codebook collect their values while reading
+    vocabularies = {}
+    for name in schema.columns:
+        if name not in schema.numeric:
+            vocabularies[name] = list(schema.codebooks.get(name, ()))
+    lookups = {name: {value: code for code, value in enumerate(values)} for name, values in vocabularies.items()}
+    
+    with open(path, 'r', newline='') as f:
+        reader = csv.reader(f)
+        while True:
+            rows = list(islice(reader, chunk_size))
+            if not rows:
+                break
+            rows = [terms for terms in rows if len(terms) == width]
+            if not rows:
+                continue
+            
+            columns = {}
+            for name, values in zip(schema.columns, zip(*rows)):
+                if name in schema.numeric:
+                    columns[name] = array.array('d', map(float, values))
+                    continue
+                lookup = lookups[name]
+                if name in schema.codebooks:
+                    missing = len(vocabularies[name])
+                    codes = [lookup.get(value, missing) for value in values]
+                else:
+                    vocabulary = vocabularies[name]
+                    codes = []
+                    for value in values:
+                        code = lookup.get(value)
+                        if code is None:
+                            code = lookup[value] = len(vocabulary)
+                            vocabulary.append(value)
+                        codes.append(code)
+                columns[name] = array.array(_code_type(vocabularies[name]), codes)
+            
+            codebooks = {name: tuple(values) for name, values in vocabularies.items()}
+            yield Dataset(columns, codebooks, schema.label)
+
+
+def load_dataset(path, schema, chunk_size=65536):
+    """
+    Reads a csv file into a single Dataset, one chunk at a time.
+    
+    Input:
+    -path: a string representing the file path of the csv file to be opened.
+    -schema:  A Schema, or one of the example types "car", "bank" and "tennis".
+    -chunk_size:  The number of lines read at a time.
+    
+    Returns:
+    -data:  A Dataset with one column for each column of the schema.
+    """
+    
+    if instrument.active is not None and not instrument.active.running("load_dataset"):
+        return instrument.active.call("load_dataset", load_dataset, path, schema, chunk_size)
+    
+    data = None
+    for chunk in read_chunks(path, schema, chunk_size):
+        if data is None:
+            data = chunk
+            continue
+        for name, column in chunk.columns.items():
+            #A codebook that grew past 255 values needs a wider typecode
+            target = data.columns[name]
+            if column.itemsize > target.itemsize:
+                target = data.columns[name] = array.array(column.typecode, target)
+            if column.typecode != target.typecode:
+                column = array.array(target.typecode, column)
+            target.extend(column)
+        data = Dataset(data.columns, chunk.codebooks, data.label)
+    
+    if data is None:
+        if not isinstance(schema, Schema):
+            schema = create_schema(schema)
+        columns = {}
+        for name in schema.columns:
+            columns[name] = array.array('d' if name in schema.numeric else 'B')
+        data = Dataset(columns, {name: tuple(values) for name, values in schema.codebooks.items()}, schema.label)
+    return data
+
+
+#The first bytes of a dataset file, followed by the length of the header and the header itself
+DATASET_MAGIC = b"DTDATA01"
+
+
+def _align(offset, size=8):
+    """
+    Rounds an offset up to a multiple of size.
+    """
+    return (offset + size - 1) // size * size
+
+
+def _read_header(buffer, magic, name):
+    """
+    Reads the JSON header of a binary file that starts with magic, as written by save_dataset or save_model.
+    
+    Returns:
+    -header:  The header, as a dictionary.
+    -start:  The position of the first array after the header.
+    """
+    
+    if buffer[:len(magic)] != magic:
+        raise ValueError(name + " is not a " + ("dataset" if magic == DATASET_MAGIC else "model") + " file")
+    length = struct.unpack("<Q", buffer[len(magic):len(magic) + 8])[0]
+    header = json.loads(bytes(buffer[len(magic) + 8:len(magic) + 8 + length]).decode("utf-8"))
+    if header["byteorder"] != sys.byteorder:
+        raise ValueError(name + " was saved with a different byte order")
+    return header, _align(len(magic) + 8 + length)
+
+
+def _dataset_layout(data, metadata=None):
+    """
+    Lays out a Dataset in the binary format of save_dataset.
+    
+    Returns:
+    -header:  The JSON header, as bytes.
+    -columns:  A list of the positions of the columns, relative to start.
+    -start:  The position of the first column.
+    -size:  The total size in bytes.
+    """
+    
+    columns = []
+    offset = 0
+    for name, column in data.columns.items():
+        nbytes = len(column) * column.itemsize
+        columns.append({"name": name, "typecode": _typecode(column), "offset": offset, "length": len(column)})
+        offset = _align(offset + nbytes)
+    
+    header = json.dumps({
+        "label": data.label,
+        "byteorder": sys.byteorder,
+        "columns": columns,
+        "codebooks": {name: list(values) for name, values in data.codebooks.items()},
+        "edges": {name: list(values) for name, values in data.edges.items()},
+        "metadata": metadata
+    }).encode("utf-8")
+    start = _align(len(DATASET_MAGIC) + 8 + len(header))
+    
+    return header, columns, start, start + offset
+
+
+def _read_dataset(buffer, name):
+    """
+    Creates a Dataset whose columns are views into a buffer that holds a Dataset in the binary format of
+    save_dataset.  name is used in error messages.
+    
+    Returns:
+    -data:  A Dataset.
+    -metadata:  The metadata that was saved with the data.
+    """
+    
+    buffer = memoryview(buffer)
+    header, start = _read_header(buffer, DATASET_MAGIC, name)
+    
+    columns = {}
+    for entry in header["columns"]:
+        column = buffer[start + entry["offset"]:].cast(entry["typecode"])
+        columns[entry["name"]] = column[:entry["length"]]
+    codebooks = {name: tuple(values) for name, values in header["codebooks"].items()}
+    edges = {name: tuple(values) for name, values in header.get("edges", {}).items()}
+    
+    return Dataset(columns, codebooks, header["label"], edges), header["metadata"]
+
+
+def save_dataset(data, path, metadata=None):
+    """
+    Saves a Dataset to a binary file that can be memory-mapped by map_dataset.
+    The file holds a JSON header with the codebooks and the position of each column, followed by the raw bytes
+    of each column.  The file is written under a temporary name and then renamed, so a reader never sees
+    a partly written file.
+    
+    Input:
+    -data:  A Dataset.
+    -path:  A string, representing the path of the file to be written.
+    -metadata:  An optional JSON-serializable object that is stored with the data.
+    """
+    
+    header, columns, start, size = _dataset_layout(data, metadata)
+    
+    temp_path = path + "." + str(os.getpid()) + ".tmp"
+    with open(temp_path, "wb") as f:
+        f.write(DATASET_MAGIC)
+        f.write(struct.pack("<Q", len(header)))
+        f.write(header)
+        for entry, column in zip(columns, data.columns.values()):
+            f.seek(start + entry["offset"])
+            f.write(memoryview(column).cast("B"))
+        f.truncate(size)
+    os.replace(temp_path, path)
+
+
+def map_dataset(path):
+    """
+    Loads a Dataset saved by save_dataset by memory-mapping the file.
+    The columns are read-only memoryviews into the mapped file, so no column is parsed or copied, and processes
+    that map the same file share one physical copy of it.
+    
+    Input:
+    -path:  A string, representing the path of the file to be loaded.
+    
+    Returns:
+    -data:  A Dataset.
+    -metadata:  The metadata that was saved with the data.
+    """
+    
+    with open(path, "rb") as f:
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    
+    return _read_dataset(mapped, path)
+
+
+def share_dataset(data, metadata=None):
+    """
+    Copies a Dataset into a new block of shared memory, in the binary format of save_dataset.  Other processes
+    can attach the block by name with attach_dataset.  The caller must unlink the block when it is done.
+    
+    Returns:
+    -shared:  A multiprocessing.shared_memory.SharedMemory.
+    """
+    
+    from multiprocessing import shared_memory
+    
+    header, columns, start, size = _dataset_layout(data, metadata)
+    shared = shared_memory.SharedMemory(create=True, size=size)
+    buffer = shared.buf
+    buffer[:len(DATASET_MAGIC)] = DATASET_MAGIC
+    buffer[len(DATASET_MAGIC):len(DATASET_MAGIC) + 8] = struct.pack("<Q", len(header))
+    buffer[len(DATASET_MAGIC) + 8:len(DATASET_MAGIC) + 8 + len(header)] = header
+    for entry, column in zip(columns, data.columns.values()):
+        column = memoryview(column).cast("B")
+        buffer[start + entry["offset"]:start + entry["offset"] + len(column)] = column
+    return shared
+
+
+def attach_dataset(name):
+    """
+    Attaches a Dataset that another process shared with share_dataset.  The columns are views into the shared
+    memory, so nothing is copied.
+    
+    Returns:
+    -data:  A Dataset.
+    -metadata:  The metadata that was shared with the data.
+    -shared:  The SharedMemory, which must be kept open while the Dataset is used.
+    """
+    
+    from multiprocessing import shared_memory
+    
+    shared = shared_memory.SharedMemory(name=name)
+    data, metadata = _read_dataset(shared.buf, name)
+    return data, metadata, shared
+
+
+def create_attribute_dictionary(example_type, replace=False):
+    """
+    Creates a master dictionary for the attributes that are used for learning a decision tree.
+    This is a convenience function and will vary for each type of problem.
+    Currently this function supports three types of datasets:  "car", "bank", and "tennis".
+    The key is a string and represents a particular attribute in the sample data.
+    The value is a tuple of strings and represents all possible values that the attribute can take.
+    
+    Inputs:
+    -example_type:   "car" -- represents the car data example
+                    "bank" -- represents the bank data example
+                    "tennis" -- represents tennis game example used for testing implementation
+    -replace:  If False, "unknown" attribute values are considered a value.  Otherwise if True, "unknown" 
+               attribute values are replaced with the majority value of that attribute.
+    Returns:
+    -attributes:  a dictionary of attributes and values
+    """
+    
+    if example_type == "car":
+        attributes = {
+            "buying":("vhigh", "high", "med", "low"),
+            "maint":("vhigh", "high", "med", "low"),
+            "doors":("2", "3", "4", "5more"),
+            "persons":("2", "4", "more"),
+            "lug_boot":("small", "med", "big"),
+            "safety":("low", "med", "high"),
+            "label":("unacc", "acc", "good", "vgood")
+        }
+        
+    if example_type == "bank":
+        attributes = {
+            "age": ("high", "low"),
+            "marital": ("married", "divorced", "single"),
+            "default": ("yes", "no"),
+            "balance": ("high", "low"),
+            "housing": ("yes", "no"),
+            "loan": ("yes", "no"),
+            "day":("high", "low"),
+            "month":("jan", "feb", "mar", "apr", "may", "jun", "jul", "aug", 
+                     "sep", "oct", "nov", "dec"),
+            "duration": ("high", "low"),
+            "campaign": ("high", "low"),
+            "pdays": ("high", "low"),
+            "previous": ("high", "low"),
+            "label": ("yes", "no")
+        }
+        
+        if not replace:
+            attributes["job"] = ("admin.", "unknown", "unemployed", "management", "housemaid",
+                    "entrepreneur", "student", "blue-collar", "self-employed", 
+                    "retired", "technician","services")
+            attributes["education"] = ("unknown", "secondary","primary","tertiary")
+            attributes["contact"] = ("unknown","telephone","cellular")
+            attributes["poutcome"] = ("unknown", "other", "failure", "success")
+        else:
+            attributes["job"] = ("admin.", "unemployed", "management", "housemaid",
+                    "entrepreneur", "student", "blue-collar", "self-employed", 
+                    "retired", "technician","services")
+            attributes["education"] = ("secondary","primary","tertiary")
+            attributes["contact"] = ("telephone","cellular")
+            attributes["poutcome"] = ("other", "failure", "success")
+        
+    if example_type == "tennis":
+        attributes = {
+            "outlook":("sunny","overcast","rainy"),
+            "temp":("hot","medium","cool"),
+            "humidity":("high","normal","low"),
+            "wind":("strong","weak"),
+            "label":("yes","no")
+        }
+    
+    return attributes
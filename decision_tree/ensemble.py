@@ -0,0 +1,296 @@
+"""
+Random forests, bagging and AdaBoost over the tree builder.
+"""
+
+import array
+import math
+import os
+import random
+from itertools import compress, repeat
+from operator import add, eq, gt, mul, ne
+
+from .data import attach_dataset, share_dataset
+from .builder import _Splitter, grow_tree
+from .predictor import compile_tree
+
+
+def _argmax(scores):
+    """
+    Finds the label code with the largest score for every example.
+    
+    Input:
+    -scores:  A list with an array for each label code, holding the score of each example for that label.
+    
+    Returns:
+    -predictions:  An array with the label code of each example.  Ties go to the lowest code.
+    """
+    
+    predictions = array.array('h', [0]) * len(scores[0])
+    most = scores[0]
+    for code in range(1, len(scores)):
+        more = list(map(gt, scores[code], most))
+        predictions = array.array('h', [code if m else p for m, p in zip(more, predictions)])
+        most = list(map(max, scores[code], most))
+    return predictions
+
+
+#The state of a worker of RandomForest.fit: the shared Dataset and the parameters of the forest
+_forest_state = {}
+
+
+def _init_forest_worker(data_name, forest):
+    """
+    Attaches the shared Dataset of a forest in a worker process.
+    """
+    S, _, shared = attach_dataset(data_name)
+    _forest_state.update(S=S, forest=forest, shared=shared)
+
+
+def _grow_forest_worker(seed):
+    """
+    Grows one tree of a forest in a worker process.
+    """
+    return _forest_state["forest"]._grow(_forest_state["S"], seed)
+
+
+class RandomForest(object):
+    """
+    A class for a random forest of decision trees grown by grow_tree from one Dataset.
+    Each tree is grown from a bootstrap sample of the examples, drawn as an array of example indices, so the
+    examples are never copied.  Each node is split on the best of a random subset of its attributes.
+    Every tree draws its sample and subsets from its own seed, which is drawn from the seed of the forest, so
+    a forest is the same whatever the number of workers.
+    The trees are kept compiled, and the forest predicts the label with the most votes, or the label with the
+    lowest code among the labels with the most votes.
+    """
+
+    def __init__(self, n_trees=100, purity_type="entropy", max_depth=float('inf'), max_features="sqrt",
+                 bootstrap=True, seed=0, workers=1):
+        """
+        Inputs:
+        -n_trees:  The number of trees.
+        -purity_type:  One of three types:  "entropy", "me" and "gini".
+        -max_depth:  The maximum depth of each tree.
+        -max_features:  The number of attributes searched at each node.  Either a number, "sqrt" or "log2" for
+            the square root or logarithm of the number of attributes, or None to search all attributes.
+        -bootstrap:  If True, each tree is grown from a bootstrap sample.  Otherwise, from all examples.
+        -seed:  The seed of the random numbers of the forest.
+        -workers:  The number of processes that grow the trees.  If None, one for each CPU.
+        """
+        self.n_trees = n_trees
+        self.purity_type = purity_type
+        self.max_depth = max_depth
+        self.max_features = max_features
+        self.bootstrap = bootstrap
+        self.seed = seed
+        self.workers = workers
+        self.trees = []
+
+    def __repr__(self):
+        return type(self).__name__ + "(" + str(len(self.trees)) + " trees)"
+
+    def _features(self, n_attributes):
+        """
+        Returns the number of attributes searched at each node, or None for all of them.
+        """
+        if self.max_features == "sqrt":
+            return max(1, int(math.sqrt(n_attributes)))
+        if self.max_features == "log2":
+            return max(1, int(math.log(n_attributes, 2)))
+        return self.max_features
+
+    def _grow(self, S, seed):
+        """
+        Grows and compiles one tree of the forest.
+        """
+        
+        rng = random.Random(seed)
+        if self.bootstrap:
+            samples = array.array('l', [rng.randrange(len(S)) for _ in range(len(S))])
+        else:
+            samples = array.array('l', range(len(S)))
+        tree = grow_tree(S, set(S.attributes), S.codebooks, self.purity_type, self.max_depth,
+                         samples=memoryview(samples), max_features=self._features(len(S.attributes)), rng=rng)
+        return compile_tree(tree, S.codebooks, S.label)
+
+    def fit(self, S):
+        """
+        Grows the trees of the forest from a Dataset.  With more than one worker, the Dataset is put in shared
+        memory once, and each worker draws the samples of its trees itself, so only seeds and compiled trees
+        are sent between processes.
+        
+        Returns:
+        -self
+        """
+        
+        seeds = random.Random(self.seed)
+        seeds = [seeds.getrandbits(64) for _ in range(self.n_trees)]
+        workers = self.workers
+        if workers is None:
+            workers = os.cpu_count() or 1
+        
+        if workers == 1:
+            self.trees = [self._grow(S, seed) for seed in seeds]
+            return self
+        
+        import multiprocessing
+        
+        shared = share_dataset(S)
+        try:
+            with multiprocessing.Pool(workers, _init_forest_worker, (shared.name, self)) as pool:
+                self.trees = pool.map(_grow_forest_worker, seeds, chunksize=1)
+        finally:
+            shared.close()
+            shared.unlink()
+        return self
+
+    def predict_votes(self, data):
+        """
+        Counts the votes of the trees for every example of a Dataset.
+        
+        Returns:
+        -votes:  A list with an array for each label code, holding the number of votes of each example for
+            that label.
+        """
+        
+        if not self.trees:
+            raise ValueError("The forest must be fitted before it is used")
+        n_labels = len(self.trees[0].codebooks[self.trees[0].label])
+        votes = [array.array('l', [0]) * len(data) for _ in range(n_labels)]
+        for tree in self.trees:
+            predictions = tree.predict_batch(data)
+            for code in range(n_labels):
+                votes[code] = array.array('l', map(add, votes[code], map(eq, predictions, repeat(code))))
+        return votes
+
+    def predict_batch(self, data):
+        """
+        Predicts the label code of every example of a Dataset by a vote of the trees.
+        """
+        
+        return _argmax(self.predict_votes(data))
+
+    def predict(self, data):
+        """
+        Predicts the label of every example of a Dataset, as strings.
+        """
+        
+        labels = self.trees[0].codebooks[self.trees[0].label]
+        return [labels[code] for code in self.predict_batch(data)]
+
+
+class Bagging(RandomForest):
+    """
+    A class for bagged decision trees: a RandomForest whose nodes search all of their attributes.
+    """
+
+    def __init__(self, n_trees=100, purity_type="entropy", max_depth=float('inf'), seed=0, workers=1):
+        RandomForest.__init__(self, n_trees, purity_type, max_depth, None, True, seed, workers)
+
+
+class AdaBoost(object):
+    """
+    A class for AdaBoost with decision stumps or shallow trees, using the SAMME rule for more than two labels.
+    Every round grows a tree from the same Dataset, with the weights of the examples that the last tree
+    misclassified increased.  The rounds share one reusable _Splitter, so the examples are encoded and the
+    numeric attributes sorted only once.  Each round only updates the weights and the cached scores of the
+    training examples, from which the training error of the ensemble after every round is known.
+    """
+
+    def __init__(self, n_rounds=100, max_depth=1, purity_type="entropy"):
+        """
+        Inputs:
+        -n_rounds:  The largest number of rounds.  Boosting stops early if a tree is perfect, or no better than
+            chance.
+        -max_depth:  The maximum depth of each tree.  1 for decision stumps.
+        -purity_type:  One of three types:  "entropy", "me" and "gini".
+        """
+        self.n_rounds = n_rounds
+        self.max_depth = max_depth
+        self.purity_type = purity_type
+        self.trees = []
+        self.alphas = []
+        self.training_errors = []
+
+    def __repr__(self):
+        return "AdaBoost(" + str(len(self.trees)) + " rounds)"
+
+    def fit(self, S):
+        """
+        Boosts trees on a Dataset.  Any weights of S are replaced by uniform weights.
+        
+        Returns:
+        -self
+        """
+        
+        n = len(S)
+        n_labels = len(S.codebooks[S.label])
+        labels = S.labels
+        weights = array.array('d', [1.0 / n]) * n
+        S = S.reweight(weights)
+        splitter = _Splitter(S, S.codebooks, self.purity_type, memoryview(array.array('l', range(n))),
+                             weighted=True, reusable=True)
+        attributes = set(S.attributes)
+        scores = [array.array('d', [0.0]) * n for _ in range(n_labels)]
+        self.trees, self.alphas, self.training_errors = [], [], []
+        
+        for _ in range(self.n_rounds):
+            splitter.reset(weights)
+            tree = grow_tree(S, attributes, S.codebooks, self.purity_type, self.max_depth, splitter=splitter)
+            tree = compile_tree(tree, S.codebooks, S.label)
+            predictions = tree.predict_batch(S)
+            wrong = list(map(ne, predictions, labels))
+            error = math.fsum(compress(weights, wrong)) / math.fsum(weights)
+            if error >= 1 - 1.0 / n_labels:
+                break
+            alpha = 1.0 if error <= 0 else math.log((1 - error) / error) + math.log(n_labels - 1)
+            self.trees.append(tree)
+            self.alphas.append(alpha)
+            
+            for code in range(n_labels):
+                scores[code] = array.array('d', map(add, scores[code],
+                                                    map(mul, map(eq, predictions, repeat(code)), repeat(alpha))))
+            self.training_errors.append(float(sum(map(ne, _argmax(scores), labels))) / n)
+            if error <= 0:
+                break
+            
+            #Increase the weights of the misclassified examples, and normalize the weights
+            factor = math.exp(alpha)
+            weights = [weight * factor if w else weight for weight, w in zip(weights, wrong)]
+            total = math.fsum(weights)
+            weights = array.array('d', [weight / total for weight in weights])
+        
+        return self
+
+    def predict_scores(self, data):
+        """
+        Sums the weights (alphas) of the trees that predict each label for every example of a Dataset.
+        
+        Returns:
+        -scores:  A list with an array for each label code, holding the score of each example for that label.
+        """
+        
+        if not self.trees:
+            raise ValueError("The ensemble must be fitted before it is used")
+        n_labels = len(self.trees[0].codebooks[self.trees[0].label])
+        scores = [array.array('d', [0.0]) * len(data) for _ in range(n_labels)]
+        for tree, alpha in zip(self.trees, self.alphas):
+            predictions = tree.predict_batch(data)
+            for code in range(n_labels):
+                scores[code] = array.array('d', map(add, scores[code],
+                                                    map(mul, map(eq, predictions, repeat(code)), repeat(alpha))))
+        return scores
+
+    def predict_batch(self, data):
+        """
+        Predicts the label code of every example of a Dataset by a weighted vote of the trees.
+        """
+        return _argmax(self.predict_scores(data))
+
+    def predict(self, data):
+        """
+        Predicts the label of every example of a Dataset, as strings.
+        """
+        
+        labels = self.trees[0].codebooks[self.trees[0].label]
+        return [labels[code] for code in self.predict_batch(data)]
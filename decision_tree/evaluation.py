@@ -0,0 +1,324 @@
+"""
+Scoring models on encoded or streamed Datasets: confusion matrices, per-class metrics and cross-validation.
+"""
+
+import array
+import os
+import random
+from collections import Counter
+
+from . import instrument
+from .data import Dataset, attach_dataset, read_chunks, share_dataset
+from .builder import Node, grow_tree
+from .predictor import compile_tree
+from .preprocessing import Preprocessor
+
+
+class ConfusionMatrix(object):
+    """
+    A class for the counts of the (true label, predicted label) pairs of a set of examples.
+    counts[i][j] is the number of examples with label code i that were predicted as label code j.  Matrices of
+    disjoint sets of examples, such as the chunks of a file or the folds of a cross-validation, are combined
+    with +.
+    """
+
+    def __init__(self, labels, counts=None):
+        self.labels = tuple(labels)
+        n = len(self.labels)
+        self.counts = [[0] * n for _ in range(n)] if counts is None else [list(row) for row in counts]
+
+    def __repr__(self):
+        return ("ConfusionMatrix(" + str(self.total()) + " examples, accuracy " + str(round(self.accuracy(), 4)) +
+                ")")
+
+    def __add__(self, other):
+        if self.labels != other.labels:
+            raise ValueError("The matrices have different labels")
+        return ConfusionMatrix(self.labels, [list(map(sum, zip(row, other_row)))
+                                             for row, other_row in zip(self.counts, other.counts)])
+
+    def add(self, actual, predicted):
+        """
+        Counts the examples of one batch.
+
+        Inputs:
+        -actual:  A sequence with the true label code of each example.  Examples whose label is not in the
+            codebook are not counted.
+        -predicted:  A sequence with the predicted label code of each example.
+        """
+
+        n = len(self.labels)
+        for (i, j), count in Counter(zip(actual, predicted)).items():
+            if i < n:
+                self.counts[i][j] += count
+
+    def total(self):
+        return sum(map(sum, self.counts))
+
+    def accuracy(self):
+        """
+        Returns the fraction of the examples that were predicted correctly, or 0.0 if there are none.
+        """
+        total = self.total()
+        return float(sum(self.counts[i][i] for i in range(len(self.labels)))) / total if total else 0.0
+
+    def error(self):
+        return 1.0 - self.accuracy() if self.total() else 0.0
+
+    def class_metrics(self):
+        """
+        Returns the precision, recall, F1 score and support of each label.
+
+        Returns:
+        -metrics:  A dictionary with a dictionary for each label, with the keys "precision", "recall", "f1" and
+            "support".  A ratio with nothing to divide by is 0.0.
+        """
+
+        metrics = {}
+        for i, label in enumerate(self.labels):
+            correct = self.counts[i][i]
+            support = sum(self.counts[i])
+            predicted = sum(row[i] for row in self.counts)
+            precision = float(correct) / predicted if predicted else 0.0
+            recall = float(correct) / support if support else 0.0
+            f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+            metrics[label] = {"precision": precision, "recall": recall, "f1": f1, "support": support}
+        return metrics
+
+    def macro_f1(self):
+        """
+        Returns the mean F1 score of the labels that have examples.
+        """
+        scores = [metric["f1"] for metric in self.class_metrics().values() if metric["support"]]
+        return sum(scores) / len(scores) if scores else 0.0
+
+    def report(self):
+        """
+        Returns the matrix and the metrics of each label as a table of text.
+        """
+
+        width = max([len(str(label)) for label in self.labels] + [9])
+        lines = [" " * width + " " + " ".join("{:>{}}".format(str(label), width) for label in self.labels)]
+        for label, row in zip(self.labels, self.counts):
+            lines.append("{:>{}} ".format(str(label), width) + " ".join("{:>{}}".format(c, width) for c in row))
+        lines.append("")
+        lines.append("{:>{}} {:>9} {:>9} {:>9} {:>9}".format("label", width, "precision", "recall", "f1",
+                                                             "support"))
+        for label, metric in self.class_metrics().items():
+            lines.append("{:>{}} {:>9.4f} {:>9.4f} {:>9.4f} {:>9}".format(str(label), width, metric["precision"],
+                                                                        metric["recall"], metric["f1"],
+                                                                        metric["support"]))
+        lines.append("")
+        lines.append("accuracy {:.4f}, macro F1 {:.4f}, {} examples".format(self.accuracy(), self.macro_f1(),
+                                                                          self.total()))
+        return "\n".join(lines)
+
+
+def _batches(data, chunk_size):
+    """
+    Splits a Dataset into Datasets of at most chunk_size examples.  The columns of each batch are slices of the
+    columns of data.
+    """
+
+    if chunk_size is None or len(data) <= chunk_size:
+        yield data
+        return
+    for start in range(0, len(data), chunk_size):
+        columns = {name: column[start:start + chunk_size] for name, column in data.columns.items()}
+        weights = None if data.weights is None else data.weights[start:start + chunk_size]
+        yield Dataset(columns, data.codebooks, data.label, data.edges, weights)
+
+
+def evaluate(model, data, chunk_size=65536):
+    """
+    Scores a model on a Dataset or a stream of Datasets, one batch at a time.
+
+    Inputs:
+    -model:  A tree of Nodes, or any model with predict_batch: a CompiledTree, RandomForest, AdaBoost or
+        IncrementalTree.  A tree of Nodes is compiled with the codebooks of the first batch.
+    -data:  A Dataset, or an iterable of Datasets with the same codebooks, such as the chunks of read_chunks.
+        The examples are never all held in memory at once when data is an iterable.
+    -chunk_size:  The number of examples of a Dataset that are predicted at a time, or None to predict all of
+        them at once.
+
+    Returns:
+    -matrix:  A ConfusionMatrix with the labels of the label codebook of the data.
+    """
+
+    if instrument.active is not None and not instrument.active.running("evaluate"):
+        return instrument.active.call("evaluate", evaluate, model, data, chunk_size)
+
+    batches = _batches(data, chunk_size) if isinstance(data, Dataset) else data
+    matrix = None
+    for batch in batches:
+        if matrix is None:
+            matrix = ConfusionMatrix(batch.codebooks[batch.label])
+            if isinstance(model, Node):
+                model = compile_tree(model, batch.codebooks, batch.label)
+        matrix.add(batch.labels, model.predict_batch(batch))
+    if matrix is None:
+        raise ValueError("There are no examples to evaluate")
+    return matrix
+
+
+def evaluate_file(model, path, example, medians=None, majority=None, replace=False, numeric="median",
+                  chunk_size=65536):
+    """
+    Scores a model on a data file, reading and encoding it one chunk at a time with read_chunks, so files
+    larger than memory can be scored.  The bank data is processed with a Preprocessor made from the training
+    medians and majority values, as prepare_dataset does in test mode.
+
+    Inputs:
+    -model:  See evaluate.
+    -path:  A string, representing the path of the data file.
+    -example:  One of three types:  "bank", "car", "tennis".
+    -medians, majority, replace, numeric:  See prepare_dataset.
+    -chunk_size:  The number of lines read at a time.
+
+    Returns:
+    -matrix:  A ConfusionMatrix.
+    """
+
+    chunks = read_chunks(path, example, chunk_size)
+    if example == "bank":
+        preprocessor = Preprocessor(replace, medians, majority, numeric == "median")
+        chunks = (preprocessor.transform(chunk) for chunk in chunks)
+    return evaluate(model, chunks, None)
+
+
+def fold_indices(n, k, seed=0):
+    """
+    Splits the example indices 0..n-1 into k folds of nearly equal size, after shuffling them with the seed.
+
+    Returns:
+    -folds:  A list of k arrays of example indices, each sorted.
+    """
+
+    if not 2 <= k <= n:
+        raise ValueError("The number of folds must be between 2 and the number of examples")
+    order = list(range(n))
+    random.Random(seed).shuffle(order)
+    return [array.array('l', sorted(order[i * n // k:(i + 1) * n // k])) for i in range(k)]
+
+
+def _run_fold(S, folds, task):
+    """
+    Grows the tree of one fold and purity type on the other folds, and scores it on the fold at every depth.
+    """
+
+    fold, purity_type, depths = task
+    train = array.array('l')
+    for i, indices in enumerate(folds):
+        if i != fold:
+            train.extend(indices)
+    tree = grow_tree(S, set(S.attributes), S.codebooks, purity_type, max(depths), samples=memoryview(train))
+    test = S.take(folds[fold])
+    predictions = compile_tree(tree, S.codebooks, S.label).predict_at_depths(test, depths)
+    matrices = {}
+    for depth in depths:
+        matrices[depth] = ConfusionMatrix(S.codebooks[S.label])
+        matrices[depth].add(test.labels, predictions[depth])
+    return matrices
+
+
+#The state of a worker of cross_validate: the shared Dataset and the folds
+_fold_state = {}
+
+
+def _init_fold_worker(data_name, folds):
+    """
+    Attaches the shared Dataset of a cross-validation in a worker process.
+    """
+    S, _, shared = attach_dataset(data_name)
+    _fold_state.update(S=S, folds=folds, shared=shared)
+
+
+def _fold_worker(task):
+    return _run_fold(_fold_state["S"], _fold_state["folds"], task)
+
+
+def cross_validate(S, k=5, purity_types=("entropy",), depths=(float('inf'),), seed=0, workers=1):
+    """
+    Runs k-fold cross-validation of grow_tree on one Dataset, for every purity type and depth.
+    The folds are index arrays into S, so no fold is copied to train on.  For each fold and purity type, one
+    tree of the largest depth is grown, and the trees of the smaller depths are scored by cutting it off (see
+    CompiledTree.predict_at_depths), so a whole grid of depths costs one tree.  With more than one worker, S
+    is put in shared memory once and the (fold, purity type) tasks are spread over a pool of processes.
+
+    Inputs:
+    -S:  A Dataset.
+    -k:  The number of folds.
+    -purity_types:  The purity types to test:  "entropy", "me" or "gini".
+    -depths:  The maximum depths to test.
+    -seed:  The seed of the shuffle that assigns examples to folds.
+    -workers:  The number of processes, or None for one per CPU.
+
+    Returns:
+    -results:  A dictionary with the list of the ConfusionMatrix of each fold for every (depth, purity type).
+        The sum of the list is the matrix of all examples.
+    """
+
+    folds = fold_indices(len(S), k, seed)
+    depths = sorted(set(depths))
+    tasks = [(fold, purity_type, depths) for purity_type in purity_types for fold in range(k)]
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    if workers == 1:
+        fold_results = [_run_fold(S, folds, task) for task in tasks]
+    else:
+        import multiprocessing
+
+        shared = share_dataset(S)
+        try:
+            with multiprocessing.Pool(min(workers, len(tasks)), _init_fold_worker, (shared.name, folds)) as pool:
+                fold_results = pool.map(_fold_worker, tasks, chunksize=1)
+        finally:
+            shared.close()
+            shared.unlink()
+
+    results = {}
+    for (fold, purity_type, _), matrices in zip(tasks, fold_results):
+        for depth, matrix in matrices.items():
+            results.setdefault((depth, purity_type), []).append(matrix)
+    return results
+
+
+def main(argv=None):
+    """
+    Runs a cross-validation from the command line, and prints the mean test error and macro F1 score of every
+    depth and purity type.
+    """
+
+    import argparse
+    from .preprocessing import prepare_dataset
+    parser = argparse.ArgumentParser(prog="python -m decision_tree.evaluation",
+                                     description="Cross-validate decision trees on one of the datasets.")
+    parser.add_argument("example", choices=("car", "bank"))
+    parser.add_argument("--path", help="the training file (default: EXAMPLE/train.csv)")
+    parser.add_argument("--folds", type=int, default=5)
+    parser.add_argument("--depths", type=int, nargs="+", default=[1, 2, 3, 4, 5, 6])
+    parser.add_argument("--purity-types", nargs="+", default=["entropy", "me", "gini"])
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=None, help="processes (default: one per CPU)")
+    args = parser.parse_args(argv)
+    for purity_type in args.purity_types:
+        if purity_type not in ("entropy", "me", "gini"):
+            parser.error("unknown purity type: " + purity_type)
+
+    S, _, _ = prepare_dataset(args.path or os.path.join(args.example, "train.csv"), args.example)
+    results = cross_validate(S, args.folds, args.purity_types, args.depths, args.seed, args.workers)
+    print("{:>5} {:>8} {:>11} {:>9} {:>9}".format("depth", "purity", "mean error", "std", "macro F1"))
+    for depth in sorted(set(args.depths)):
+        for purity_type in args.purity_types:
+            matrices = results[(depth, purity_type)]
+            errors = [matrix.error() for matrix in matrices]
+            mean = sum(errors) / len(errors)
+            std = (sum((error - mean) ** 2 for error in errors) / len(errors)) ** 0.5
+            macro_f1 = sum(matrices[1:], matrices[0]).macro_f1()
+            print("{:>5} {:>8} {:>11.4f} {:>9.4f} {:>9.4f}".format(depth, purity_type, mean, std, macro_f1))
+    return 0
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,214 @@
+"""
+The hyperparameter sweep and the car and bank experiments.  Run with "python -m decision_tree".
+"""
+
+import os
+import time
+from collections import namedtuple
+from itertools import product
+from operator import eq
+
+from .data import map_dataset, save_dataset
+from .preprocessing import prepare_dataset
+from .builder import grow_tree
+from .predictor import compile_tree
+
+
+#One row of the table returned by sweep.  Errors are the fraction of examples that are misclassified,
+#build_time is the time in seconds to grow the tree that the configuration's tree was cut from, and nodes is
+#the number of nodes of the configuration's tree.
+SweepResult = namedtuple("SweepResult", ["max_depth", "purity_type", "replace", "train_error", "test_error",
+                                         "build_time", "nodes"])
+
+
+#The datasets of a sweep, mapped once per worker process.  The key is the replace flag, and the value is the
+#tuple (training set, training set for testing, test set).
+_sweep_datasets = {}
+
+
+def _init_sweep_worker(paths):
+    """
+    Maps the datasets of a sweep in a worker process.  The pages of the files are shared by all workers.
+    """
+    for replace, files in paths.items():
+        _sweep_datasets[replace] = tuple(map_dataset(file)[0] for file in files)
+
+
+def _run_group(group):
+    """
+    Builds the tree of the deepest configuration of a group of a sweep, and tests it cut off at the depth of
+    every configuration of the group.
+    """
+    
+    purity_type, replace, depths = group
+    S, S_train, S_test = _sweep_datasets[replace]
+    
+    start = time.perf_counter()
+    tree = grow_tree(S, set(S.attributes), S.codebooks, purity_type, max(depths))
+    build_time = time.perf_counter() - start
+    
+    #Every leaf is compiled on its own, so the nodes at each depth can be counted
+    compiled = compile_tree(tree, S_test.codebooks, S_test.label, share_leaves=False)
+    node_depths = compiled.node_depths()
+    errors = {depth: [] for depth in depths}
+    for data in (S_train, S_test):
+        for depth, predictions in compiled.predict_at_depths(data, depths).items():
+            correct = sum(map(eq, predictions, data.labels))
+            errors[depth].append(1 - float(correct) / len(data))
+    
+    return [SweepResult(depth, purity_type, replace, errors[depth][0], errors[depth][1], build_time,
+                        sum(1 for node_depth in node_depths if node_depth <= depth)) for depth in depths]
+
+
+def make_grid(depths, purity_types=("entropy", "me", "gini"), replaces=(False,)):
+    """
+    Returns the list of every (max_depth, purity_type, replace) configuration of the given values.
+    """
+    return list(product(depths, purity_types, replaces))
+
+
+def sweep(path, test_path, example, grid, workers=None, numeric="median", cache_dir=None):
+    """
+    Builds and tests one decision tree for every configuration of a grid, spread over a pool of processes.
+    The data files are read and encoded once for each replace flag of the grid, and written to memory-mapped
+    files that every worker maps, so no dataset is copied or pickled for each configuration.
+    
+    A tree with a smaller max_depth is the top of the tree with a larger one, so only one tree is grown for
+    each purity type and replace flag, as deep as the deepest configuration.  The trees of the other depths
+    are found by cutting it off, in one pass over the examples.
+    
+    Inputs:
+    -path:  A string, representing the path of the training set.
+    -test_path:  A string, representing the path of the test set.
+    -example:  One of three types:  "bank", "car", "tennis".  Represents the type of dataset to be used.
+    -grid:  A list of (max_depth, purity_type, replace) tuples, such as the list returned by make_grid.
+    -workers:  The number of worker processes.  If None, one for each CPU.  If 1, the configurations are run
+        in this process.
+    -numeric:  How numeric attributes are processed.  See prepare_dataset.
+    -cache_dir:  An optional directory for caching the processed data.  See prepare_dataset.
+    
+    Returns:
+    -results:  A list of SweepResult, in the order of grid.
+    """
+    
+    grid = [tuple(configuration) for configuration in grid]
+    if workers is None:
+        workers = os.cpu_count() or 1
+    
+    #The depths of each (purity type, replace) group, in the order of grid
+    groups = {}
+    for max_depth, purity_type, replace in grid:
+        depths = groups.setdefault((purity_type, replace), [])
+        if max_depth not in depths:
+            depths.append(max_depth)
+    #The deepest trees take the longest, so they are started first
+    groups = sorted(((purity_type, replace, tuple(depths)) for (purity_type, replace), depths in groups.items()),
+                    key=lambda group: -max(group[2]))
+    
+    import tempfile
+    with tempfile.TemporaryDirectory() as directory:
+        paths = {}
+        for replace in sorted(set(configuration[2] for configuration in grid)):
+            S, medians, majority = prepare_dataset(path, example, "train", replace=replace, cache_dir=cache_dir,
+                                                   numeric=numeric)
+            datasets = [S]
+            for test_file in (path, test_path):
+                datasets.append(prepare_dataset(test_file, example, "test", medians, majority, replace, cache_dir,
+                                                numeric)[0])
+            paths[replace] = []
+            for i, data in enumerate(datasets):
+                paths[replace].append(os.path.join(directory, str(replace) + "-" + str(i) + ".dt"))
+                save_dataset(data, paths[replace][-1])
+        
+        if workers == 1:
+            _init_sweep_worker(paths)
+            try:
+                group_results = [_run_group(group) for group in groups]
+            finally:
+                _sweep_datasets.clear()
+        else:
+            import multiprocessing
+            
+            with multiprocessing.Pool(min(workers, len(groups)) or 1, _init_sweep_worker, (paths,)) as pool:
+                group_results = pool.map(_run_group, groups, chunksize=1)
+    
+    results = {}
+    for group_result in group_results:
+        for result in group_result:
+            results[result[:3]] = result
+    return [results[configuration] for configuration in grid]
+
+
+def print_results(results):
+    """
+    Prints the results of a sweep as a table.
+    """
+    
+    print("{:>5} {:>8} {:>8} {:>12} {:>11} {:>11} {:>6}".format("depth", "purity", "replace", "train error",
+                                                                 "test error", "build time", "nodes"))
+    for result in results:
+        print("{:>5} {:>8} {:>8} {:>12.4f} {:>11.4f} {:>10.3f}s {:>6}".format(result.max_depth, result.purity_type,
+              str(result.replace), result.train_error, result.test_error, result.build_time, result.nodes))
+
+
+#Directory where the experiments cache the processed datasets
+CACHE_DIR = ".dtcache"
+
+
+def test_car():
+    
+    print("Testing car dataset: ")
+    print("\n")
+    
+    results = sweep("car/train.csv", "car/test.csv", "car", make_grid(range(1,7)))
+    for result in results:
+        print("Results with tree depth of " + str(result.max_depth) + " using purity type = " +
+              str(result.purity_type) + " :")
+        print("The average prediction error for the training set is " + "{:.2f}".format(result.train_error)
+          + " and the error for the testing set is " + "{:.2f}".format(result.test_error))
+        if result.purity_type == "gini":
+            print("\n")
+
+
+def test_bank():
+    
+    print("Testing bank dataset: ")
+    print("\n")
+    
+    results = sweep("bank/train.csv", "bank/test.csv", "bank", make_grid(range(1,17), replaces=(True,False)),
+                    cache_dir=CACHE_DIR)
+    for result in results:
+        print("Results with tree depth of " + str(result.max_depth) + " using purity type = " + 
+              str(result.purity_type) + " and replace = " + str(result.replace) + " :")
+        print("The average prediction error for the training set is " + "{:.2f}".format(result.train_error)
+              + " and the error for the testing set is " + "{:.2f}".format(result.test_error))
+        print("\n")
+
+
+def main(argv=None):
+    """
+    Runs the experiments from the command line, as "python -m decision_tree [car] [bank]".
+    
+    Input:
+    -argv:  The command line arguments, without the program name.  The default is sys.argv[1:].
+    
+    Returns:
+    -status:  The exit status, 0.
+    """
+    
+    import argparse
+    parser = argparse.ArgumentParser(prog="python -m decision_tree",
+                                     description="Run the decision tree experiments on the car and bank data.")
+    parser.add_argument("experiments", nargs="*", metavar="{car,bank}",
+                        help="the experiments to run (default: both)")
+    args = parser.parse_args(argv)
+    
+    experiments = {"car": test_car, "bank": test_bank}
+    for name in args.experiments:
+        if name not in experiments:
+            parser.error("invalid experiment: " + repr(name) + " (choose from 'car', 'bank')")
+    for i, name in enumerate(args.experiments or ("car", "bank")):
+        if i > 0:
+            print("\n")
+        experiments[name]()
+    return 0
@@ -0,0 +1,314 @@
+"""
+A decision tree that is updated with each new batch of examples instead of being grown again from all of them.
+"""
+
+import array
+from collections import Counter
+from itertools import repeat
+from operator import add, mul
+
+from .data import Dataset, _typecode
+from .criteria import purity_functions
+from .builder import Node, grow_tree
+from .predictor import compile_tree
+
+
+class _NodeStats(object):
+    """
+    The sufficient statistics of a node of an IncrementalTree.  The label counts of the node are the counts of
+    the Node itself.
+    -depth:  The depth of the node.
+    -attributes:  The attributes that the node can still be split on, in the column order of the data.
+    -parent, value:  The parent Node and the branch value of the node, or None for the root.
+    -tables:  For each attribute, the number of examples of the node in every (value, label) cell, numbered as
+        in the histograms of grow_tree: value code * width + label code.  Empty at the maximum depth.
+    -rows:  The examples that end at the node: all examples of a leaf, and the examples of an internal node whose
+        value is not in the codebook of its attribute.
+    -first:  The first example of the node with each label code, which breaks ties between majority labels as
+        in grow_tree.
+    """
+
+    def __init__(self, depth, attributes, parent, value, tables):
+        self.depth = depth
+        self.attributes = attributes
+        self.parent = parent
+        self.value = value
+        self.tables = tables
+        self.rows = array.array('l')
+        self.first = {}
+
+
+class IncrementalTree(object):
+    """
+    A class for a decision tree that learns from batches of examples as they arrive, in the style of ITI.
+    Every node keeps the label counts of its examples for every value of every attribute it could be split on,
+    so a new batch only updates the statistics of the nodes on the paths of its examples.  Each updated node
+    then checks, from its statistics alone, whether the attribute that grow_tree would choose for it has
+    changed.  Only then is its subtree grown again, from the examples stored at its leaves.  A leaf that should
+    now be split is grown the same way.
+
+    The cost of a batch is proportional to its size times the depth of the tree, plus the size of the subtrees
+    that are grown again.  After every batch, the tree is the one grow_tree builds from all examples seen so
+    far, since every node makes the same choice from the same counts.
+
+    All attributes must be categorical.  For the bank data, the numeric attributes are binarized with the
+    medians of the first batch: prepare_dataset in test mode, with those medians, prepares the later batches.
+    """
+
+    def __init__(self, purity_type="entropy", max_depth=float('inf')):
+        self.purity_type = purity_type
+        self.purity = purity_functions[purity_type]
+        self.max_depth = max_depth
+        self.root = None
+        self.data = None
+        self.codebooks = None
+        self.stats = {}
+        #The number of subtrees grown again, and the number of examples they held
+        self.rebuilds = 0
+        self.rebuilt_examples = 0
+        self._compiled = None
+
+    def __repr__(self):
+        examples = 0 if self.data is None else len(self.data)
+        return ("IncrementalTree(" + str(examples) + " examples, " + str(len(self.stats)) + " nodes, " +
+                str(self.rebuilds) + " rebuilds)")
+
+    def fit(self, S):
+        """
+        Forgets every example seen so far, and grows the tree from S.
+        """
+
+        self.root = None
+        self.data = None
+        self.stats = {}
+        self.rebuilds = 0
+        self.rebuilt_examples = 0
+        return self.partial_fit(S)
+
+    def partial_fit(self, S):
+        """
+        Updates the tree with a new batch of examples.
+
+        Input:
+        -S:  A Dataset with the same columns and codebooks as the first batch.  Examples whose label is not in
+            the codebook are skipped.
+
+        Returns:
+        -self
+        """
+
+        start = self._append(S)
+        labels = self.data.labels
+        n_labels = len(self.codebooks[self.data.label])
+        rows = [row for row in range(start, len(self.data)) if labels[row] < n_labels]
+        self._compiled = None
+        if self.root is None:
+            self.root = self._grow(rows, tuple(self.data.attributes), 0, None, None)
+            return self
+
+        #Update the statistics along the paths of the new examples, then check each updated node from the top down
+        touched = {}
+        self._absorb(self.root, rows, touched)
+        for node in touched:
+            stats = self.stats.get(node)
+            if stats is None:
+                #The node was in a subtree that has been grown again
+                continue
+            split = self._best_attribute(node, stats)
+            majority = self._majority(node.counts, stats.first)
+            if not node.is_leaf:
+                if split == node.attribute:
+                    node.majority = majority
+                    for child in node.children:
+                        if child.is_leaf and sum(child.counts) == 0:
+                            child.action = majority
+                    continue
+            elif split is None:
+                node.action = majority
+                continue
+            self._regrow(node, stats)
+        return self
+
+    def _append(self, S):
+        """
+        Appends the columns of a batch to the stored examples, and returns the index of its first example.
+        """
+
+        if self.data is None:
+            for name in S.attributes:
+                if name not in S.codebooks:
+                    raise ValueError("IncrementalTree only supports categorical attributes, not " + name)
+            columns = {name: array.array(_typecode(column), column) for name, column in S.columns.items()}
+            self.data = Dataset(columns, S.codebooks, S.label)
+            self.codebooks = S.codebooks
+            self.width = len(S.codebooks[S.label]) + 1
+            return 0
+
+        if set(S.columns) != set(self.data.columns):
+            raise ValueError("The batch does not have the columns of the first batch")
+        for name, codebook in self.codebooks.items():
+            if tuple(S.codebooks[name]) != tuple(codebook):
+                raise ValueError("The batch was not encoded with the codebook of attribute " + name)
+        start = len(self.data)
+        for name, column in self.data.columns.items():
+            column.extend(array.array(column.typecode, S.columns[name]))
+        return start
+
+    def _majority(self, counts, first):
+        best = max(counts)
+        tied = [code for code in range(len(counts)) if counts[code] == best]
+        if len(tied) > 1:
+            tied.sort(key=first.__getitem__)
+        return self.codebooks[self.data.label][tied[0]]
+
+    def _best_attribute(self, node, stats):
+        """
+        Returns the attribute that grow_tree would split a node on, given its statistics, or None if grow_tree
+        would make it a leaf.  The gains are computed as in grow_tree, so ties are broken the same way.
+        """
+
+        counts = node.counts
+        if stats.depth >= self.max_depth or len(stats.attributes) == 0 or counts.count(0) >= len(counts) - 1:
+            return None
+        purity = self.purity
+        width = self.width
+        total_count = sum(counts)
+        current_entropy = purity(counts)
+        best = None
+        best_gain = None
+        for attribute in stats.attributes:
+            table = stats.tables[attribute]
+            expected_entropy = 0.0
+            for code in range(len(self.codebooks[attribute])):
+                value_counts = table[code * width:(code + 1) * width]
+                ratio = float(sum(value_counts)) / total_count
+                if ratio > 0:
+                    expected_entropy += ratio * purity(value_counts)
+            gain = current_entropy - expected_entropy
+            if best is None or gain > best_gain:
+                best, best_gain = attribute, gain
+        return best
+
+    def _absorb(self, node, rows, touched=None):
+        """
+        Adds examples to the statistics of a node and of the nodes below it that the examples reach.
+
+        Input:
+        -node:  The Node where the examples enter.
+        -rows:  The indices of the examples in the stored data.
+        -touched:  An optional dictionary, to which every updated node is added, parents before children.
+        """
+
+        data = self.data
+        labels = data.labels
+        width = self.width
+        stack = [(node, rows)]
+        while stack:
+            node, rows = stack.pop()
+            if not rows:
+                continue
+            stats = self.stats[node]
+            if touched is not None:
+                touched[node] = None
+
+            node_labels = [labels[row] for row in rows]
+            for code, n in Counter(node_labels).items():
+                node.counts[code] += n
+            #Examples arrive in the order of their indices, so the first one of a label is never replaced
+            first = stats.first
+            if len(first) < len(node.counts):
+                for row, code in zip(rows, node_labels):
+                    first.setdefault(code, row)
+            for attribute, table in stats.tables.items():
+                cells = map(add, map(mul, data.column(attribute, rows), repeat(width)), node_labels)
+                for cell, n in Counter(cells).items():
+                    table[cell] += n
+
+            if node.is_leaf:
+                stats.rows.extend(rows)
+                continue
+            column = data.columns[node.attribute]
+            values = self.codebooks[node.attribute]
+            children = [[] for _ in values]
+            for row in rows:
+                code = column[row]
+                if code < len(values):
+                    children[code].append(row)
+                else:
+                    stats.rows.append(row)
+            #The children of the node are in the order of the codebook
+            stack.extend(zip(node.children, children))
+
+    def _grow(self, rows, attributes, depth, parent, value):
+        """
+        Grows a subtree from the stored examples at rows with grow_tree, and builds the statistics of its nodes.
+        """
+
+        subset = self.data.take(rows)
+        tree = grow_tree(subset, set(attributes), self.codebooks, self.purity_type, self.max_depth - depth)
+
+        #The statistics start empty and are filled by absorbing the examples again
+        width = self.width
+        stack = [(tree, depth, attributes, parent, value)]
+        while stack:
+            node, node_depth, node_attributes, node_parent, node_value = stack.pop()
+            #A node at the maximum depth is never split, so it needs no tables
+            tables = {}
+            if node_depth < self.max_depth:
+                tables = {attribute: [0] * ((len(self.codebooks[attribute]) + 1) * width)
+                          for attribute in node_attributes}
+            self.stats[node] = _NodeStats(node_depth, node_attributes, node_parent, node_value, tables)
+            node.counts = [0] * (width - 1)
+            if not node.is_leaf:
+                remaining = tuple(attribute for attribute in node_attributes if attribute != node.attribute)
+                for child_value, child in zip(node.values, node.children):
+                    if child.is_leaf:
+                        #grow_tree shares its empty leaves, and the counts of every leaf here are its own
+                        child = Node(name="leaf", action=child.action, parent=node.attribute)
+                        node.add_branch(child_value, child)
+                    stack.append((child, node_depth + 1, remaining, node, child_value))
+        self._absorb(tree, array.array('l', rows))
+        return tree
+
+    def _regrow(self, node, stats):
+        """
+        Replaces the subtree of a node with one grown from the examples stored in it.
+        """
+
+        rows = array.array('l')
+        stack = [node]
+        while stack:
+            current = stack.pop()
+            rows.extend(self.stats.pop(current).rows)
+            stack.extend(current.children)
+        rows = array.array('l', sorted(rows))
+        self.rebuilds += 1
+        self.rebuilt_examples += len(rows)
+
+        tree = self._grow(rows, stats.attributes, stats.depth, stats.parent, stats.value)
+        if stats.parent is None:
+            self.root = tree
+        else:
+            tree.parent = stats.parent.attribute
+            stats.parent.add_branch(stats.value, tree)
+
+    def compile(self):
+        """
+        Returns the tree compiled with compile_tree.  The compiled tree is kept until the next update.
+        """
+
+        if self._compiled is None:
+            self._compiled = compile_tree(self.root, self.codebooks, self.data.label)
+        return self._compiled
+
+    def predict_batch(self, data):
+        """
+        Predicts the label code of every example of a Dataset.
+        """
+        return self.compile().predict_batch(data)
+
+    def predict(self, data):
+        """
+        Predicts the label of every example of a Dataset, as strings.
+        """
+        return self.compile().predict(data)
@@ -0,0 +1,183 @@
+"""
+Opt-in counters and timers for the stages of training and prediction.
+"""
+
+import time
+from collections import Counter
+
+
+#The Profiler that is collecting, or None.  The instrumented functions look at it once per call, so they cost
+#almost nothing while no profiler is active.
+active = None
+
+
+class Profiler(object):
+    """
+    A class that collects counters and per-stage timers while it is active, in a "with" block or between
+    enable and disable.
+
+    Stages are timed by the instrumented functions: read_file, load_dataset, process_bank_data, the
+    Preprocessor, best_attribute, ID3, grow_tree, walk_tree, predict_batch, evaluate and test_decision_tree.
+    Inside grow_tree, the split search, the partitioning of the examples and the counting of histograms are
+    timed as stages of their own, and the rest of grow_tree is the bookkeeping of the work queue.  A recursive
+    stage is only timed at its outermost call.
+
+    Counters:
+    -nodes, leaves:  The nodes built by ID3 and grow_tree, and how many of them are leaves.
+    -examples scanned:  The examples of every node built, summed over the nodes.
+    -candidate splits:  The splits scored: one for each categorical attribute searched, and one for each
+        threshold tried on a numeric or binned attribute.
+    -max depth:  The depth of the deepest node built.
+
+    Each hook is called as hook(event, fields).  The events are "stage", with the fields stage and seconds,
+    at the end of every outermost call of a stage, and "node", with the fields depth, examples, leaf and
+    attribute, for every node built.  The nodes of grow_tree are reported when its tree is complete.
+    """
+
+    def __init__(self, hooks=()):
+        self.hooks = list(hooks)
+        self.timers = Counter()
+        self.calls = Counter()
+        self.counters = Counter()
+        self.max_depth = 0
+        self._open = Counter()
+        self._previous = None
+
+    def __repr__(self):
+        return "Profiler(" + str(len(self.timers)) + " stages, " + str(self.counters["nodes"]) + " nodes)"
+
+    def __enter__(self):
+        global active
+        self._previous = active
+        active = self
+        return self
+
+    def __exit__(self, *exc_info):
+        global active
+        active = self._previous
+        self._previous = None
+        return False
+
+    def add_hook(self, hook):
+        self.hooks.append(hook)
+
+    def emit(self, event, **fields):
+        for hook in self.hooks:
+            hook(event, fields)
+
+    def running(self, stage):
+        """
+        Returns True if a call of the stage is being timed.
+        """
+        return self._open[stage] > 0
+
+    def start(self, stage):
+        """
+        Starts timing a call of a stage, and returns the start time to give to stop.
+        """
+        self._open[stage] += 1
+        return time.perf_counter()
+
+    def stop(self, stage, started):
+        """
+        Stops timing a call of a stage.  Only the outermost of nested calls is added to the timer.
+        """
+        self._open[stage] -= 1
+        if self._open[stage] == 0:
+            seconds = time.perf_counter() - started
+            self.timers[stage] += seconds
+            self.calls[stage] += 1
+            if self.hooks:
+                self.emit("stage", stage=stage, seconds=seconds)
+
+    def call(self, stage, function, *args, **kwargs):
+        """
+        Calls function and times the call as a stage.
+        """
+        started = self.start(stage)
+        try:
+            return function(*args, **kwargs)
+        finally:
+            self.stop(stage, started)
+
+    def timed(self, stage, function):
+        """
+        Returns a function that calls function and times it as a stage.
+        """
+        return lambda *args: self.call(stage, function, *args)
+
+    def count(self, name, n=1):
+        self.counters[name] += n
+
+    def node(self, depth, examples, leaf, attribute=None):
+        """
+        Counts a node that was built.
+        """
+        self.counters["nodes"] += 1
+        self.counters["leaves"] += leaf
+        self.counters["examples scanned"] += examples
+        if depth > self.max_depth:
+            self.max_depth = depth
+        if self.hooks:
+            self.emit("node", depth=depth, examples=examples, leaf=leaf, attribute=attribute)
+
+    def tree(self, root, depth=0):
+        """
+        Counts every node of a tree grown by grow_tree, whose nodes hold their label counts.
+        """
+        stack = [(root, depth)]
+        while stack:
+            node, depth = stack.pop()
+            examples = sum(node.counts) if node.counts is not None else 0
+            self.node(depth, examples, node.is_leaf, None if node.is_leaf else node.attribute)
+            stack.extend((child, depth + 1) for child in reversed(node.children))
+
+    def summary(self):
+        """
+        Returns the timers, call counts and counters as a dictionary that can be written as JSON.
+        """
+
+        counters = dict(self.counters)
+        counters["max depth"] = self.max_depth
+        if self.counters["nodes"]:
+            counters["examples per node"] = float(self.counters["examples scanned"]) / self.counters["nodes"]
+        stages = {stage: {"seconds": self.timers[stage], "calls": self.calls[stage]} for stage in self.timers}
+        if "grow_tree" in self.timers:
+            inner = sum(self.timers[stage] for stage in ("split search", "partition", "histograms"))
+            stages["grow_tree other"] = {"seconds": max(self.timers["grow_tree"] - inner, 0.0),
+                                         "calls": self.calls["grow_tree"]}
+        return {"stages": stages, "counters": counters}
+
+    def report(self):
+        """
+        Returns the summary as a table of text.
+        """
+
+        summary = self.summary()
+        lines = ["{:<24} {:>10} {:>8}".format("stage", "seconds", "calls")]
+        for stage, timer in sorted(summary["stages"].items(), key=lambda item: -item[1]["seconds"]):
+            lines.append("{:<24} {:>10.4f} {:>8}".format(stage, timer["seconds"], timer["calls"]))
+        lines.append("")
+        for name, value in sorted(summary["counters"].items()):
+            lines.append("{:<24} {:>10}".format(name, round(value, 2) if isinstance(value, float) else value))
+        return "\n".join(lines)
+
+
+def enable(profiler=None):
+    """
+    Makes a profiler the active one, and returns it.  A new Profiler is created if none is given.
+    """
+
+    global active
+    active = Profiler() if profiler is None else profiler
+    return active
+
+
+def disable():
+    """
+    Stops collecting, and returns the profiler that was active.
+    """
+
+    global active
+    profiler, active = active, None
+    return profiler
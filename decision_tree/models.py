@@ -0,0 +1,158 @@
+"""
+Saving and loading compiled trees and ensembles in a binary model format.
+"""
+
+import json
+import mmap
+import os
+import struct
+import sys
+
+from .data import _align, _read_header, _typecode
+from .builder import Node
+from .predictor import CompiledTree, compile_tree
+from .ensemble import AdaBoost, Bagging, RandomForest
+
+
+MODEL_MAGIC = b"DTMODEL1"
+
+
+#The version of the model format.  It is increased whenever the format changes, and load_model refuses files
+#written in a newer version.
+MODEL_VERSION = 1
+
+
+#The arrays of a CompiledTree, in the order they are stored
+_TREE_ARRAYS = ("feature", "offset", "children", "value", "threshold")
+
+
+def save_model(model, path, medians=None, majority=None, codebooks=None):
+    """
+    Saves a decision tree or an ensemble to a binary file that can be memory-mapped by load_model.
+    The file holds a JSON header with the codebooks, the preprocessing values and the position of every array,
+    followed by the flat node arrays of each compiled tree.  Like save_dataset, the file is written under
+    a temporary name and then renamed.
+    
+    Input:
+    -model:  A CompiledTree, RandomForest or AdaBoost, or a tree of Nodes if codebooks is given.
+    -path:  A string, representing the path of the file to be written.
+    -medians:  The training medians of the bank data, or None.
+    -majority:  The training majority values of the bank data, or None.
+    -codebooks:  The codebooks to compile a tree of Nodes with.  See compile_tree.
+    """
+    
+    if isinstance(model, Node):
+        if codebooks is None:
+            raise ValueError("A tree of Nodes can only be saved with its codebooks")
+        model = compile_tree(model, codebooks)
+    
+    if isinstance(model, CompiledTree):
+        kind, trees, parameters = "tree", [model], {}
+    elif isinstance(model, RandomForest):
+        kind, trees = "forest", model.trees
+        parameters = {"n_trees": model.n_trees, "purity_type": model.purity_type, "max_depth": model.max_depth,
+                      "max_features": model.max_features, "bootstrap": model.bootstrap, "seed": model.seed,
+                      "bagging": isinstance(model, Bagging)}
+    elif isinstance(model, AdaBoost):
+        kind, trees = "adaboost", model.trees
+        parameters = {"n_rounds": model.n_rounds, "max_depth": model.max_depth, "purity_type": model.purity_type,
+                      "alphas": model.alphas, "training_errors": model.training_errors}
+    else:
+        raise ValueError("Unknown model: " + repr(model))
+    if not trees:
+        raise ValueError("The model must be fitted before it is saved")
+    
+    arrays = []
+    entries = []
+    offset = 0
+    for tree in trees:
+        entry = {"attributes": list(tree.attributes)}
+        for name in _TREE_ARRAYS:
+            values = getattr(tree, name)
+            entry[name] = {"typecode": _typecode(values), "offset": offset, "length": len(values)}
+            arrays.append((offset, values))
+            offset = _align(offset + len(values) * values.itemsize)
+        entries.append(entry)
+    
+    #max_depth is often infinite, which is not valid JSON
+    if parameters.get("max_depth") == float('inf'):
+        parameters["max_depth"] = None
+    header = json.dumps({
+        "version": MODEL_VERSION,
+        "kind": kind,
+        "byteorder": sys.byteorder,
+        "label": trees[0].label,
+        "codebooks": {name: list(values) for name, values in trees[0].codebooks.items()},
+        "medians": medians,
+        "majority": majority,
+        "parameters": parameters,
+        "trees": entries
+    }).encode("utf-8")
+    start = _align(len(MODEL_MAGIC) + 8 + len(header))
+    
+    temp_path = path + "." + str(os.getpid()) + ".tmp"
+    with open(temp_path, "wb") as f:
+        f.write(MODEL_MAGIC)
+        f.write(struct.pack("<Q", len(header)))
+        f.write(header)
+        for array_offset, values in arrays:
+            f.seek(start + array_offset)
+            f.write(memoryview(values).cast("B"))
+        f.truncate(start + offset)
+    os.replace(temp_path, path)
+
+
+def load_model(path):
+    """
+    Loads a model saved by save_model by memory-mapping the file.
+    The node arrays of the trees are read-only memoryviews into the mapped file, so loading does not depend on
+    the size of the model, and processes that load the same file share one physical copy of it.
+    
+    Input:
+    -path:  A string, representing the path of the file to be loaded.
+    
+    Returns:
+    -model:  A CompiledTree, RandomForest, Bagging or AdaBoost.
+    -medians:  The medians that were saved with the model.
+    -majority:  The majority values that were saved with the model.
+    """
+    
+    with open(path, "rb") as f:
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    buffer = memoryview(mapped)
+    header, start = _read_header(buffer, MODEL_MAGIC, path)
+    if header["version"] > MODEL_VERSION:
+        raise ValueError(path + " was saved in a newer version of the model format")
+    
+    codebooks = {name: tuple(values) for name, values in header["codebooks"].items()}
+    trees = []
+    for entry in header["trees"]:
+        arrays = []
+        for name in _TREE_ARRAYS:
+            layout = entry[name]
+            values = buffer[start + layout["offset"]:].cast(layout["typecode"])
+            arrays.append(values[:layout["length"]])
+        trees.append(CompiledTree(tuple(entry["attributes"]), codebooks, *arrays, label=header["label"]))
+    
+    parameters = header["parameters"]
+    if parameters.get("max_depth", 0) is None:
+        parameters["max_depth"] = float('inf')
+    if header["kind"] == "tree":
+        model = trees[0]
+    elif header["kind"] == "forest":
+        if parameters["bagging"]:
+            model = Bagging(parameters["n_trees"], parameters["purity_type"], parameters["max_depth"],
+                            parameters["seed"])
+        else:
+            model = RandomForest(parameters["n_trees"], parameters["purity_type"], parameters["max_depth"],
+                                 parameters["max_features"], parameters["bootstrap"], parameters["seed"])
+        model.trees = trees
+    elif header["kind"] == "adaboost":
+        model = AdaBoost(parameters["n_rounds"], parameters["max_depth"], parameters["purity_type"])
+        model.trees = trees
+        model.alphas = parameters["alphas"]
+        model.training_errors = parameters["training_errors"]
+    else:
+        raise ValueError(path + " holds an unknown kind of model: " + str(header["kind"]))
+    
+    return model, header["medians"], header["majority"]
@@ -0,0 +1,356 @@
+"""
+Walking trees, compiling them into flat arrays and scoring examples with them.
+"""
+
+import array
+import math
+from bisect import bisect_left
+
+from . import instrument
+from .data import Dataset
+from .preprocessing import prepare_dataset
+
+
+def walk_tree(node, s):
+    """
+    Recurisive function.  Given an example s walks through a tree, following the branch of each 
+    node with the given value in s.  
+    
+    Inputs:  
+    -node:  A tree node.
+    -s: One data instance containing attributes and vaues.
+    
+    Return:
+    -action:  A string, representing the action of the leaf node.
+    """
+    
+    if instrument.active is not None and not instrument.active.running("walk_tree"):
+        return instrument.active.call("walk_tree", walk_tree, node, s)
+    
+    value = node.branch_value(s[node.attribute])
+    next_node = node.get_branch(value)
+    if not next_node.is_leaf:
+        action = walk_tree(next_node, s)
+    else:
+        #At leaf node
+        action = next_node.action
+    
+    return action
+
+
+def walk_encoded(node, data, i):
+    """
+    Given example i of an encoded Dataset, walks through a tree, following the branch of each node
+    with the decoded value of that example.
+    
+    Inputs:  
+    -node:  A tree node.
+    -data:  A Dataset.
+    -i:  The index of the example in data.
+    
+    Return:
+    -action:  A string, representing the action of the leaf node.
+    """
+    
+    while not node.is_leaf:
+        attribute = node.attribute
+        node = node.get_branch(node.branch_value(data.decode(attribute, data.columns[attribute][i])))
+    
+    return node.action
+
+
+class CompiledTree(object):
+    """
+    A class for a decision tree compiled into flat arrays, for fast prediction on encoded Datasets.
+    Nodes are numbered in breadth-first order, starting with the root at 0.  Leaves with the same label are
+    usually one node, which is numbered where the label is first reached.  For node i:
+    -feature[i] is the index in attributes of the node's attribute, or -1 if the node is a leaf.
+    -children[offset[i] + code] is the child for the value with that code in the attribute's codebook.
+        The slot after the last code is for values that are not in the codebook, and holds -1.
+    -value[i] is the code of the node's label if the node is a leaf.  For an internal node, it is the code of
+        the node's majority label, or -1 if the tree has no majority labels.
+    -threshold[i] is the threshold of a node on a numeric attribute, and NaN otherwise.  Such a node has two
+        child slots: values up to the threshold go to the first one, and larger values to the second one.
+    """
+
+    def __init__(self, attributes, codebooks, feature, offset, children, value, threshold, label="label"):
+        self.attributes = attributes
+        self.codebooks = codebooks
+        self.feature = feature
+        self.offset = offset
+        self.children = children
+        self.value = value
+        self.threshold = threshold
+        self.label = label
+
+    def __len__(self):
+        return len(self.feature)
+
+    def __repr__(self):
+        return "CompiledTree(" + str(len(self)) + " nodes)"
+
+    def nbytes(self):
+        """
+        Returns the number of bytes used by the node arrays.
+        """
+        return sum(len(values) * values.itemsize for values in (self.feature, self.offset, self.children,
+                                                                  self.value, self.threshold))
+
+    def _thresholds(self, data):
+        """
+        Checks that a Dataset was encoded with the codebooks of the tree, and returns the threshold of each node,
+        or None if the node is not on a numeric attribute, with an extra None at the end.
+        The values of a binned attribute of data are bin numbers, so a threshold on it is replaced by the number
+        of its bin.  The tree must have been grown from data binned with the same edges, whose thresholds are
+        all bin edges.
+        """
+        
+        for name in self.attributes:
+            if name in self.codebooks and tuple(data.codebooks[name]) != tuple(self.codebooks[name]):
+                raise ValueError("The dataset was not encoded with the codebook of attribute " + name)
+        
+        thresholds = []
+        for f, t in zip(self.feature, self.threshold):
+            if math.isnan(t):
+                thresholds.append(None)
+            elif self.attributes[f] in data.edges:
+                edges = data.edges[self.attributes[f]]
+                b = bisect_left(edges, t)
+                if b == len(edges) or edges[b] != t:
+                    raise ValueError("The threshold " + str(t) + " is not an edge of the bins of attribute " +
+                                     self.attributes[f])
+                thresholds.append(b)
+            else:
+                thresholds.append(t)
+        return thresholds + [None]
+
+    def predict_batch(self, data):
+        """
+        Predicts the label code of every example of a Dataset.
+        Each example follows the flat child table from the root to a leaf, with no recursion, no dictionary
+        lookups and no string comparisons.
+        
+        Input:
+        -data:  A Dataset, encoded with the same codebooks as the tree.
+        
+        Returns:
+        -predictions:  An array with the label code of each example.
+        """
+        
+        if instrument.active is not None and not instrument.active.running("predict_batch"):
+            return instrument.active.call("predict_batch", self.predict_batch, data)
+        
+        
+        #The column of each node, or None for a leaf.  The extra entry at the end is reached through
+        #a child slot of -1, and stops the walk with a label of -1.
+        columns = [data.columns[name] for name in self.attributes]
+        node_columns = [columns[f] if f >= 0 else None for f in self.feature] + [None]
+        values = list(self.value) + [-1]
+        thresholds = self._thresholds(data)
+        offset = list(self.offset)
+        children = self.children
+        
+        predictions = array.array('h')
+        for row in range(len(data)):
+            node = 0
+            column = node_columns[0]
+            while column is not None:
+                threshold = thresholds[node]
+                if threshold is None:
+                    node = children[offset[node] + column[row]]
+                else:
+                    node = children[offset[node] + (column[row] > threshold)]
+                column = node_columns[node]
+            predictions.append(values[node])
+        
+        if len(predictions) > 0 and min(predictions) < 0:
+            raise ValueError("An example has a value that is not in the codebook of its attribute")
+        return predictions
+
+    def node_depths(self):
+        """
+        Returns an array with the depth of each node.  A leaf that is shared by several parents has the depth
+        of the deepest one, plus one.
+        """
+        
+        depths = array.array('h', [0]) * len(self)
+        internal = [node for node in range(len(self)) if self.feature[node] >= 0]
+        ends = [self.offset[node] for node in internal[1:]] + [len(self.children)]
+        for node, end in zip(internal, ends):
+            for child in self.children[self.offset[node]:end]:
+                if child >= 0:
+                    depths[child] = depths[node] + 1
+        return depths
+
+    def predict_at_depths(self, data, depths):
+        """
+        Predicts the label code of every example of a Dataset with the tree cut off at each of several depths,
+        in one pass over the examples.  The predictions at depth d are those of the tree grown with max_depth=d,
+        which ends each example's path at depth d with the majority label of the node it reached.
+        
+        Input:
+        -data:  A Dataset, encoded with the same codebooks as the tree.
+        -depths:  A list of depths.
+        
+        Returns:
+        -predictions:  A dictionary with an array of label codes for each depth.
+        """
+        
+        if any(self.value[node] < 0 for node in range(len(self)) if self.feature[node] >= 0):
+            raise ValueError("The tree has no majority labels at its internal nodes")
+        
+        depths = sorted(set(depths))
+        max_depth = depths[-1] if depths else 0
+        columns = [data.columns[name] for name in self.attributes]
+        node_columns = [columns[f] if f >= 0 else None for f in self.feature] + [None]
+        values = list(self.value) + [-1]
+        thresholds = self._thresholds(data)
+        offset = list(self.offset)
+        children = self.children
+        
+        predictions = {depth: array.array('h') for depth in depths}
+        for row in range(len(data)):
+            #The label of each node on the path of the example, starting with the root
+            node = 0
+            column = node_columns[0]
+            path = [values[0]]
+            while column is not None and len(path) <= max_depth:
+                threshold = thresholds[node]
+                if threshold is None:
+                    node = children[offset[node] + column[row]]
+                else:
+                    node = children[offset[node] + (column[row] > threshold)]
+                column = node_columns[node]
+                path.append(values[node])
+            last = len(path) - 1
+            for depth in depths:
+                predictions[depth].append(path[min(depth, last)])
+        
+        for depth in depths:
+            if len(predictions[depth]) > 0 and min(predictions[depth]) < 0:
+                raise ValueError("An example has a value that is not in the codebook of its attribute")
+        return predictions
+
+    def predict(self, data):
+        """
+        Predicts the label of every example of a Dataset, as strings.
+        """
+        
+        labels = self.codebooks[self.label]
+        return [labels[code] for code in self.predict_batch(data)]
+
+
+def compile_tree(tree, codebooks, label="label", share_leaves=True):
+    """
+    Compiles a tree of Nodes into a CompiledTree.
+    
+    Inputs:
+    -tree:  A tree node, as returned by ID3.
+    -codebooks:  A dictionary, which contains all the possible values each attribute can have, such as the
+        master_list from create_attribute_dictionary or the codebooks of a Dataset.  Attributes of the tree
+        that are not in codebooks are numeric.
+    -label:  The attribute that holds the labels.
+    -share_leaves:  If True, all leaves with the same label are compiled into one node, which makes the arrays
+        about half as long.  If False, every leaf of the tree has a node of its own, so node_depths gives the
+        depth of each of them.
+    
+    Returns:
+    -compiled:  A CompiledTree.
+    """
+    
+    labels = {value: code for code, value in enumerate(codebooks[label])}
+    
+    #Number the nodes breadth-first.  A node that is the child of several parents is in nodes once for each
+    #of them, and its children start at nodes[first[i]].
+    nodes = [tree]
+    first = []
+    for node in nodes:
+        first.append(len(nodes))
+        nodes.extend(node.children)
+    
+    #The compiled node of each entry of nodes.  A shared leaf is compiled where its label is first found.
+    number = []
+    shared = {}
+    compiled = 0
+    for node in nodes:
+        if share_leaves and node.is_leaf and node.action in shared:
+            number.append(shared[node.action])
+            continue
+        if share_leaves and node.is_leaf:
+            shared[node.action] = compiled
+        number.append(compiled)
+        compiled += 1
+    
+    attributes = [name for name in codebooks if name != label]
+    for node in nodes:
+        if not node.is_leaf and node.attribute not in codebooks and node.attribute not in attributes:
+            attributes.append(node.attribute)
+    index = {name: i for i, name in enumerate(attributes)}
+    
+    feature = array.array('h')
+    offset = array.array('i')
+    children = array.array('i')
+    value = array.array('h')
+    threshold = array.array('d')
+    for i, node in enumerate(nodes):
+        if number[i] < len(feature):
+            #A shared leaf that was compiled already
+            continue
+        if not node.is_leaf:
+            values = codebooks[node.attribute] if node.threshold is None else ("<=", ">")
+            position = {v: first[i] + k for k, v in enumerate(node.values)}
+            feature.append(index[node.attribute])
+            offset.append(len(children))
+            for v in values:
+                children.append(number[position[v]] if v in position else -1)
+            children.append(-1)
+            value.append(-1 if node.majority is None else labels[node.majority])
+            threshold.append(float("nan") if node.threshold is None else node.threshold)
+        else:
+            feature.append(-1)
+            offset.append(-1)
+            value.append(labels[node.action])
+            threshold.append(float("nan"))
+    
+    return CompiledTree(tuple(attributes), codebooks, feature, offset, children, value, threshold, label)
+
+
+def test_decision_tree(tree, path, example, medians=None, majority=None, replace=False, cache_dir=None,
+                       numeric="median"):
+    """
+    With a given decision tree, tests the decision tree for accuracy against a given data set.
+    
+    Inputs:
+    -tree:  The decision tree to be tested.
+    -path:  A string, representing the path of the dataset that will be used for testing the decision tree.
+        path can also be an already encoded Dataset, in which case no file is read.
+    -example:  One of three types:  "bank", "car" and "tennis".  Represents the type of dataset to be used.
+    -medians:  A dictionary with key-value pairs. The key is the attribute represented as a string and 
+        the value is the corresponding numerical median.  This is only used for the "bank" data.
+    -majority: A dictionary with key-value pairs. The key is the attribute represented as a string and 
+        the value is the corresponding majority element for that attribute. This is only use for the "bank" data. 
+    -replace:  If False, "unknown" attribute values are considered a value.  Otherwise if True, "unknown" 
+               attribute values are replaced with the majority value of that attribute.
+    -cache_dir:  An optional directory for caching the processed data.  See prepare_dataset.
+    -numeric:  How numeric attributes were processed when the tree was built.  See prepare_dataset.
+               
+    Returns:
+    -ratio:  A float, representing the accuracy of the decision tree with the given dataset: the fraction of
+        its examples that are predicted correctly.
+    """
+    
+    if instrument.active is not None and not instrument.active.running("test_decision_tree"):
+        return instrument.active.call("test_decision_tree", test_decision_tree, tree, path, example, medians,
+                                      majority, replace, cache_dir, numeric)
+    
+    from .evaluation import evaluate, evaluate_file
+    
+    if isinstance(path, Dataset):
+        matrix = evaluate(tree, path)
+    elif cache_dir is not None:
+        matrix = evaluate(tree, prepare_dataset(path, example, "test", medians, majority, replace, cache_dir,
+                                                numeric)[0])
+    else:
+        #The file is read, encoded and scored one chunk at a time
+        matrix = evaluate_file(tree, path, example, medians, majority, replace, numeric)
+    return matrix.accuracy()
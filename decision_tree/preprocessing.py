@@ -0,0 +1,406 @@
+"""
+Turning raw examples into Datasets: numeric attribute handling, unknown values and the dataset cache.
+"""
+
+import array
+import json
+import os
+from bisect import bisect_left
+
+from . import instrument
+from .data import Dataset, _code_type, load_dataset, map_dataset, save_dataset
+from .criteria import majority_label
+
+
+def process_bank_data(S, mode, train_medians=None, replace=False, maj_values=None):
+    """
+    A function that processes the bank data.  First, it turns the numerical range into binary data.  
+    The binary values ("high", "low") are based on a threshold. The threshold is the median value in the set S.
+    Also, it can replace "unknown" attribute values with the majority value for that attribute.
+        
+    Inputs:
+    -S: Set of data instances from the bank data set. 
+    -mode: One of two types: "train" or "test".  If "train", medians will be calculated from data.
+        If "test", the medians will be provided in the function call.
+    -train_medians: dictionary with key-value pairs being the attribute and its associated numerical median.
+    -replace:  If False, "unknown" attribute values are considered a value.  Otherwise if True, "unknown" 
+               attribute values are replaced with the majority value of that attribute.
+    -maj_labels:  a dictionary with key-value pairs being the attribute and its majority label.
+    
+    Returns:
+    -medians:  A dictionary with key-value pairs.  The key is the attribute represented as a string and 
+        the value is the corresponding numerical median.
+    -majority: A dictionary with key-value pairs .  The key is the attribute represented as a string and 
+        the value is the corresponding majority element for that attribute
+    """
+    
+    if instrument.active is not None and not instrument.active.running("process_bank_data"):
+        return instrument.active.call("process_bank_data", process_bank_data, S, mode, train_medians, replace,
+                                      maj_values)
+
+    #Calculate the median if training mode
+    if mode == "train":
+        med_age = median(int(s["age"]) for s in S)
+        med_balance = median(int(s["balance"]) for s in S)
+        med_day = median(int(s["day"]) for s in S)
+        med_duration = median(int(s["duration"]) for s in S)
+        med_campaign = median(int(s["campaign"]) for s in S)
+        med_pdays = median(int(s["pdays"]) for s in S)
+        med_previous = median(int(s["previous"]) for s in S)
+        maj_job = majority_label(S,"job", "True")
+        maj_education = majority_label(S, "education", "True")
+        maj_contact = majority_label(S, "contact", "True")
+        maj_poutcome = majority_label(S, "poutcome", "True")
+    
+    else:
+        med_age = train_medians["age"]
+        med_balance = train_medians["balance"]
+        med_day = train_medians["day"]
+        med_duration = train_medians["duration"]
+        med_campaign = train_medians["campaign"]
+        med_pdays = train_medians["pdays"]
+        med_previous = train_medians["previous"]
+        maj_job = maj_values["job"]
+        maj_education = maj_values["education"]
+        maj_contact = maj_values["contact"]
+        maj_poutcome = maj_values["poutcome"]
+
+
+    for s in S:
+        s["age"] = "high" if float(s["age"]) > med_age else "low"
+        s["balance"] = "high" if float(s["balance"]) > med_balance else "low"
+        s["day"] = "high" if float(s["day"]) > med_day else "low"
+        s["duration"] = "high" if float(s["duration"]) > med_duration else "low"
+        s["campaign"] = "high" if float(s["campaign"]) > med_campaign else "low"
+        s["pdays"] = "high" if float(s["pdays"]) > med_pdays else "low"
+        s["previous"] = "high" if float(s["previous"]) > med_previous else "low"
+        if replace:
+            if s["job"] == "unknown":
+                s["job"] = maj_job 
+            if s["education"] == "unknown":
+                s["education"] = maj_education
+            if s["contact"] == "unknown":
+                s["contact"] = maj_contact 
+            if s["poutcome"] == "unknown":
+                s["poutcome"] = maj_poutcome
+
+        
+    medians = {
+        "age": med_age,
+        "balance": med_balance,
+        "day": med_day,
+        "duration": med_duration,
+        "campaign": med_campaign,
+        "pdays": med_pdays,
+        "previous": med_previous
+    }
+    
+    majority = {
+        "job": maj_job,
+        "education": maj_education,
+        "contact": maj_contact,
+        "poutcome": maj_poutcome
+    }
+
+    return S, medians, majority
+
+
+def _select(values, k):
+    """
+    Returns the k-th smallest value of a list (counting from 0), without sorting the list.
+    Each round keeps only the values on the side of the pivot that holds the k-th value, so the
+    expected cost is linear in the length of the list.
+    """
+    
+    while True:
+        pivot = values[len(values) // 2]
+        lower = [value for value in values if value < pivot]
+        if k < len(lower):
+            values = lower
+            continue
+        higher = [value for value in values if value > pivot]
+        equal = len(values) - len(lower) - len(higher)
+        if k < len(lower) + equal:
+            return pivot
+        k -= len(lower) + equal
+        values = higher
+
+
+def median(values):
+    """
+    Returns the median of a sequence of numbers, found by selection.  For an even number of values,
+    the median is the mean of the two middle values, the same as statistics.median.
+    """
+    
+    values = list(values)
+    n = len(values)
+    if n == 0:
+        raise ValueError("The median of no values is not defined")
+    upper = _select(values, n // 2)
+    if n % 2 == 1:
+        return upper
+    return (_select(values, n // 2 - 1) + upper) / 2
+
+
+class Preprocessor(object):
+    """
+    A class for the preprocessing of a Dataset that was read with a Schema, such as the bank data.
+    It turns each numeric attribute into binary data: "high" if the value is above the median of the
+    training data, and "low" otherwise.  If replace is True, it also replaces the value "unknown" of
+    categorical attributes with the majority value of that attribute in the training data.
+    If binarize is False, numeric attributes are kept as numbers, for trees that split them on thresholds.
+    
+    fit computes the medians and majority values, and transform applies them to any Dataset with the same
+    columns, without changing the Dataset it is given.  The fitted state is a dictionary of plain values
+    (see to_dict and from_dict), so it can be saved once and reused for training, testing and serving.
+    """
+
+    def __init__(self, replace=False, medians=None, majority=None, binarize=True):
+        self.replace = replace
+        self.medians = medians
+        self.majority = majority
+        self.binarize = binarize
+
+    def __repr__(self):
+        return "Preprocessor(replace=" + str(self.replace) + ", fitted=" + str(self.medians is not None) + ")"
+
+    def fit(self, data):
+        """
+        Computes the median of each numeric attribute, and the majority value of each categorical attribute
+        that has the value "unknown".  "unknown" is not counted for the majority value.
+        
+        Input:
+        -data:  A Dataset with the raw columns, where numeric attributes have no codebook.
+        
+        Returns:
+        -self
+        """
+        
+        if instrument.active is not None and not instrument.active.running("Preprocessor.fit"):
+            return instrument.active.call("Preprocessor.fit", self.fit, data)
+        
+        self.medians = {}
+        self.majority = {}
+        for name in data.attributes:
+            if name not in data.codebooks:
+                self.medians[name] = median(data.columns[name])
+            elif "unknown" in data.codebooks[name]:
+                self.majority[name] = majority_label(data, name, replace=True)
+        return self
+
+    def transform(self, data):
+        """
+        Applies the fitted medians and majority values to a Dataset.
+        
+        Input:
+        -data:  A Dataset with the same columns as the Dataset that was fitted.
+        
+        Returns:
+        -processed:  A new Dataset, where numeric attributes have the codebook ("high", "low") unless binarize
+            is False and, if replace is True, "unknown" is left out of the codebooks of the replaced attributes.  Columns that need no
+            change are shared with data rather than copied.
+        """
+        
+        if instrument.active is not None and not instrument.active.running("Preprocessor.transform"):
+            return instrument.active.call("Preprocessor.transform", self.transform, data)
+        
+        if self.medians is None:
+            raise ValueError("The preprocessor must be fitted before it is used")
+        
+        columns = {}
+        codebooks = dict(data.codebooks)
+        for name, column in data.columns.items():
+            if name in self.medians and self.binarize:
+                threshold = self.medians[name]
+                columns[name] = array.array('B', [0 if value > threshold else 1 for value in column])
+                codebooks[name] = ("high", "low")
+            elif self.replace and name in self.majority:
+                values = data.codebooks[name]
+                kept = tuple(value for value in values if value != "unknown")
+                new_code = {value: code for code, value in enumerate(kept)}
+                new_code["unknown"] = new_code[self.majority[name]]
+                remap = [new_code[value] for value in values] + [len(kept)]
+                columns[name] = array.array(_code_type(kept), map(remap.__getitem__, column))
+                codebooks[name] = kept
+            else:
+                columns[name] = column
+        
+        return Dataset(columns, codebooks, data.label, data.edges)
+
+    def fit_transform(self, data):
+        """
+        Fits the preprocessor to a Dataset and returns the transformed Dataset.
+        """
+        return self.fit(data).transform(data)
+
+    def to_dict(self):
+        """
+        Returns the state of the preprocessor as a dictionary that can be written as JSON.
+        """
+        return {"replace": self.replace, "medians": self.medians, "majority": self.majority,
+                "binarize": self.binarize}
+
+    @classmethod
+    def from_dict(cls, state):
+        """
+        Creates a preprocessor from a dictionary returned by to_dict.
+        """
+        return cls(state["replace"], state["medians"], state["majority"], state.get("binarize", True))
+
+
+class Binner(object):
+    """
+    A class that bins the numeric attributes of a Dataset into at most max_bins bins each, so that every value
+    takes one byte and a tree can split the attribute by scanning bins rather than distinct values.
+    fit places the bin edges at quantiles of the training data.  An attribute with no more distinct values
+    than max_bins gets one bin per value, so binning loses nothing.
+    Bin b holds the values up to edges[b] that are above edges[b-1].  Values above the last edge go in the
+    last bin.
+    """
+
+    def __init__(self, max_bins=255, edges=None):
+        if not 2 <= max_bins <= 255:
+            raise ValueError("max_bins must be between 2 and 255")
+        self.max_bins = max_bins
+        self.edges = edges
+
+    def __repr__(self):
+        return "Binner(max_bins=" + str(self.max_bins) + ", fitted=" + str(self.edges is not None) + ")"
+
+    def fit(self, data):
+        """
+        Computes the bin edges of every numeric attribute of a Dataset.
+        
+        Returns:
+        -self
+        """
+        
+        self.edges = {}
+        for name in data.attributes:
+            if name in data.codebooks or name in data.edges:
+                continue
+            values = sorted(data.columns[name])
+            n = len(values)
+            distinct = sorted(set(values))
+            if len(distinct) <= self.max_bins:
+                self.edges[name] = tuple(distinct)
+            else:
+                quantiles = set(values[-(-i * n // self.max_bins) - 1] for i in range(1, self.max_bins + 1))
+                self.edges[name] = tuple(sorted(quantiles))
+        return self
+
+    def transform(self, data):
+        """
+        Replaces the numeric attributes of a Dataset with their bin numbers.
+        
+        Returns:
+        -binned:  A new Dataset with binned numeric columns.  The other columns are shared with data.
+        """
+        
+        if self.edges is None:
+            raise ValueError("The binner must be fitted before it is used")
+        
+        columns = dict(data.columns)
+        edges = dict(data.edges)
+        for name, bin_edges in self.edges.items():
+            last = len(bin_edges) - 1
+            columns[name] = array.array('B', [min(bisect_left(bin_edges, value), last)
+                                              for value in data.columns[name]])
+            edges[name] = bin_edges
+        
+        return Dataset(columns, data.codebooks, data.label, edges)
+
+    def fit_transform(self, data):
+        """
+        Fits the binner to a Dataset and returns the binned Dataset.
+        """
+        return self.fit(data).transform(data)
+
+    def to_dict(self):
+        """
+        Returns the state of the binner as a dictionary that can be written as JSON.
+        """
+        edges = None if self.edges is None else {name: list(values) for name, values in self.edges.items()}
+        return {"max_bins": self.max_bins, "edges": edges}
+
+    @classmethod
+    def from_dict(cls, state):
+        """
+        Creates a binner from a dictionary returned by to_dict.
+        """
+        edges = state["edges"]
+        if edges is not None:
+            edges = {name: tuple(values) for name, values in edges.items()}
+        return cls(state["max_bins"], edges)
+
+
+#Part of every cache key.  It is increased whenever the processing of the data files changes,
+#so that files cached by an older version are not used.
+CACHE_VERSION = 2
+
+
+def prepare_dataset(path, example, mode="train", medians=None, majority=None, replace=False, cache_dir=None,
+                    numeric="median"):
+    """
+    Reads a data file and encodes it into a Dataset, ready for building or testing a decision tree.
+    The bank data is processed with a Preprocessor, which is fitted to the data in train mode.
+    
+    If cache_dir is given, the Dataset is saved there with save_dataset, and later calls with the same arguments
+    map the saved file instead of reading the data file again.  The cache key covers the path, size and
+    modification time of the data file, the mode, the replace flag and, in test mode, the medians and
+    majority values.
+    
+    Inputs:
+    -path:  A string, representing the path of the dataset to be processed.
+    -example:  One of three types:  "bank", "car", "tennis".  Represents the type of dataset to be used.
+    -mode:  One of two types: "train" or "test".  If "train", the medians and majority values are
+        calculated from the data.  If "test", the given medians and majority values are used.
+    -medians:  A dictionary of the training medians.  This is only used for the "bank" data in test mode.
+    -majority:  A dictionary of the training majority values.  This is only used for the "bank" data in test mode.
+    -replace:  If False, "unknown" attribute values are considered a value.  Otherwise if True, "unknown" 
+               attribute values are replaced with the majority value of that attribute.
+    -cache_dir:  A string, representing the directory of the cache, or None to not use a cache.
+    -numeric:  How numeric attributes are processed.  One of three types:
+        "median" -- each value becomes "high" or "low", compared to the training median
+        "exact" -- values are kept as numbers, and the tree splits them on thresholds
+        "hist" -- in train mode, values are binned with a Binner, and the tree splits them on bin edges.
+            In test mode, this is the same as "exact".
+    
+    Returns:
+    -S:  A Dataset.
+    -medians:  The medians used to process the bank data, or None for the other datasets.
+    -majority:  The majority values used to process the bank data, or None for the other datasets.
+    """
+    
+    if numeric == "hist" and mode == "test":
+        #Trees grown from binned data have thresholds in the units of the data, so the test data is not binned
+        numeric = "exact"
+    
+    if cache_dir is not None:
+        import hashlib
+        status = os.stat(path)
+        key = json.dumps([CACHE_VERSION, os.path.abspath(path), status.st_size, status.st_mtime_ns, example,
+                          mode, replace, numeric, medians if mode == "test" else None,
+                          majority if mode == "test" else None], sort_keys=True)
+        cache_path = os.path.join(cache_dir, hashlib.sha1(key.encode("utf-8")).hexdigest() + ".dt")
+        if os.path.exists(cache_path):
+            S, metadata = map_dataset(cache_path)
+            return S, metadata["medians"], metadata["majority"]
+    
+    S = load_dataset(path, example)
+    if example == "bank":
+        binarize = numeric == "median"
+        if mode == "train":
+            preprocessor = Preprocessor(replace, binarize=binarize).fit(S)
+        else:
+            preprocessor = Preprocessor(replace, medians, majority, binarize)
+        S = preprocessor.transform(S)
+        medians, majority = preprocessor.medians, preprocessor.majority
+        if numeric == "hist":
+            S = Binner().fit_transform(S)
+    
+    if cache_dir is not None:
+        os.makedirs(cache_dir, exist_ok=True)
+        save_dataset(S, cache_path, {"medians": medians, "majority": majority})
+    
+    return S, medians, majority
@@ -0,0 +1,293 @@
+"""
+Post-pruning of trees grown by grow_tree: minimal cost-complexity pruning and reduced-error pruning.
+"""
+
+from bisect import bisect_left
+from collections import Counter
+from heapq import heapify, heappop, heappush
+from itertools import count
+
+from .builder import Node
+
+
+def _internal_nodes(tree):
+    """
+    Returns the internal nodes of a tree, parents before children, and the parent of each of them but the root.
+    Every node must have the label counts of grow_tree.
+    """
+
+    nodes = []
+    parents = {}
+    stack = [tree]
+    while stack:
+        node = stack.pop()
+        if node.counts is None or (not node.is_leaf and node.majority is None):
+            raise ValueError("The tree has no label counts at its nodes; grow it with grow_tree")
+        if node.is_leaf:
+            continue
+        nodes.append(node)
+        for child in node.children:
+            if not child.is_leaf:
+                parents[child] = node
+            stack.append(child)
+    return nodes, parents
+
+
+def _errors(counts):
+    """
+    Returns the number of examples that a leaf with the given label counts misclassifies.
+    """
+    return sum(counts) - max(counts)
+
+
+def _pruned_copy(node, pruned):
+    """
+    Returns a copy of a tree in which the internal nodes in pruned are leaves with their majority label.
+    Leaves are shared with the original tree.
+    """
+
+    if node.is_leaf:
+        return node
+    if node in pruned:
+        return Node(name="leaf", parent=node.parent, action=node.majority, counts=node.counts)
+    copy = Node(attribute=node.attribute, parent=node.parent, threshold=node.threshold, majority=node.majority,
+                counts=node.counts)
+    for value, child in zip(node.values, node.children):
+        copy.add_branch(value, _pruned_copy(child, pruned))
+    return copy
+
+
+def _paths(tree, data):
+    """
+    Walks every example of an encoded Dataset down a tree.
+
+    Returns:
+    -paths:  A generator of (label code, internal nodes, leaf) for each example.  The internal nodes are those
+        on the path of the example, from the root.  leaf is the leaf the example reached, or None if the value
+        of the last internal node's attribute is not one of its branches.
+    """
+
+    labels = data.labels
+    for i in range(len(data)):
+        path = []
+        node = tree
+        while node is not None and not node.is_leaf:
+            path.append(node)
+            attribute = node.attribute
+            position = node.index.get(node.branch_value(data.decode(attribute, data.columns[attribute][i])))
+            node = None if position is None else node.children[position]
+        yield labels[i], path, node
+
+
+class PruningPath(object):
+    """
+    A class for the minimal cost-complexity pruning path of a tree, as in CART.
+    For a complexity parameter alpha, the pruned tree is the smallest subtree that minimizes its training error
+    rate plus alpha times its number of leaves.  Each internal node is turned into a leaf from some alpha on, so
+    the path is the increasing list of alphas at which the pruned tree changes, and every pruned tree is read
+    off the one tree that was grown.
+    -alphas:  The alphas of the path, starting at 0.0.  The tree pruned with alphas[i] is used for every alpha
+        from alphas[i] up to alphas[i + 1].
+    -leaves:  The number of leaves of the tree pruned with each alpha.
+    -errors:  The training error rate of the tree pruned with each alpha.
+    """
+
+    def __init__(self, tree, alphas, leaves, errors, collapse):
+        self.tree = tree
+        self.alphas = alphas
+        self.leaves = leaves
+        self.errors = errors
+        #The alpha from which each internal node is a leaf.  Nodes that are only removed with an ancestor are
+        #not in it.
+        self.collapse = collapse
+
+    def __len__(self):
+        return len(self.alphas)
+
+    def __repr__(self):
+        return ("PruningPath(" + str(len(self)) + " alphas, " + str(self.leaves[0]) + " to " +
+                str(self.leaves[-1]) + " leaves)")
+
+    def prune(self, alpha):
+        """
+        Returns a copy of the tree pruned with alpha.
+        """
+        return _pruned_copy(self.tree, set(node for node, at in self.collapse.items() if at <= alpha))
+
+    def validation_errors(self, data):
+        """
+        Finds the error rate of the tree pruned with every alpha of the path on an encoded Dataset, in one pass
+        over its examples.  An example stops at the first node on its path that is a leaf at a given alpha, so
+        as alpha grows, its prediction moves up its path.  Examples with a value that is not a branch of a node
+        count as errors until that node is pruned.
+
+        Returns:
+        -errors:  A list with the error rate at each alpha of the path.
+        """
+
+        alphas = self.alphas
+        codes = {value: code for code, value in enumerate(data.codebooks[data.label])}
+        inf = float('inf')
+        #The number of errors changes by diff[k] between alphas[k - 1] and alphas[k]
+        diff = [0] * (len(alphas) + 1)
+        total = 0
+        for label, path, leaf in _paths(self.tree, data):
+            total += 1
+            #The example stops at path[i] from alpha = lowest[i] up to lowest[i - 1], and at the leaf below
+            #lowest[-1]
+            end = len(alphas)
+            lowest = inf
+            for node in path:
+                at = self.collapse.get(node, inf)
+                if at < lowest:
+                    start = bisect_left(alphas, at)
+                    if codes.get(node.majority) != label:
+                        diff[start] += 1
+                        diff[end] -= 1
+                    lowest, end = at, start
+            if leaf is None or codes.get(leaf.action) != label:
+                diff[0] += 1
+                diff[end] -= 1
+
+        errors = []
+        wrong = 0
+        for k in range(len(alphas)):
+            wrong += diff[k]
+            errors.append(float(wrong) / total if total else 0.0)
+        return errors
+
+    def best_alpha(self, data):
+        """
+        Returns the alpha of the path with the lowest error rate on an encoded validation Dataset.  Ties go to
+        the largest alpha, which gives the smallest tree.
+        """
+
+        errors = self.validation_errors(data)
+        best = min(errors)
+        return max(alpha for alpha, error in zip(self.alphas, errors) if error == best)
+
+
+def cost_complexity_path(tree):
+    """
+    Finds the minimal cost-complexity pruning path of a tree grown by grow_tree, from the label counts kept at
+    its nodes, without looking at any example.
+    One bottom-up pass finds the training errors and leaves of every subtree.  Then the weakest link, the
+    internal node whose subtree lowers the training error the least per extra leaf, is turned into a leaf
+    again and again, and only the nodes above it are updated each time.
+
+    Input:
+    -tree:  A tree grown by grow_tree.
+
+    Returns:
+    -path:  A PruningPath.
+    """
+
+    nodes, parents = _internal_nodes(tree)
+    total = float(sum(tree.counts)) or 1.0
+    if not nodes:
+        return PruningPath(tree, [0.0], [1], [_errors(tree.counts) / total], {})
+
+    #The training errors of each internal node as a leaf, and the errors and leaves of its subtree.  Examples
+    #whose value is not a branch of a node reach no leaf, and are errors of the subtree.
+    leaf_errors = {}
+    subtree = {}
+    for node in reversed(nodes):
+        errors = sum(node.counts)
+        leaves = 0
+        for child in node.children:
+            errors -= sum(child.counts)
+            if child.is_leaf:
+                errors += _errors(child.counts)
+                leaves += 1
+            else:
+                errors += subtree[child][0]
+                leaves += subtree[child][1]
+        leaf_errors[node] = _errors(node.counts)
+        subtree[node] = [errors, leaves]
+
+    def strength(node):
+        errors, leaves = subtree[node]
+        #A node with one branch has nothing to gain from it
+        return (leaf_errors[node] - errors) / total / max(leaves - 1, 1)
+
+    current = {node: strength(node) for node in nodes}
+    tiebreak = count()
+    heap = [(g, next(tiebreak), node) for node, g in current.items()]
+    heapify(heap)
+    removed = set()
+    collapse = {}
+    alphas = [0.0]
+    leaves = [subtree[tree][1]]
+    errors = [subtree[tree][0] / total]
+    while heap:
+        g, _, node = heappop(heap)
+        if node in removed or g != current[node]:
+            continue
+        alpha = g if g > alphas[-1] + 1e-12 else alphas[-1]
+        collapse[node] = alpha
+
+        #The subtree is gone, and the nodes above it lose its errors and leaves
+        stack = [node]
+        while stack:
+            below = stack.pop()
+            removed.add(below)
+            stack.extend(child for child in below.children if not child.is_leaf and child not in removed)
+        change_errors = leaf_errors[node] - subtree[node][0]
+        change_leaves = 1 - subtree[node][1]
+        subtree[node] = [leaf_errors[node], 1]
+        parent = parents.get(node)
+        while parent is not None:
+            subtree[parent][0] += change_errors
+            subtree[parent][1] += change_leaves
+            current[parent] = strength(parent)
+            heappush(heap, (current[parent], next(tiebreak), parent))
+            parent = parents.get(parent)
+
+        if alpha == alphas[-1]:
+            leaves[-1], errors[-1] = subtree[tree][1], subtree[tree][0] / total
+        else:
+            alphas.append(alpha)
+            leaves.append(subtree[tree][1])
+            errors.append(subtree[tree][0] / total)
+    return PruningPath(tree, alphas, leaves, errors, collapse)
+
+
+def reduced_error_prune(tree, data):
+    """
+    Prunes a tree grown by grow_tree with reduced-error pruning against a validation set.
+    The validation examples are walked down the tree once to count them at every node.  Then, from the bottom
+    up, each internal node becomes a leaf with its majority label if that makes no more validation errors than
+    its pruned subtree.  Nodes that no validation example reaches are pruned.
+
+    Inputs:
+    -tree:  A tree grown by grow_tree.
+    -data:  An encoded validation Dataset.
+
+    Returns:
+    -pruned:  A pruned copy of the tree.  Its leaves are shared with the tree.
+    """
+
+    nodes, parents = _internal_nodes(tree)
+    codes = {value: code for code, value in enumerate(data.codebooks[data.label])}
+
+    #The label counts of the validation examples that reach each internal node, and the errors of the ones
+    #that end below it without reaching another internal node
+    reached = {node: Counter() for node in nodes}
+    ending = dict.fromkeys(nodes, 0)
+    for label, path, leaf in _paths(tree, data):
+        for node in path:
+            reached[node][label] += 1
+        if path and (leaf is None or codes.get(leaf.action) != label):
+            ending[path[-1]] += 1
+
+    pruned = set()
+    subtree_errors = {}
+    for node in reversed(nodes):
+        errors = ending[node] + sum(subtree_errors[child] for child in node.children if not child.is_leaf)
+        counts = reached[node]
+        as_leaf = sum(counts.values()) - counts[codes.get(node.majority)]
+        if as_leaf <= errors:
+            pruned.add(node)
+            errors = as_leaf
+        subtree_errors[node] = errors
+    return _pruned_copy(tree, pruned)
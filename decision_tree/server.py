@@ -0,0 +1,451 @@
+"""
+An asyncio HTTP service that scores raw examples with a saved model, batching concurrent requests together.
+Run with "python -m decision_tree.server model.dtm".
+"""
+
+import array
+import asyncio
+import json
+import math
+import time
+from collections import deque
+
+from .data import Dataset, _code_type
+from .models import load_model
+
+
+#The largest request body the server reads, in bytes
+MAX_BODY = 16 * 1024 * 1024
+
+
+class RecordEncoder(object):
+    """
+    A class that encodes raw examples, given as dictionaries of attribute values, into a Dataset that a model
+    can score.  It applies the same preprocessing as prepare_dataset: with the medians of the bank data, a
+    numeric attribute whose codebook is ("high", "low") is binarized, and with the majority values, "unknown"
+    is replaced in the attributes whose codebooks have no "unknown".  Numeric attributes without a codebook
+    are kept as numbers.
+    """
+
+    def __init__(self, model, medians=None, majority=None):
+        trees = getattr(model, "trees", None) or [model]
+        self.label = trees[0].label
+        self.codebooks = trees[0].codebooks
+        attributes = []
+        for tree in trees:
+            for name in tree.attributes:
+                if name not in attributes:
+                    attributes.append(name)
+        self.attributes = tuple(attributes)
+        self.medians = medians or {}
+        self.majority = majority or {}
+
+        #A function from a raw value to its code or number, for each attribute
+        self.converters = []
+        for name in self.attributes:
+            codebook = self.codebooks.get(name)
+            if codebook is None:
+                self.converters.append(float)
+            elif tuple(codebook) == ("high", "low") and name in self.medians:
+                self.converters.append(self._binarizer(self.medians[name]))
+            else:
+                lookup = {value: code for code, value in enumerate(codebook)}
+                if name in self.majority and "unknown" not in lookup:
+                    lookup["unknown"] = lookup[self.majority[name]]
+                self.converters.append(self._categorizer(lookup, len(codebook)))
+
+    def __repr__(self):
+        return "RecordEncoder(" + str(len(self.attributes)) + " attributes)"
+
+    @staticmethod
+    def _binarizer(threshold):
+        return lambda value: 0 if float(value) > threshold else 1
+
+    @staticmethod
+    def _categorizer(lookup, missing):
+        return lambda value: lookup.get(value if isinstance(value, str) else str(value), missing)
+
+    def encode_record(self, record):
+        """
+        Encodes one example into a tuple with the code or number of each attribute.  Raises KeyError if an
+        attribute is missing, and ValueError if a numeric value is not a number.
+        """
+
+        return tuple(convert(record[name]) for name, convert in zip(self.attributes, self.converters))
+
+    def encode(self, rows):
+        """
+        Builds a Dataset from the tuples returned by encode_record.  The labels are not known, so every example
+        gets the out-of-codebook label code.
+        """
+
+        columns = {}
+        values_by_attribute = list(zip(*rows)) if rows else [()] * len(self.attributes)
+        for name, values in zip(self.attributes, values_by_attribute):
+            codebook = self.codebooks.get(name)
+            columns[name] = array.array('d' if codebook is None else _code_type(codebook), values)
+        labels = self.codebooks[self.label]
+        columns[self.label] = array.array(_code_type(labels), [len(labels)]) * len(rows)
+        return Dataset(columns, self.codebooks, self.label)
+
+
+def _percentile(values, p):
+    """
+    Returns the p-th percentile of a sorted list of values by the nearest-rank method, or None if it is empty.
+    """
+
+    if not values:
+        return None
+    return values[max(0, int(math.ceil(p / 100.0 * len(values))) - 1)]
+
+
+class ScoringServer(object):
+    """
+    A class for an HTTP scoring service.  The model is loaded once, and each request scores one example or a
+    list of examples:
+
+        POST /predict  {"record": {...}} or {"records": [{...}, ...]}, or the record or list itself
+        GET /stats     counts of requests, records and batches, and latency percentiles in milliseconds
+        GET /health
+
+    Requests that arrive together are coalesced into micro-batches: a batch is scored as soon as it holds
+    max_batch_size examples, or max_wait seconds after its first request arrived.  Each batch is encoded into
+    one Dataset and scored with a single call to the model's predict_batch.  A request larger than
+    max_batch_size is scored as a batch of its own.  Scoring runs on the event loop, which only holds the
+    model in pure Python, so batching is what spreads its cost over the requests.
+
+    An example whose values can't be encoded, or that has a value the tree can't follow, gets an error instead
+    of a prediction without failing the other examples of its batch.
+    """
+
+    def __init__(self, model, medians=None, majority=None, max_batch_size=64, max_wait=0.002,
+                 latency_window=10000):
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be at least 1")
+        self.model = model
+        self.encoder = RecordEncoder(model, medians, majority)
+        self.labels = self.encoder.codebooks[self.encoder.label]
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.latencies = deque(maxlen=latency_window)
+        self.requests = 0
+        self.records = 0
+        self.batches = 0
+        self.server = None
+        self._queue = None
+        self._batcher = None
+
+    def __repr__(self):
+        return ("ScoringServer(" + repr(self.model) + ", max_batch_size=" + str(self.max_batch_size) +
+                ", max_wait=" + str(self.max_wait) + ")")
+
+    @classmethod
+    def from_file(cls, path, **options):
+        """
+        Creates a server for a model saved by save_model, with the medians and majority values saved with it.
+        """
+
+        model, medians, majority = load_model(path)
+        return cls(model, medians, majority, **options)
+
+    @property
+    def port(self):
+        """
+        The port the server listens on, which is chosen by the system when it is started with port 0.
+        """
+        return self.server.sockets[0].getsockname()[1] if self.server is not None else None
+
+    async def start(self, host="127.0.0.1", port=0):
+        """
+        Starts listening, and starts the task that scores the batches.
+        """
+
+        self._queue = asyncio.Queue()
+        self._batcher = asyncio.ensure_future(self._run_batches())
+        self.server = await asyncio.start_server(self._handle, host, port)
+        return self
+
+    async def close(self):
+        """
+        Stops listening and stops the batch task.
+        """
+
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+        if self._batcher is not None:
+            self._batcher.cancel()
+            try:
+                await self._batcher
+            except asyncio.CancelledError:
+                pass
+            self._batcher = None
+
+    async def serve_forever(self, host="127.0.0.1", port=0):
+        """
+        Starts the server if needed and runs it until it is cancelled.
+        """
+
+        if self.server is None:
+            await self.start(host, port)
+        try:
+            await self.server.serve_forever()
+        finally:
+            await self.close()
+
+    async def predict(self, records):
+        """
+        Scores a list of examples through the batch queue.
+
+        Input:
+        -records:  A list of dictionaries of attribute values.
+
+        Returns:
+        -results:  A list with a tuple (label, error) for each example.  label is None if error is not.
+        """
+
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((records, future))
+        return await future
+
+    async def _run_batches(self):
+        """
+        Takes requests off the queue, groups them into batches and scores each batch.
+        """
+
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            size = len(batch[0][0])
+            deadline = loop.time() + self.max_wait
+            while size < self.max_batch_size:
+                if self._queue.empty():
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        item = await asyncio.wait_for(self._queue.get(), timeout)
+                    except asyncio.TimeoutError:
+                        break
+                else:
+                    item = self._queue.get_nowait()
+                batch.append(item)
+                size += len(item[0])
+
+            try:
+                results = self.score([record for records, _ in batch for record in records])
+            except Exception as error:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(error)
+                continue
+            self.batches += 1
+            start = 0
+            for records, future in batch:
+                if not future.done():
+                    future.set_result(results[start:start + len(records)])
+                start += len(records)
+
+    def score(self, records):
+        """
+        Scores a list of examples at once, without the batch queue.
+
+        Input:
+        -records:  A list of dictionaries of attribute values.
+
+        Returns:
+        -results:  A list with a tuple (label, error) for each example.  label is None if error is not.
+        """
+
+        results = [None] * len(records)
+        rows = []
+        positions = []
+        for i, record in enumerate(records):
+            try:
+                rows.append(self.encoder.encode_record(record))
+                positions.append(i)
+            except KeyError as error:
+                results[i] = (None, "missing attribute " + str(error))
+            except (TypeError, ValueError) as error:
+                results[i] = (None, str(error))
+        if not rows:
+            return results
+
+        try:
+            codes = self.model.predict_batch(self.encoder.encode(rows))
+        except ValueError:
+            #Some example can't be followed to a leaf, so the examples are scored one at a time to find it
+            codes = []
+            for row in rows:
+                try:
+                    codes.append(self.model.predict_batch(self.encoder.encode([row]))[0])
+                except ValueError as error:
+                    codes.append(str(error))
+        for i, code in zip(positions, codes):
+            results[i] = (self.labels[code], None) if isinstance(code, int) else (None, code)
+        return results
+
+    def stats(self):
+        """
+        Returns the request, record and batch counts, and the percentiles of the latency of the recent
+        prediction requests in milliseconds.
+        """
+
+        latencies = sorted(self.latencies)
+        latency = {}
+        for name, p in (("p50", 50), ("p90", 90), ("p99", 99), ("max", 100)):
+            value = _percentile(latencies, p)
+            latency[name] = None if value is None else round(value * 1000, 3)
+        return {"requests": self.requests, "records": self.records, "batches": self.batches,
+                "mean_batch_size": float(self.records) / self.batches if self.batches else None,
+                "latency_ms": latency}
+
+    async def _dispatch(self, method, path, body):
+        """
+        Handles one request, and returns its status code and JSON payload.
+        """
+
+        if path == "/health":
+            return (200, {"status": "ok"}) if method == "GET" else (405, {"error": "use GET"})
+        if path == "/stats":
+            return (200, self.stats()) if method == "GET" else (405, {"error": "use GET"})
+        if path != "/predict":
+            return 404, {"error": "unknown path " + path}
+        if method != "POST":
+            return 405, {"error": "use POST"}
+
+        try:
+            payload = json.loads(body.decode("utf-8"))
+        except ValueError as error:
+            return 400, {"error": "invalid JSON: " + str(error)}
+        single = isinstance(payload, dict) and "records" not in payload
+        if single:
+            records = [payload.get("record", payload)]
+        else:
+            records = payload["records"] if isinstance(payload, dict) else payload
+        if not isinstance(records, list) or not all(isinstance(record, dict) for record in records):
+            return 400, {"error": "expected a record or a list of records"}
+
+        self.requests += 1
+        self.records += len(records)
+        results = await self.predict(records) if records else []
+        if single:
+            label, error = results[0]
+            return (200, {"prediction": label}) if error is None else (422, {"error": error})
+        response = {"predictions": [label for label, _ in results]}
+        errors = [{"index": i, "error": error} for i, (_, error) in enumerate(results) if error is not None]
+        if errors:
+            response["errors"] = errors
+        return 200, response
+
+    async def _handle(self, reader, writer):
+        """
+        Serves the HTTP/1.1 requests of one connection, keeping it open between requests unless asked not to.
+        """
+
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                headers = {}
+                while True:
+                    header = await reader.readline()
+                    if header in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = header.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+
+                try:
+                    method, target, version = line.decode("latin-1").split()
+                    length = int(headers.get("content-length", 0))
+                except ValueError:
+                    await self._respond(writer, 400, {"error": "malformed request"}, False)
+                    break
+                if length > MAX_BODY:
+                    await self._respond(writer, 413, {"error": "request body too large"}, False)
+                    break
+                body = await reader.readexactly(length)
+
+                start = time.perf_counter()
+                path = target.split("?", 1)[0]
+                status, payload = await self._dispatch(method, path, body)
+                keep_alive = version == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+                await self._respond(writer, status, payload, keep_alive)
+                if path == "/predict":
+                    self.latencies.append(time.perf_counter() - start)
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    async def _respond(writer, status, payload, keep_alive):
+        body = json.dumps(payload).encode("utf-8")
+        reasons = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+                   413: "Payload Too Large", 422: "Unprocessable Entity"}
+        head = ("HTTP/1.1 " + str(status) + " " + reasons.get(status, "Error") + "\r\n" +
+                "Content-Type: application/json\r\n" +
+                "Content-Length: " + str(len(body)) + "\r\n" +
+                "Connection: " + ("keep-alive" if keep_alive else "close") + "\r\n\r\n")
+        writer.write(head.encode("latin-1") + body)
+        await writer.drain()
+
+
+def request_json(host, port, method, path, payload=None, timeout=10):
+    """
+    Sends one request to a ScoringServer and returns its status code and decoded JSON payload.
+    This is a small blocking client, for scripts and for checking a server on localhost.
+    """
+
+    import http.client
+    connection = http.client.HTTPConnection(host, port, timeout=timeout)
+    try:
+        body = None if payload is None else json.dumps(payload)
+        connection.request(method, path, body, {"Content-Type": "application/json"})
+        response = connection.getresponse()
+        return response.status, json.loads(response.read().decode("utf-8"))
+    finally:
+        connection.close()
+
+
+def serve(path, host="127.0.0.1", port=8000, max_batch_size=64, max_wait=0.002):
+    """
+    Loads a model saved by save_model and serves it until interrupted.
+    """
+
+    server = ScoringServer.from_file(path, max_batch_size=max_batch_size, max_wait=max_wait)
+
+    async def run():
+        await server.start(host, port)
+        print("Serving " + repr(server.model) + " on http://" + host + ":" + str(server.port))
+        await server.serve_forever()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+
+
+def main(argv=None):
+    """
+    Runs the scoring server from the command line.
+    """
+
+    import argparse
+    parser = argparse.ArgumentParser(prog="python -m decision_tree.server",
+                                     description="Serve a saved decision tree model over HTTP.")
+    parser.add_argument("model", help="a model file written by save_model")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--max-batch-size", type=int, default=64)
+    parser.add_argument("--max-wait", type=float, default=0.002, help="seconds a batch waits to fill up")
+    args = parser.parse_args(argv)
+    serve(args.model, args.host, args.port, args.max_batch_size, args.max_wait)
+    return 0
+
+
+if __name__ == "__main__":
+    main()
@@ -1,2 +1,2 @@
 #!/bin/bash
-python3 decision_tree.py
+python3 -m decision_tree
@@ -0,0 +1,24 @@
+"""
+Paths of the example data and comparisons of trees, shared by the tests.
+"""
+
+import os
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def data_path(example, name):
+    return os.path.join(ROOT, example, name + ".csv")
+
+
+def same_tree(a, b):
+    """
+    Returns True if two trees split on the same attributes and thresholds, with the same branches, and have
+    the same labels at their leaves.
+    """
+
+    if a.is_leaf or b.is_leaf:
+        return a.is_leaf and b.is_leaf and a.action == b.action
+    return (a.attribute == b.attribute and a.threshold == b.threshold and a.values == b.values and
+            all(same_tree(x, y) for x, y in zip(a.children, b.children)))
@@ -0,0 +1,37 @@
+"""
+Checks that encoded Datasets give the same examples, counts and labels as lists of dictionaries.
+"""
+
+import unittest
+
+from decision_tree import create_attribute_dictionary, encode_examples, label_counts, majority_label, read_file
+
+from helpers import data_path
+
+
+class DatasetTest(unittest.TestCase):
+
+    def test_examples_round_trip(self):
+        S = read_file(data_path("car", "train"), "car")
+        data = encode_examples(S, create_attribute_dictionary("car"))
+        self.assertEqual(len(data), len(S))
+        self.assertEqual([data.example(i) for i in range(len(data))], S)
+        #Lists of dictionaries count the labels in the order they are first seen, Datasets in codebook order
+        self.assertEqual(sorted(label_counts(data)), sorted(label_counts(S)))
+        self.assertEqual(majority_label(data, "buying"), majority_label(S, "buying"))
+
+    def test_unknown_values(self):
+        data = encode_examples([{"label": "maybe"}, {"label": "yes"}], {"label": ("yes", "no")})
+        self.assertEqual(list(data.labels), [2, 0])
+        self.assertEqual(data.example(0), {"label": None})
+
+    def test_majority_ties_go_to_first_label(self):
+        S = [{"label": "no"}, {"label": "yes"}, {"label": "yes"}, {"label": "no"}]
+        data = encode_examples(S, {"label": ("yes", "no")})
+        self.assertEqual(majority_label(S), "no")
+        self.assertEqual(majority_label(data), "no")
+        self.assertEqual(majority_label(data, samples=[2, 3]), "yes")
+
+
+if __name__ == "__main__":
+    unittest.main()
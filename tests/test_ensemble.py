@@ -0,0 +1,64 @@
+"""
+Checks the random forests, bagging and boosting of decision trees.
+"""
+
+import unittest
+from collections import Counter
+
+from decision_tree import AdaBoost, Bagging, RandomForest, prepare_dataset
+
+from helpers import data_path
+
+
+def same_compiled(a, b):
+    return all(list(getattr(a, name)) == list(getattr(b, name)) for name in ("feature", "offset", "children",
+                                                                            "value"))
+
+
+class ForestTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.train, medians, majority = prepare_dataset(data_path("bank", "train"), "bank")
+        cls.test, _, _ = prepare_dataset(data_path("bank", "test"), "bank", "test", medians, majority)
+
+    def test_workers_give_the_same_forest(self):
+        for forest_type in (RandomForest, Bagging):
+            serial = forest_type(6, max_depth=5, seed=3).fit(self.train)
+            parallel = forest_type(6, max_depth=5, seed=3, workers=2).fit(self.train)
+            self.assertEqual(len(serial.trees), 6)
+            self.assertTrue(all(same_compiled(a, b) for a, b in zip(serial.trees, parallel.trees)), forest_type)
+
+    def test_vote(self):
+        forest = RandomForest(5, max_depth=4, seed=1).fit(self.train)
+        votes = [Counter(row) for row in zip(*[tree.predict_batch(self.test) for tree in forest.trees])]
+        #Ties go to the lowest label code
+        expected = [max(sorted(count), key=count.__getitem__) for count in votes]
+        self.assertEqual(list(forest.predict_batch(self.test)), expected)
+
+
+class AdaBoostTest(unittest.TestCase):
+
+    def test_training_errors(self):
+        S, _, _ = prepare_dataset(data_path("bank", "train"), "bank")
+        boost = AdaBoost(10).fit(S)
+        self.assertEqual(len(boost.trees), len(boost.alphas))
+        self.assertEqual(len(boost.trees), len(boost.training_errors))
+        wrong = sum(p != label for p, label in zip(boost.predict_batch(S), S.labels))
+        self.assertEqual(boost.training_errors[-1], float(wrong) / len(S))
+
+    def test_binned_data(self):
+        #Trees grown from binned data score the binned training set on bin numbers, and the unbinned test set
+        #on the edges of the bins, with the same result
+        S, medians, majority = prepare_dataset(data_path("bank", "train"), "bank", numeric="hist")
+        raw, _, _ = prepare_dataset(data_path("bank", "train"), "bank", "test", medians, majority, numeric="hist")
+        self.assertTrue(S.edges)
+        self.assertFalse(raw.edges)
+        for model in (AdaBoost(5), RandomForest(5, max_depth=6, seed=1)):
+            model.fit(S)
+            self.assertEqual(list(model.predict_batch(S)), list(model.predict_batch(raw)), model)
+        self.assertEqual(len(model.predict_votes(S)), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
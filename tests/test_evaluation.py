@@ -0,0 +1,79 @@
+"""
+Checks the scoring of files and Datasets, the folds and the cross-validation.
+"""
+
+import unittest
+
+from decision_tree import ConfusionMatrix, compile_tree, cross_validate, evaluate, evaluate_file, fold_indices, \
+    grow_tree, prepare_dataset
+from decision_tree import predictor
+
+from helpers import data_path
+
+
+class EvaluateTest(unittest.TestCase):
+
+    def test_file_matches_dataset(self):
+        for example in ("car", "bank"):
+            S, medians, majority = prepare_dataset(data_path(example, "train"), example)
+            test, _, _ = prepare_dataset(data_path(example, "test"), example, "test", medians, majority)
+            tree = grow_tree(S, set(S.attributes), S.codebooks, "entropy", 6)
+            matrix = evaluate(tree, test)
+            self.assertEqual(matrix.total(), len(test))
+            self.assertEqual(evaluate(tree, test, chunk_size=97).counts, matrix.counts)
+            self.assertEqual(evaluate_file(tree, data_path(example, "test"), example, medians, majority,
+                                           chunk_size=333).counts, matrix.counts, example)
+            accuracy = predictor.test_decision_tree(tree, data_path(example, "test"), example, medians, majority)
+            self.assertEqual(accuracy, matrix.accuracy())
+            labels = S.codebooks[S.label]
+            predictions = compile_tree(tree, S.codebooks).predict(test)
+            correct = sum(labels[code] == predicted for code, predicted in zip(test.labels, predictions))
+            self.assertEqual(matrix.accuracy(), float(correct) / len(test))
+
+    def test_confusion_matrix(self):
+        a = ConfusionMatrix(("yes", "no"))
+        a.add([0, 0, 1, 2], [0, 1, 1, 0])
+        b = ConfusionMatrix(("yes", "no"), [[2, 0], [1, 0]])
+        self.assertEqual(a.counts, [[1, 1], [0, 1]])
+        self.assertEqual((a + b).counts, [[3, 1], [1, 1]])
+        self.assertEqual((a + b).accuracy(), 4.0 / 6)
+        metrics = (a + b).class_metrics()
+        self.assertEqual(metrics["yes"]["precision"], 0.75)
+        self.assertEqual(metrics["yes"]["recall"], 0.75)
+        self.assertEqual(metrics["no"]["support"], 2)
+
+
+class CrossValidateTest(unittest.TestCase):
+
+    def test_folds_partition_the_rows(self):
+        for n, k in ((10, 2), (1000, 7), (5, 5)):
+            folds = fold_indices(n, k, seed=4)
+            self.assertEqual(len(folds), k)
+            self.assertEqual(sorted(i for fold in folds for i in fold), list(range(n)))
+            self.assertLessEqual(max(map(len, folds)) - min(map(len, folds)), 1)
+            self.assertTrue(all(list(fold) == sorted(fold) for fold in folds))
+        self.assertEqual(fold_indices(100, 3, seed=1), fold_indices(100, 3, seed=1))
+        self.assertRaises(ValueError, fold_indices, 4, 5)
+
+    def test_workers_give_the_same_result(self):
+        S, _, _ = prepare_dataset(data_path("car", "train"), "car")
+        serial = cross_validate(S, 4, ("entropy", "me"), (1, 3, 6), seed=2)
+        parallel = cross_validate(S, 4, ("entropy", "me"), (1, 3, 6), seed=2, workers=2)
+        self.assertEqual(sorted(serial), sorted(parallel))
+        for key, matrices in serial.items():
+            self.assertEqual([matrix.counts for matrix in matrices], [matrix.counts for matrix in parallel[key]])
+            self.assertEqual(sum(matrices[1:], matrices[0]).total(), len(S))
+
+    def test_depths_match_separate_trees(self):
+        S, _, _ = prepare_dataset(data_path("car", "train"), "car")
+        results = cross_validate(S, 3, ("gini",), (2, 4), seed=0)
+        folds = fold_indices(len(S), 3, seed=0)
+        for depth in (2, 4):
+            for fold, matrix in enumerate(results[(depth, "gini")]):
+                train = S.take([i for other, indices in enumerate(folds) if other != fold for i in indices])
+                tree = grow_tree(train, set(S.attributes), S.codebooks, "gini", depth)
+                self.assertEqual(matrix.counts, evaluate(tree, S.take(folds[fold])).counts, (depth, fold))
+
+
+if __name__ == "__main__":
+    unittest.main()
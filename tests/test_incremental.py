@@ -0,0 +1,66 @@
+"""
+Checks that an IncrementalTree is the tree grow_tree builds from all the examples seen so far.
+"""
+
+import array
+import unittest
+
+from decision_tree import Dataset, IncrementalTree, grow_tree, prepare_dataset
+
+from helpers import data_path, same_tree
+
+
+def encode(rows, codebooks):
+    """
+    Builds a Dataset from a list of tuples of values, in the order of the codebooks.
+    """
+    columns = {}
+    for name, values in zip(codebooks, zip(*rows)):
+        codebook = codebooks[name]
+        columns[name] = array.array('B', [codebook.index(value) for value in values])
+    return Dataset(columns, codebooks)
+
+
+class IncrementalTreeTest(unittest.TestCase):
+
+    def test_batches_match_grow_tree(self):
+        S, _, _ = prepare_dataset(data_path("bank", "train"), "bank")
+        for purity_type in ("entropy", "me", "gini"):
+            tree = IncrementalTree(purity_type, 8)
+            for start in range(0, len(S), 700):
+                tree.partial_fit(S.take(range(start, min(start + 700, len(S)))))
+                seen = S.take(range(min(start + 700, len(S))))
+                self.assertTrue(same_tree(tree.root, grow_tree(seen, set(seen.attributes), seen.codebooks,
+                                                               purity_type, 8)), (purity_type, start))
+            self.assertGreater(tree.rebuilds, 0)
+
+    def test_new_value_reaches_empty_leaf(self):
+        codebooks = {"a": ("x", "y", "z"), "b": ("u", "v"), "label": ("yes", "no")}
+        first = encode([("x", "u", "yes"), ("x", "v", "yes"), ("y", "u", "no"), ("y", "v", "no"),
+                        ("x", "u", "yes")], codebooks)
+        tree = IncrementalTree("entropy").fit(first)
+        self.assertEqual(tree.root.attribute, "a")
+        empty = tree.root.children[2]
+        self.assertTrue(empty.is_leaf)
+        self.assertEqual(sum(empty.counts), 0)
+
+        #The first examples with a = "z" go to the empty leaf, which must now be split on b
+        second = encode([("z", "u", "no"), ("z", "v", "yes"), ("z", "u", "no"), ("y", "u", "no")], codebooks)
+        rebuilds = tree.rebuilds
+        tree.partial_fit(second)
+        self.assertEqual(tree.rebuilds, rebuilds + 1)
+        self.assertEqual(tree.root.children[2].attribute, "b")
+        seen = encode([("x", "u", "yes"), ("x", "v", "yes"), ("y", "u", "no"), ("y", "v", "no"),
+                       ("x", "u", "yes"), ("z", "u", "no"), ("z", "v", "yes"), ("z", "u", "no"),
+                       ("y", "u", "no")], codebooks)
+        self.assertTrue(same_tree(tree.root, grow_tree(seen, {"a", "b"}, codebooks, "entropy")))
+
+    def test_categorical_only(self):
+        S, _, _ = prepare_dataset(data_path("bank", "train"), "bank", numeric="exact")
+        with self.assertRaises(ValueError) as context:
+            IncrementalTree().partial_fit(S)
+        self.assertIn("categorical", str(context.exception))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,46 @@
+"""
+Checks that models saved by save_model load back as the same models.
+"""
+
+import os
+import tempfile
+import unittest
+
+from decision_tree import AdaBoost, RandomForest, compile_tree, grow_tree, load_model, prepare_dataset, save_model
+
+from helpers import data_path
+
+
+class ModelTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.train, cls.medians, cls.majority = prepare_dataset(data_path("bank", "train"), "bank")
+        cls.test, _, _ = prepare_dataset(data_path("bank", "test"), "bank", "test", cls.medians, cls.majority)
+
+    def test_tree_round_trip(self):
+        S = self.train
+        tree = grow_tree(S, set(S.attributes), S.codebooks, "entropy", 8)
+        compiled = compile_tree(tree, S.codebooks)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "tree.dtm")
+            save_model(tree, path, self.medians, self.majority, codebooks=S.codebooks)
+            loaded, medians, majority = load_model(path)
+            self.assertEqual((medians, majority), (self.medians, self.majority))
+            for name in ("feature", "offset", "children", "value"):
+                self.assertEqual(list(getattr(loaded, name)), list(getattr(compiled, name)))
+            self.assertEqual(list(loaded.predict_batch(self.test)), list(compiled.predict_batch(self.test)))
+
+    def test_ensemble_round_trip(self):
+        for model in (RandomForest(5, max_depth=4, seed=1), AdaBoost(5)):
+            model.fit(self.train)
+            with tempfile.TemporaryDirectory() as directory:
+                path = os.path.join(directory, "model.dtm")
+                save_model(model, path)
+                loaded, _, _ = load_model(path)
+                self.assertEqual(type(loaded), type(model))
+                self.assertEqual(list(loaded.predict_batch(self.test)), list(model.predict_batch(self.test)))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,62 @@
+"""
+Checks that the pruning path and reduced-error pruning agree with scoring the pruned trees.
+"""
+
+import unittest
+
+from decision_tree import ID3, cost_complexity_path, create_attribute_dictionary, evaluate, grow_tree, \
+    prepare_dataset, read_file, reduced_error_prune
+
+from helpers import data_path
+
+
+def count_leaves(node):
+    return 1 if node.is_leaf else sum(count_leaves(child) for child in node.children)
+
+
+class PruningTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.cases = []
+        for example, numeric in (("car", "median"), ("bank", "median"), ("bank", "exact")):
+            train, medians, majority = prepare_dataset(data_path(example, "train"), example, numeric=numeric)
+            test, _, _ = prepare_dataset(data_path(example, "test"), example, "test", medians, majority,
+                                         numeric=numeric)
+            tree = grow_tree(train, set(train.attributes), train.codebooks, "entropy", 10)
+            cls.cases.append(((example, numeric), train, test, tree))
+
+    def test_path_matches_pruned_trees(self):
+        for name, train, test, tree in self.cases:
+            path = cost_complexity_path(tree)
+            self.assertGreater(len(path), 2, name)
+            self.assertEqual(path.alphas[0], 0.0)
+            self.assertTrue(all(a < b for a, b in zip(path.alphas, path.alphas[1:])), name)
+            self.assertEqual(path.leaves[-1], 1, name)
+            validation_errors = path.validation_errors(test)
+            for i, alpha in enumerate(path.alphas):
+                pruned = path.prune(alpha)
+                self.assertEqual(count_leaves(pruned), path.leaves[i], (name, alpha))
+                self.assertAlmostEqual(evaluate(pruned, train).error(), path.errors[i], 12, (name, alpha))
+                self.assertAlmostEqual(evaluate(pruned, test).error(), validation_errors[i], 12, (name, alpha))
+            self.assertIn(path.best_alpha(test), path.alphas)
+            self.assertEqual(validation_errors[path.alphas.index(path.best_alpha(test))], min(validation_errors))
+
+    def test_reduced_error_pruning(self):
+        for name, train, test, tree in self.cases:
+            pruned = reduced_error_prune(tree, test)
+            self.assertLessEqual(count_leaves(pruned), count_leaves(tree), name)
+            self.assertLessEqual(evaluate(pruned, test).error(), evaluate(tree, test).error(), name)
+            self.assertEqual(count_leaves(tree), count_leaves(grow_tree(train, set(train.attributes),
+                                                                        train.codebooks, "entropy", 10)))
+
+    def test_needs_label_counts(self):
+        S = read_file(data_path("car", "train"), "car")
+        master_list = create_attribute_dictionary("car")
+        tree = ID3(S, set(master_list) - {"label"}, master_list, "entropy", 0, 3)
+        self.assertRaises(ValueError, cost_complexity_path, tree)
+        self.assertRaises(ValueError, reduced_error_prune, tree, self.cases[0][2])
+
+
+if __name__ == "__main__":
+    unittest.main()
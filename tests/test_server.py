@@ -0,0 +1,105 @@
+"""
+Checks the scoring server on localhost, through HTTP requests to a server started on port 0.
+"""
+
+import asyncio
+import threading
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+from decision_tree import ScoringServer, compile_tree, grow_tree, prepare_dataset, read_file
+from decision_tree.server import request_json
+
+from helpers import data_path
+
+
+class ServerTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        S, medians, majority = prepare_dataset(data_path("bank", "train"), "bank")
+        cls.tree = compile_tree(grow_tree(S, set(S.attributes), S.codebooks, "entropy", 8), S.codebooks)
+        test, _, _ = prepare_dataset(data_path("bank", "test"), "bank", "test", medians, majority)
+        cls.records = read_file(data_path("bank", "test"), "bank")
+        for record in cls.records:
+            del record["label"]
+        cls.expected = cls.tree.predict(test)
+
+        #The server runs on an event loop of its own thread, and the tests send it blocking requests
+        cls.server = ScoringServer(cls.tree, medians, majority, max_batch_size=64, max_wait=0.01)
+        cls.loop = asyncio.new_event_loop()
+        cls.thread = threading.Thread(target=cls.loop.run_forever, daemon=True)
+        cls.thread.start()
+        asyncio.run_coroutine_threadsafe(cls.server.start("127.0.0.1", 0), cls.loop).result(10)
+        cls.port = cls.server.port
+
+    @classmethod
+    def tearDownClass(cls):
+        asyncio.run_coroutine_threadsafe(cls.server.close(), cls.loop).result(10)
+        cls.loop.call_soon_threadsafe(cls.loop.stop)
+        cls.thread.join(10)
+        cls.loop.close()
+
+    def post(self, payload):
+        return request_json("127.0.0.1", self.port, "POST", "/predict", payload)
+
+    def test_single_predictions(self):
+        with ThreadPoolExecutor(20) as pool:
+            responses = list(pool.map(self.post, self.records[:200]))
+        self.assertEqual([status for status, _ in responses], [200] * 200)
+        self.assertEqual([payload["prediction"] for _, payload in responses], self.expected[:200])
+        self.assertEqual(self.post({"record": self.records[0]}), (200, {"prediction": self.expected[0]}))
+
+    def test_batch_predictions(self):
+        status, payload = self.post({"records": self.records[:500]})
+        self.assertEqual(status, 200)
+        self.assertEqual(payload, {"predictions": self.expected[:500]})
+
+    def test_record_errors(self):
+        #Every categorical value is one that the tree has no branch for
+        codebooks = self.tree.codebooks
+        unknown = dict(self.records[0], **{name: "not a value" for name in self.tree.attributes
+                                          if tuple(codebooks[name]) != ("high", "low")})
+        missing = dict(self.records[1])
+        del missing["age"]
+        not_numeric = dict(self.records[2], age="old")
+        status, payload = self.post([unknown, self.records[3], missing, not_numeric])
+        self.assertEqual(status, 200)
+        self.assertEqual(payload["predictions"], [None, self.expected[3], None, None])
+        errors = {error["index"]: error["error"] for error in payload["errors"]}
+        self.assertEqual(sorted(errors), [0, 2, 3])
+        self.assertIn("codebook", errors[0])
+        self.assertIn("missing attribute", errors[2])
+        self.assertIn("old", errors[3])
+
+        status, payload = self.post(missing)
+        self.assertEqual(status, 422)
+        self.assertIn("missing attribute", payload["error"])
+        self.assertEqual(self.post([1, 2])[0], 400)
+
+    def test_micro_batches(self):
+        before = self.server.stats()
+
+        async def predict_together():
+            return await asyncio.gather(*[self.server.predict([record]) for record in self.records[:50]])
+
+        results = asyncio.run_coroutine_threadsafe(predict_together(), self.loop).result(10)
+        self.assertEqual([label for [(label, _)] in results], self.expected[:50])
+        self.assertLess(self.server.stats()["batches"] - before["batches"], 50)
+
+    def test_stats(self):
+        before = request_json("127.0.0.1", self.port, "GET", "/stats")[1]
+        self.post({"records": self.records[:10]})
+        self.post(self.records[10])
+        status, stats = request_json("127.0.0.1", self.port, "GET", "/stats")
+        self.assertEqual(status, 200)
+        self.assertEqual(stats["requests"] - before["requests"], 2)
+        self.assertEqual(stats["records"] - before["records"], 11)
+        self.assertGreater(stats["batches"], before["batches"])
+        self.assertEqual(stats["mean_batch_size"], float(stats["records"]) / stats["batches"])
+        self.assertIsNotNone(stats["latency_ms"]["p50"])
+        self.assertEqual(request_json("127.0.0.1", self.port, "GET", "/health"), (200, {"status": "ok"}))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,189 @@
+"""
+Checks that the ways of growing a tree all give the same tree.
+Run with "python3 -m unittest discover tests" from the top of the repository.
+"""
+
+import array
+import unittest
+
+from decision_tree import ID3, Binner, Dataset, compile_tree, create_attribute_dictionary, encode_examples, evaluate, \
+    grow_tree, grow_tree_parallel, prepare_dataset, process_bank_data, read_file, walk_encoded
+from decision_tree.builder import _Splitter
+
+from helpers import data_path, same_tree
+
+
+def _internal_nodes(node):
+    if node.is_leaf:
+        return []
+    return [node] + [inner for child in node.children for inner in _internal_nodes(child)]
+
+
+class GrowTreeTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.car, _, _ = prepare_dataset(data_path("car", "train"), "car")
+        cls.bank, _, _ = prepare_dataset(data_path("bank", "train"), "bank")
+
+    def test_matches_id3(self):
+        #These trees have no ties between attributes, which ID3 breaks in the order of its set
+        for example, depths in (("car", (1, 2, 3, 4)), ("bank", (1, 2))):
+            S = read_file(data_path(example, "train"), example)
+            if example == "bank":
+                S, _, _ = process_bank_data(S, "train")
+            master_list = create_attribute_dictionary(example)
+            data = encode_examples(S, master_list)
+            Attributes = set(master_list) - {"label"}
+            for purity_type in ("entropy", "gini"):
+                for depth in depths:
+                    expected = ID3(S, Attributes, master_list, purity_type, 0, depth)
+                    self.assertTrue(same_tree(grow_tree(data, Attributes, master_list, purity_type, depth),
+                                              expected), (example, purity_type, depth))
+                    self.assertTrue(same_tree(ID3(data, Attributes, master_list, purity_type, 0, depth), expected),
+                                    (example, purity_type, depth))
+
+    def test_orders_match(self):
+        for S in (self.car, self.bank):
+            for purity_type in ("entropy", "me", "gini"):
+                tree = grow_tree(S, set(S.attributes), S.codebooks, purity_type)
+                for order in ("breadth", "best"):
+                    self.assertTrue(same_tree(grow_tree(S, set(S.attributes), S.codebooks, purity_type,
+                                                        order=order), tree), (purity_type, order))
+
+
+class HistogramTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.S, medians, majority = prepare_dataset(data_path("bank", "train"), "bank", numeric="hist")
+        cls.raw, _, _ = prepare_dataset(data_path("bank", "train"), "bank", "test", medians, majority,
+                                        numeric="hist")
+        cls.test, _, _ = prepare_dataset(data_path("bank", "test"), "bank", "test", medians, majority,
+                                         numeric="hist")
+
+    def test_bins(self):
+        S, raw = self.S, self.raw
+        for name, edges in S.edges.items():
+            distinct = sorted(set(raw.columns[name]))
+            self.assertLessEqual(len(edges), 255, name)
+            self.assertEqual(S.columns[name].typecode, 'B')
+            if len(distinct) <= 255:
+                self.assertEqual(list(edges), distinct, name)
+            else:
+                self.assertEqual(len(edges), len(set(edges)), name)
+            #Bin b holds the values up to edges[b] that are above edges[b - 1]
+            for value, b in zip(raw.columns[name], S.columns[name]):
+                self.assertTrue(value <= edges[b] and (b == 0 or value > edges[b - 1]), (name, value))
+        #Quantiles that fall on the same value give one edge, so capped attributes can have fewer than 255 bins
+        self.assertTrue(any(len(set(raw.columns[name])) > 255 for name in S.edges))
+        binned = Binner(16).fit_transform(raw)
+        self.assertTrue(all(1 < len(edges) <= 16 for edges in binned.edges.values()))
+        self.assertEqual(max(binned.columns["balance"]), len(binned.edges["balance"]) - 1)
+        self.assertRaises(ValueError, Binner, 256)
+
+    def test_child_histograms(self):
+        #The histograms the builder finds for the children of every split, most of them by subtraction, must be
+        #the ones counted directly from the examples of each child
+        S = self.S
+        samples = memoryview(array.array('l', range(len(S))))
+        splitter = _Splitter(S, S.codebooks, "entropy", samples)
+        child_histograms = splitter.child_histograms
+        checked = []
+
+        def checked_child_histograms(hists, ranges, attributes):
+            child_hists = child_histograms(hists, ranges, attributes)
+            for (start, end), hist in zip(ranges, child_hists):
+                self.assertEqual(hist, splitter.histograms(start, end, attributes))
+            checked.append(len(ranges))
+            return child_hists
+
+        splitter.child_histograms = checked_child_histograms
+        tree = grow_tree(S, set(S.attributes), S.codebooks, "entropy", 6, splitter=splitter)
+        self.assertGreater(len(checked), 10)
+        self.assertTrue(same_tree(tree, grow_tree(S, set(S.attributes), S.codebooks, "entropy", 6)))
+
+    def test_predictions(self):
+        #Thresholds are bin edges, so the binned training set is scored on bin numbers, and unbinned data on
+        #the edges, with the same result
+        S = self.S
+        tree = grow_tree(S, set(S.attributes), S.codebooks, "gini", 8)
+        thresholds = [node.threshold for node in _internal_nodes(tree) if node.attribute in S.edges]
+        self.assertTrue(thresholds)
+        self.assertTrue(all(node.threshold in S.edges[node.attribute] for node in _internal_nodes(tree)
+                            if node.attribute in S.edges))
+        compiled = compile_tree(tree, S.codebooks)
+        self.assertEqual(list(compiled.predict_batch(S)), list(compiled.predict_batch(self.raw)))
+        labels = S.codebooks[S.label]
+        self.assertEqual([labels[code] for code in compiled.predict_batch(self.raw)],
+                         [walk_encoded(tree, self.raw, i) for i in range(len(self.raw))])
+        self.assertEqual(evaluate(tree, S).counts, evaluate(tree, self.raw).counts)
+        self.assertEqual(evaluate(tree, self.test).total(), len(self.test))
+
+
+class TruncateTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.car, _, _ = prepare_dataset(data_path("car", "train"), "car")
+        cls.bank, _, _ = prepare_dataset(data_path("bank", "train"), "bank")
+
+    def test_truncate_matches_max_depth(self):
+        for S, depths in ((self.car, range(1, 7)), (self.bank, (1, 2, 4, 8))):
+            for purity_type in ("entropy", "me", "gini"):
+                tree = grow_tree(S, set(S.attributes), S.codebooks, purity_type)
+                for depth in depths:
+                    self.assertTrue(same_tree(tree.truncate(depth),
+                                              grow_tree(S, set(S.attributes), S.codebooks, purity_type, depth)),
+                                    (purity_type, depth))
+
+    def test_predict_at_depths(self):
+        S = self.bank
+        tree = grow_tree(S, set(S.attributes), S.codebooks, "gini")
+        predictions = compile_tree(tree, S.codebooks).predict_at_depths(S, [1, 3, 5, 16])
+        for depth, codes in predictions.items():
+            self.assertEqual(list(codes), list(compile_tree(tree.truncate(depth), S.codebooks).predict_batch(S)),
+                             depth)
+
+
+class NumericSplitTest(unittest.TestCase):
+
+    def test_threshold_between_values(self):
+        x = array.array('d', [0.1, 0.2, 0.3, 0.6, 0.7, 0.8])
+        S = Dataset({"x": x, "label": array.array('B', [0, 0, 0, 1, 1, 1])}, {"label": ("yes", "no")})
+        tree = grow_tree(S, {"x"}, S.codebooks, "entropy")
+        self.assertTrue(0.3 < tree.threshold < 0.6)
+        self.assertEqual([child.action for child in tree.children], ["yes", "no"])
+
+    def test_unknown_labels(self):
+        #Labels that are not in the codebook have the code len(codebook)
+        x = array.array('d', [0.1, 0.2, 0.3, 0.6, 0.7, 0.8])
+        labels = array.array('B', [0, 2, 0, 1, 1, 2])
+        S = Dataset({"x": x, "label": labels}, {"label": ("yes", "no")})
+        tree = grow_tree(S, {"x"}, S.codebooks, "entropy")
+        self.assertEqual(tree.attribute, "x")
+        self.assertEqual([child.action for child in tree.children], ["yes", "no"])
+
+    def test_exact_tree_on_bank(self):
+        S, _, _ = prepare_dataset(data_path("bank", "train"), "bank", numeric="exact")
+        tree = grow_tree(S, set(S.attributes), S.codebooks, "entropy", 6)
+        labels = S.codebooks[S.label]
+        compiled = compile_tree(tree, S.codebooks)
+        self.assertEqual([labels[code] for code in compiled.predict_batch(S)],
+                         [walk_encoded(tree, S, i) for i in range(len(S))])
+
+
+class ParallelTest(unittest.TestCase):
+
+    def test_parallel_matches_serial(self):
+        for example in ("car", "bank"):
+            S, _, _ = prepare_dataset(data_path(example, "train"), example)
+            for purity_type in ("entropy", "me"):
+                self.assertTrue(same_tree(grow_tree_parallel(S, set(S.attributes), S.codebooks, purity_type, 8,
+                                                             workers=2, min_examples=50),
+                                          grow_tree(S, set(S.attributes), S.codebooks, purity_type, 8)),
+                                (example, purity_type))
+
+
+if __name__ == "__main__":
+    unittest.main()